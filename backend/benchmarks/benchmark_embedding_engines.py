@@ -0,0 +1,136 @@
+"""
+Benchmark embedding engines for all-MiniLM-L6-v2 on CPU
+Compares the PyTorch SentenceTransformer with ONNX Runtime (fp32 and int8
+quantized) on encode throughput, single-query latency, resident memory and
+retrieval agreement with PyTorch on the bundled Ayurveda corpus.
+
+Each engine is loaded in a fresh process so its RSS is measured in isolation.
+ONNX engines need `pip install sentence-transformers[onnx]`.
+
+Usage (from backend/):
+  python -m benchmarks.benchmark_embedding_engines
+  python -m benchmarks.benchmark_embedding_engines --engines torch,onnx:onnx/model_quint8_avx2.onnx
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+DEFAULT_ENGINES = "torch,onnx,onnx:onnx/model_quint8_avx2.onnx"
+
+# The queries the service actually sends (see AyurvedaService)
+QUERIES = [
+    "Vata-Pitta dietary guidelines foods to favor avoid",
+    "Kapha dietary guidelines foods to favor avoid",
+    "blood glucose management diabetes prevention ayurveda",
+    "properties of oatmeal taste qualities effects",
+    "properties of banana taste qualities effects",
+    "properties of white rice taste qualities effects",
+    "high cholesterol management foods herbs Pitta dosha",
+    "liver health yakrit detoxification Vata dosha",
+    "slow metabolism agni digestive fire Kapha dosha",
+    "digestive health gut wellness Tridoshic dosha",
+]
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def run_engine(engine: str, documents, queries, repeats: int, threads: int):
+    """Load one engine and time it (runs in a child process)"""
+    import torch
+    from services.vector_service import get_embedding_model
+
+    torch.set_num_threads(threads)
+    backend, _, model_file = engine.partition(":")
+
+    rss_before = rss_mb()
+    model = get_embedding_model(MODEL_NAME, backend, model_file or None)
+    model.encode(queries[:1])  # first call allocates the session/graph
+    rss_loaded = rss_mb() - rss_before
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        doc_embeddings = model.encode(documents, batch_size=32)
+    throughput = repeats * len(documents) / (time.perf_counter() - start)
+
+    latencies = []
+    for _ in range(repeats):
+        for query in queries:
+            start = time.perf_counter()
+            model.encode([query])
+            latencies.append(time.perf_counter() - start)
+
+    return {
+        "engine": engine,
+        "rss_mb": rss_loaded,
+        "docs_per_s": throughput,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p95_ms": float(np.percentile(latencies, 95) * 1000),
+        "doc_embeddings": np.asarray(doc_embeddings, dtype=np.float32),
+        "query_embeddings": np.asarray(model.encode(queries), dtype=np.float32),
+    }
+
+
+def top_k(doc_embeddings, query_embeddings, k):
+    docs = doc_embeddings / np.linalg.norm(doc_embeddings, axis=1, keepdims=True)
+    queries = query_embeddings / np.linalg.norm(query_embeddings, axis=1, keepdims=True)
+    return np.argsort(-(queries @ docs.T), axis=1)[:, :k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--engines", default=DEFAULT_ENGINES,
+                        help="comma separated backend[:model_file] entries; the first is the reference")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    from data.ayurveda_corpus import get_ayurveda_documents
+    documents = [d["text"] for d in get_ayurveda_documents()]
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for engine in args.engines.split(","):
+        with context.Pool(1) as pool:
+            try:
+                results.append(pool.apply(run_engine, (engine, documents, QUERIES, args.repeats, args.threads)))
+            except Exception as e:
+                print(f"{engine}: skipped ({e})")
+
+    if not results:
+        return
+
+    reference = results[0]
+    reference_top = top_k(reference["doc_embeddings"], reference["query_embeddings"], args.k)
+
+    print(f"{len(documents)} documents, {len(QUERIES)} queries, {args.threads} threads, top-{args.k} vs {reference['engine']}")
+    print(
+        f"{'engine':<40}{'RSS MB':>8}{'docs/s':>9}{'p50 ms':>8}{'p95 ms':>8}"
+        f"{'min cos':>9}{'top1':>7}{'top-k':>7}"
+    )
+    for result in results:
+        cosine = np.sum(
+            result["doc_embeddings"] * reference["doc_embeddings"], axis=1
+        ) / (
+            np.linalg.norm(result["doc_embeddings"], axis=1) * np.linalg.norm(reference["doc_embeddings"], axis=1)
+        )
+        engine_top = top_k(result["doc_embeddings"], result["query_embeddings"], args.k)
+        top1 = np.mean(engine_top[:, 0] == reference_top[:, 0])
+        overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(engine_top, reference_top)])
+        print(
+            f"{result['engine']:<40}{result['rss_mb']:>8.0f}{result['docs_per_s']:>9.0f}"
+            f"{result['p50_ms']:>8.2f}{result['p95_ms']:>8.2f}"
+            f"{cosine.min():>9.4f}{top1:>7.0%}{overlap:>7.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
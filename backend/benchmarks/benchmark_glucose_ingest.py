@@ -0,0 +1,102 @@
+"""
+Benchmark bulk glucose ingestion
+Builds an NDJSON upload of CGM readings (5-minute interval, with some
+invalid and repeated points), then times body parsing, batch validation and
+a full GlucoseIngestService.ingest against an in-process fake PostgREST
+that honours the (user_id, timestamp) unique index. Uploading the same
+readings a second time checks that they all come back as duplicates.
+
+Usage (from backend/):
+  python -m benchmarks.benchmark_glucose_ingest
+  python -m benchmarks.benchmark_glucose_ingest --readings 10000 --chunk-size 500
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from services.glucose_ingest import GlucoseIngestService, parse_body, validate_readings
+from services.supabase_service import SupabaseService
+
+
+def make_upload(count: int, seed: int) -> bytes:
+    rng = random.Random(seed)
+    start = datetime.now(timezone.utc) - timedelta(minutes=5 * count)
+    lines = []
+    for i in range(count):
+        reading = {
+            "value": round(rng.gauss(120, 25), 1),
+            "timestamp": (start + timedelta(minutes=5 * i)).isoformat()
+        }
+        roll = rng.random()
+        if roll < 0.01:
+            reading["value"] = "high"
+        elif roll < 0.02:
+            reading["timestamp"] = "yesterday"
+        elif roll < 0.04 and lines:
+            lines.append(lines[-1])  # the CGM resent the previous point
+            continue
+        lines.append(json.dumps(reading))
+    return "\n".join(lines).encode()
+
+
+def fake_postgrest():
+    """MockTransport storing readings with a unique (user_id, timestamp)"""
+    stored = set()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        inserted = []
+        for row in json.loads(request.content):
+            key = (row["user_id"], row["timestamp"])
+            if key not in stored:
+                stored.add(key)
+                inserted.append({"id": len(stored), "timestamp": row["timestamp"]})
+        return httpx.Response(201, json=inserted)
+
+    return httpx.MockTransport(handler)
+
+
+async def run(args):
+    body = make_upload(args.readings, args.seed)
+    print(f"{args.readings} readings, {len(body) / 1024:.0f} KiB of NDJSON")
+
+    start = time.perf_counter()
+    items = parse_body(body, "application/x-ndjson")
+    parse_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    validate_readings(items)
+    validate_s = time.perf_counter() - start
+
+    supabase = SupabaseService(rest_url="http://postgrest.test", transport=fake_postgrest())
+    service = GlucoseIngestService(supabase, chunk_size=args.chunk_size)
+    try:
+        start = time.perf_counter()
+        first = await service.ingest("user-1", items)
+        ingest_s = time.perf_counter() - start
+        again = await service.ingest("user-1", items)
+    finally:
+        await supabase.close()
+
+    print(f"  parse     {parse_s * 1000:.1f} ms")
+    print(f"  validate  {validate_s * 1000:.1f} ms")
+    print(f"  ingest    {ingest_s * 1000:.1f} ms end to end ({args.chunk_size} rows per insert)")
+    print(f"first upload:  {first['inserted']} inserted, {first['duplicates']} duplicates, {first['invalid']} invalid")
+    print(f"second upload: {again['inserted']} inserted, {again['duplicates']} duplicates, {again['invalid']} invalid")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, default=10000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
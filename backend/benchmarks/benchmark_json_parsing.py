@@ -0,0 +1,148 @@
+"""
+Fuzz and benchmark the prediction response parser
+Runs the recorded Groq completions in recorded_completions.jsonl through the
+old regex parser and the lenient extractor, then fuzzes them with the
+mistakes LLMs make (truncation, trailing commas, smart quotes, raw newlines,
+stray quotes, surrounding prose) and chunked streaming. Reports how many
+responses each parser recovers and the time per parse.
+
+Usage (from backend/):
+  python -m benchmarks.benchmark_json_parsing
+  python -m benchmarks.benchmark_json_parsing --iterations 20000 --seed 1
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import time
+
+from services.ayurveda_service import AyurvedaService
+from services.json_stream import IncrementalJSONParser, loads_lenient
+
+RECORDED = os.path.join(os.path.dirname(__file__), "recorded_completions.jsonl")
+
+
+def load_completions():
+    with open(RECORDED) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def legacy_parse(text: str):
+    """The regex extraction used before the lenient parser"""
+    match = re.search(r'\{.*\}', text, re.DOTALL)
+    if not match:
+        return None
+    try:
+        data = json.loads(match.group())
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def lenient_parse(text: str):
+    data, _ = loads_lenient(text)
+    return AyurvedaService._validate_prediction(data) if isinstance(data, dict) else None
+
+
+def truncate(text, rng):
+    return text[:rng.randrange(len(text) // 2, len(text))]
+
+
+def trailing_commas(text, rng):
+    return re.sub(r'(["\d\]}])(\s*[\]}])', lambda m: m.group(1) + "," + m.group(2) if rng.random() < 0.5 else m.group(0), text)
+
+
+def smart_quotes(text, rng):
+    return re.sub(r'"(\w+)":', lambda m: f"“{m.group(1)}”:" if rng.random() < 0.5 else m.group(0), text)
+
+
+def raw_newlines(text, rng):
+    return re.sub(r"\. ", lambda m: ".\n" if rng.random() < 0.3 else m.group(0), text)
+
+
+def stray_quotes(text, rng):
+    words = list(re.finditer(r" (\w{4,}) ", text))
+    for match in rng.sample(words, min(3, len(words)))[::-1]:
+        text = text[:match.start(1)] + '"' + match.group(1) + '"' + text[match.end(1):]
+    return text
+
+
+def prose(text, rng):
+    return "Sure! Here is the analysis you asked for:\n```json\n" + text + "\n```\nNote: values are {approximate}."
+
+
+MUTATIONS = [truncate, trailing_commas, smart_quotes, raw_newlines, stray_quotes, prose]
+
+
+def time_per_call(parse, texts, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text in texts:
+            parse(text)
+    return (time.perf_counter() - start) / (repeats * len(texts)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    records = load_completions()
+
+    print(f"{'recorded completion':<34}{'regex':>7}{'lenient':>9}{'recs':>6}{'meals':>7}")
+    for record in records:
+        prediction = lenient_parse(record["completion"])
+        print(
+            f"{record['name']:<34}{'ok' if legacy_parse(record['completion']) else '-':>7}"
+            f"{'ok' if prediction else '-':>9}"
+            f"{len(prediction.recommendations) if prediction else 0:>6}"
+            f"{len(prediction.dietarySuggestions or []) if prediction else 0:>7}"
+        )
+
+    # Only completions that contain a prediction at all are fuzzed
+    sources = [r["completion"] for r in records if lenient_parse(r["completion"])]
+    legacy_ok = lenient_ok = stream_mismatches = 0
+    fuzzed = []
+    for _ in range(args.iterations):
+        text = rng.choice(sources)
+        for mutation in rng.sample(MUTATIONS, rng.randint(1, 3)):
+            text = mutation(text, rng)
+        fuzzed.append(text)
+
+        legacy_ok += legacy_parse(text) is not None
+        prediction = lenient_parse(text)  # must never raise
+        lenient_ok += prediction is not None
+
+        # Streaming in random chunk sizes must agree with parsing the whole text
+        stream = IncrementalJSONParser()
+        position = 0
+        while position < len(text):
+            size = rng.randint(1, 64)
+            for key, index, value in stream.feed(text[position:position + size]):
+                if prediction and key == "recommendations" and index is not None:
+                    if index < len(prediction.recommendations) and value != prediction.recommendations[index]:
+                        stream_mismatches += 1
+            position += size
+
+    print()
+    print(f"fuzzed {args.iterations} completions (seed {args.seed})")
+    print(f"  regex parser recovered    {legacy_ok / args.iterations:>7.1%}")
+    print(f"  lenient parser recovered  {lenient_ok / args.iterations:>7.1%}")
+    print(f"  streamed recommendation mismatches: {stream_mismatches}")
+
+    clean = [r["completion"] for r in records]
+    sample = fuzzed[:200]
+    print()
+    print(f"{'parser':<10}{'recorded us':>13}{'fuzzed us':>11}")
+    for name, parse in (("regex", legacy_parse), ("lenient", lenient_parse)):
+        print(f"{name:<10}{time_per_call(parse, clean, args.repeats):>13.1f}"
+              f"{time_per_call(parse, sample, max(args.repeats // 20, 1)):>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
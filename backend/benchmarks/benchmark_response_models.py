@@ -0,0 +1,116 @@
+"""
+Benchmark the per-user glucose response models on synthetic users
+Simulates users with their own sensitivity to glycemic load, CGM readings
+every 15 minutes and a few logged meals a day, then times each stage of
+train_response_models.py (meal/reading join, features, statistics update,
+batched fit, batched prediction) and compares held-out error of the
+personal models with the food-table estimate.
+
+Usage (from backend/):
+  python -m benchmarks.benchmark_response_models
+  python -m benchmarks.benchmark_response_models --users 5000 --days 90
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from data.food_nutrition import get_food_nutrition
+from services.glucose_estimator import GlucoseEstimator, RISE_PER_GLYCEMIC_LOAD, response_features
+from services.response_model import ResponseModelStore, post_meal_responses
+
+READING_INTERVAL = 15 * 60
+
+
+def simulate_user(rng, estimator, foods, days, meals_per_day):
+    """Meal logs and readings for one user whose rise is sensitivity * damped load"""
+    sensitivity = rng.lognormal(np.log(RISE_PER_GLYCEMIC_LOAD), 0.4)
+    baseline = rng.normal(105, 12)
+
+    reading_times = np.arange(0, days * 86400, READING_INTERVAL, dtype=np.float64)
+    reading_values = baseline + rng.normal(0, 4, len(reading_times))
+
+    meal_times = np.sort(rng.uniform(3600, days * 86400 - 4 * 3600, days * meals_per_day))
+    meals = [
+        [f"{rng.integers(1, 3)} {foods[i]}" for i in rng.choice(len(foods), rng.integers(1, 4), replace=False)]
+        for _ in meal_times
+    ]
+    profiles = [estimator.meal_profile(meal) for meal in meals]
+    rises = sensitivity * np.array([profile["damped_load"] for profile in profiles])
+
+    # A response curve peaking about 45 minutes after each meal
+    for meal_time, rise in zip(meal_times, rises):
+        elapsed = reading_times - meal_time
+        window = (elapsed > 0) & (elapsed < 3 * 3600)
+        reading_values[window] += rise * np.exp(-((elapsed[window] - 2700) / 2400) ** 2)
+
+    return meals, meal_times, reading_times, reading_values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--meals-per-day", type=int, default=3)
+    parser.add_argument("--ridge", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    estimator = GlucoseEstimator()
+    foods = [food['name'].lower() for food in get_food_nutrition()]
+
+    start = time.perf_counter()
+    users = [simulate_user(rng, estimator, foods, args.days, args.meals_per_day) for _ in range(args.users)]
+    print(f"simulated {args.users} users x {args.days} days in {time.perf_counter() - start:.1f}s")
+
+    timings = dict.fromkeys(["join", "features", "update"], 0.0)
+    store = ResponseModelStore(ridge=args.ridge)
+    held_out = []
+    for user_index, (meals, meal_times, reading_times, reading_values) in enumerate(users):
+        user_id = f"user-{user_index}"
+        # The last week of meals is held out for evaluation
+        split = np.searchsorted(meal_times, meal_times[-1] - 7 * 86400)
+
+        start = time.perf_counter()
+        valid, rises = post_meal_responses(meal_times, reading_times, reading_values)
+        timings["join"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        X = response_features([estimator.meal_profile(meal) for meal, keep in zip(meals, valid) if keep])
+        timings["features"] += time.perf_counter() - start
+
+        train = np.flatnonzero(valid) < split
+        start = time.perf_counter()
+        store.update([user_id] * int(train.sum()), X[train], rises[train])
+        timings["update"] += time.perf_counter() - start
+
+        held_out.append((user_id, X[~train], rises[~train]))
+
+    start = time.perf_counter()
+    store.fit()
+    fit_s = time.perf_counter() - start
+
+    user_ids = [user_id for user_id, X, _ in held_out for _ in range(len(X))]
+    X_test = np.vstack([X for _, X, _ in held_out])
+    y_test = np.concatenate([y for _, _, y in held_out])
+
+    start = time.perf_counter()
+    personal = store.predict(user_ids, X_test)
+    predict_s = time.perf_counter() - start
+    heuristic = X_test[:, 2] * RISE_PER_GLYCEMIC_LOAD  # damped load column
+
+    meals = int(store.counts.sum())
+    print(f"{meals:,} training meals, {len(y_test):,} held out")
+    print(f"  join      {timings['join']:.2f}s")
+    print(f"  features  {timings['features']:.2f}s")
+    print(f"  update    {timings['update']:.2f}s")
+    print(f"  fit       {fit_s * 1000:.1f} ms for {args.users} users")
+    print(f"  predict   {predict_s / len(y_test) * 1e6:.2f} us per meal (batched)")
+    print(f"held-out RMSE: food table {np.sqrt(np.mean((heuristic - y_test) ** 2)):.1f} mg/dL, "
+          f"personal {np.sqrt(np.mean((personal - y_test) ** 2)):.1f} mg/dL")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark the NumPy and ChromaDB vector backends
+Measures build time, resident memory and query latency (single, batched and
+metadata-filtered) on random embeddings at increasing corpus sizes.
+
+Usage (from backend/):
+  python -m benchmarks.benchmark_vector_backends
+  python -m benchmarks.benchmark_vector_backends --sizes 50,1000,100000 --backends numpy
+"""
+
+import argparse
+import gc
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from services.vector_backends import ChromaBackend, NumpyBackend
+
+DOSHAS = ["vata", "pitta", "kapha"]
+CATEGORIES = ["concepts", "diet", "metabolism", "conditions", "organs", "foods", "lifestyle"]
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        # Peak RSS on platforms without /proc (KB on Linux, bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_corpus(size: int, dim: int, rng: np.random.Generator):
+    embeddings = rng.standard_normal((size, dim), dtype=np.float32)
+    ids = [f"doc_{i}" for i in range(size)]
+    documents = [f"document {i}" for i in range(size)]
+    metadatas = [
+        {"category": CATEGORIES[i % len(CATEGORIES)], "dosha": DOSHAS[i % len(DOSHAS)]}
+        for i in range(size)
+    ]
+    return ids, documents, embeddings, metadatas
+
+
+def percentiles_ms(timings):
+    timings = np.asarray(timings) * 1000
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+
+def run(backend_name: str, size: int, dim: int, n_queries: int, batch: int, k: int, seed: int):
+    rng = np.random.default_rng(seed)
+    queries = rng.standard_normal((n_queries, dim), dtype=np.float32)
+
+    gc.collect()
+    rss_before = rss_mb()
+    ids, documents, embeddings, metadatas = make_corpus(size, dim, rng)
+    persist_directory = None
+    start = time.perf_counter()
+
+    if backend_name == "numpy":
+        backend = NumpyBackend()
+        backend.add(ids, documents, embeddings, metadatas)
+    else:
+        persist_directory = tempfile.mkdtemp(prefix="chroma_bench_")
+        backend = ChromaBackend(persist_directory, collection_name=f"bench_{size}")
+        step = 5000
+        for i in range(0, size, step):
+            backend.add(ids[i:i + step], documents[i:i + step], embeddings[i:i + step], metadatas[i:i + step])
+
+    build_s = time.perf_counter() - start
+
+    # Only what the backend itself retains should count towards its memory
+    del ids, documents, embeddings, metadatas
+    gc.collect()
+    rss_delta = rss_mb() - rss_before
+
+    single = []
+    for query in queries:
+        start = time.perf_counter()
+        backend.query(query[None, :], n_results=k)
+        single.append(time.perf_counter() - start)
+
+    batched = []
+    for i in range(0, n_queries, batch):
+        start = time.perf_counter()
+        backend.query(queries[i:i + batch], n_results=k)
+        batched.append((time.perf_counter() - start) / len(queries[i:i + batch]))
+
+    filtered = []
+    where = {"$and": [{"dosha": "pitta"}, {"category": {"$in": ["diet", "foods"]}}]}
+    for query in queries:
+        start = time.perf_counter()
+        backend.query(query[None, :], n_results=k, where=where)
+        filtered.append(time.perf_counter() - start)
+
+    if persist_directory:
+        backend.reset()
+        shutil.rmtree(persist_directory, ignore_errors=True)
+        # chromadb keeps one system per process; drop it so the next size gets a fresh client
+        from chromadb.api.client import SharedSystemClient
+        SharedSystemClient.clear_system_cache()
+
+    single_p50, single_p95 = percentiles_ms(single)
+    batched_p50, _ = percentiles_ms(batched)
+    filtered_p50, filtered_p95 = percentiles_ms(filtered)
+    print(
+        f"{backend_name:<7}{size:>10,}{build_s:>10.2f}{rss_delta:>10.1f}"
+        f"{single_p50:>10.3f}{single_p95:>10.3f}{batched_p50:>10.3f}"
+        f"{filtered_p50:>10.3f}{filtered_p95:>10.3f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="50,1000,10000,100000,1000000")
+    parser.add_argument("--backends", default="numpy,chroma")
+    parser.add_argument("--chroma-max-size", type=int, default=100000,
+                        help="skip Chroma above this size (HNSW build time grows quickly)")
+    parser.add_argument("--dim", type=int, default=384, help="all-MiniLM-L6-v2 embedding size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=16)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(
+        f"{'backend':<7}{'docs':>10}{'build s':>10}{'RSS MB':>10}"
+        f"{'p50 ms':>10}{'p95 ms':>10}{'batch ms':>10}{'filt p50':>10}{'filt p95':>10}"
+    )
+    for size in (int(s) for s in args.sizes.split(",")):
+        for backend_name in args.backends.split(","):
+            if backend_name == "chroma" and size > args.chroma_max_size:
+                continue
+            run(backend_name, size, args.dim, args.queries, args.batch, args.k, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""Per-serving glycemic and macronutrient values for GlucoseEstimator
+
+Each food lists the `sources` its values come from (keys of SOURCES).
+Values are rounded approximations for estimating a meal's glycemic load,
+not dietary advice:
+
+- `glycemic_index` (glucose = 100) is a typical value from the
+  International Tables; where a food has several entries it is a rounded
+  middle value, and a `note` names the entry used when it is a close
+  analogue rather than the food itself, or says the tables have none and
+  what was assumed. Foods with negligible carbohydrate have no GI and
+  are given 0, so they add no glycemic load.
+- `carbs_g`, `fiber_g`, `protein_g` and `fat_g` are grams per `serving`,
+  scaled from FoodData Central and rounded.
+- `glucose_effect` (herbs and spices) is not a nutrient value but a model
+  parameter: the fractional change the herb makes to a meal's glucose
+  rise. It is deliberately smaller than the effects the cited reviews
+  report for daily supplementation, since a meal holds a culinary dose.
+
+`aliases` are other names users log a food under; foods with similar
+values share an entry (tofu under paneer, for example).
+"""
+
+SOURCES = {
+    'ITGI': (
+        'Atkinson FS, Foster-Powell K, Brand-Miller JC. International tables of '
+        'glycemic index and glycemic load values: 2008. Diabetes Care. '
+        '2008;31(12):2281-2283.'
+    ),
+    'USDA': (
+        'U.S. Department of Agriculture, Agricultural Research Service. '
+        'FoodData Central (SR Legacy). https://fdc.nal.usda.gov/'
+    ),
+    'BITTER_MELON': (
+        'Peter EL, Kasali FM, Deyno S, et al. Momordica charantia L. lowers '
+        'elevated glycaemia in type 2 diabetes mellitus patients: systematic '
+        'review and meta-analysis. J Ethnopharmacol. 2019;231:311-324.'
+    ),
+    'FENUGREEK': (
+        'Neelakantan N, Narayanan M, de Souza RJ, van Dam RM. Effect of '
+        'fenugreek (Trigonella foenum-graecum L.) intake on glycemia: a '
+        'meta-analysis of clinical trials. Nutr J. 2014;13:7.'
+    ),
+    'CINNAMON': (
+        'Allen RW, Schwartzman E, Baker WL, Coleman CI, Phung OJ. Cinnamon use '
+        'in type 2 diabetes: an updated systematic review and meta-analysis. '
+        'Ann Fam Med. 2013;11(5):452-459.'
+    ),
+    'TURMERIC': (
+        'Chuengsamarn S, Rattanamongkolgul S, Luechapudiporn R, et al. Curcumin '
+        'extract for prevention of type 2 diabetes. Diabetes Care. '
+        '2012;35(11):2121-2127.'
+    ),
+}
+
+
+def get_food_nutrition():
+    """Return the nutrition table, one dict per food"""
+    return [
+        {
+            'name': 'Bitter Melon',
+            'aliases': ['karela', 'bitter gourd'],
+            'serving': '1 cup cooked',
+            'glycemic_index': 15, 'carbs_g': 5, 'fiber_g': 2.5, 'protein_g': 1, 'fat_g': 0.2,
+            'glucose_effect': -0.1,
+            'note': 'No ITGI entry; low GI assumed for a non-starchy vegetable',
+            'sources': ['USDA', 'BITTER_MELON']
+        },
+        {
+            'name': 'Fenugreek Seeds',
+            'aliases': ['methi', 'fenugreek'],
+            'serving': '1 tsp seeds',
+            'glycemic_index': 0, 'carbs_g': 2, 'fiber_g': 1, 'protein_g': 1, 'fat_g': 0.3,
+            'glucose_effect': -0.1,
+            'sources': ['USDA', 'FENUGREEK']
+        },
+        {
+            'name': 'Turmeric',
+            'aliases': ['haldi', 'golden milk'],
+            'serving': '1 tsp',
+            'glycemic_index': 0, 'carbs_g': 0, 'fiber_g': 0, 'protein_g': 0, 'fat_g': 0,
+            'glucose_effect': -0.03,
+            'sources': ['USDA', 'TURMERIC']
+        },
+        {
+            'name': 'Cinnamon',
+            'aliases': ['dalchini'],
+            'serving': '1 tsp',
+            'glycemic_index': 0, 'carbs_g': 0, 'fiber_g': 1, 'protein_g': 0, 'fat_g': 0,
+            'glucose_effect': -0.05,
+            'sources': ['USDA', 'CINNAMON']
+        },
+        {
+            'name': 'White Rice',
+            'aliases': ['rice', 'steamed rice', 'jeera rice', 'chawal'],
+            'serving': '1 cup cooked',
+            'glycemic_index': 73, 'carbs_g': 45, 'fiber_g': 0.6, 'protein_g': 4, 'fat_g': 0.4,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Basmati Rice',
+            'aliases': ['basmati'],
+            'serving': '1 cup cooked',
+            'glycemic_index': 58, 'carbs_g': 45, 'fiber_g': 0.7, 'protein_g': 4.4, 'fat_g': 0.5,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Brown Rice',
+            'aliases': [],
+            'serving': '1 cup cooked',
+            'glycemic_index': 68, 'carbs_g': 45, 'fiber_g': 3.5, 'protein_g': 5, 'fat_g': 1.8,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Whole Wheat Roti',
+            'aliases': ['roti', 'chapati', 'chapatti', 'phulka', 'paratha'],
+            'serving': '1 roti',
+            'glycemic_index': 62, 'carbs_g': 18, 'fiber_g': 3, 'protein_g': 3, 'fat_g': 3,
+            'note': 'ITGI wheat chapati',
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Naan',
+            'aliases': ['garlic naan', 'butter naan'],
+            'serving': '1 piece',
+            'glycemic_index': 71, 'carbs_g': 45, 'fiber_g': 2, 'protein_g': 8, 'fat_g': 5,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'White Bread',
+            'aliases': ['bread', 'toast', 'sandwich', 'pav'],
+            'serving': '1 slice',
+            'glycemic_index': 75, 'carbs_g': 14, 'fiber_g': 0.8, 'protein_g': 2.6, 'fat_g': 1,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Oatmeal',
+            'aliases': ['oats', 'porridge', 'oat porridge'],
+            'serving': '1 cup cooked',
+            'glycemic_index': 55, 'carbs_g': 27, 'fiber_g': 4, 'protein_g': 6, 'fat_g': 3.5,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Cornflakes',
+            'aliases': ['cereal', 'breakfast cereal'],
+            'serving': '1 cup',
+            'glycemic_index': 81, 'carbs_g': 24, 'fiber_g': 1, 'protein_g': 2, 'fat_g': 0.1,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Barley',
+            'aliases': ['jau', 'barley water'],
+            'serving': '1 cup cooked',
+            'glycemic_index': 28, 'carbs_g': 44, 'fiber_g': 6, 'protein_g': 3.5, 'fat_g': 0.4,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Millet',
+            'aliases': ['bajra', 'jowar', 'ragi', 'foxtail millet'],
+            'serving': '1 cup cooked',
+            'glycemic_index': 67, 'carbs_g': 41, 'fiber_g': 2.3, 'protein_g': 6, 'fat_g': 1.7,
+            'note': 'ITGI millet porridge; bajra, jowar and ragi vary around it',
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Quinoa',
+            'aliases': [],
+            'serving': '1 cup cooked',
+            'glycemic_index': 53, 'carbs_g': 39, 'fiber_g': 5, 'protein_g': 8, 'fat_g': 3.6,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Pasta',
+            'aliases': ['spaghetti', 'noodles', 'macaroni'],
+            'serving': '1 cup cooked',
+            'glycemic_index': 49, 'carbs_g': 43, 'fiber_g': 2.5, 'protein_g': 8, 'fat_g': 1.3,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Mung Dal',
+            'aliases': ['moong dal', 'mung beans', 'dal', 'daal', 'kitchari', 'khichdi'],
+            'serving': '1 cup cooked',
+            'glycemic_index': 31, 'carbs_g': 39, 'fiber_g': 15, 'protein_g': 14, 'fat_g': 0.8,
+            'note': 'ITGI mung beans',
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Lentils',
+            'aliases': ['masoor dal', 'toor dal', 'lentil soup'],
+            'serving': '1 cup cooked',
+            'glycemic_index': 32, 'carbs_g': 40, 'fiber_g': 15.6, 'protein_g': 18, 'fat_g': 0.8,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Chickpeas',
+            'aliases': ['chana', 'chole', 'hummus', 'garbanzo beans'],
+            'serving': '1 cup cooked',
+            'glycemic_index': 28, 'carbs_g': 45, 'fiber_g': 12.5, 'protein_g': 14.5, 'fat_g': 4,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Kidney Beans',
+            'aliases': ['rajma', 'beans'],
+            'serving': '1 cup cooked',
+            'glycemic_index': 24, 'carbs_g': 40, 'fiber_g': 13, 'protein_g': 15, 'fat_g': 0.9,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Potato',
+            'aliases': ['aloo', 'potatoes', 'fries', 'mashed potato'],
+            'serving': '1 medium',
+            'glycemic_index': 78, 'carbs_g': 37, 'fiber_g': 4, 'protein_g': 4, 'fat_g': 0.2,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Sweet Potato',
+            'aliases': ['shakarkandi', 'yam'],
+            'serving': '1 medium',
+            'glycemic_index': 63, 'carbs_g': 27, 'fiber_g': 3.8, 'protein_g': 2, 'fat_g': 0.2,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Spinach',
+            'aliases': ['palak', 'greens', 'saag', 'salad'],
+            'serving': '1 cup cooked',
+            'glycemic_index': 15, 'carbs_g': 7, 'fiber_g': 4.3, 'protein_g': 5, 'fat_g': 0.5,
+            'note': 'No ITGI entry; low GI assumed for a non-starchy vegetable',
+            'sources': ['USDA']
+        },
+        {
+            'name': 'Okra',
+            'aliases': ['bhindi', 'ladies finger'],
+            'serving': '1 cup cooked',
+            'glycemic_index': 20, 'carbs_g': 7, 'fiber_g': 3, 'protein_g': 2, 'fat_g': 0.3,
+            'note': 'No ITGI entry; low GI assumed for a non-starchy vegetable',
+            'sources': ['USDA']
+        },
+        {
+            'name': 'Cauliflower',
+            'aliases': ['gobi', 'broccoli', 'vegetables', 'sabzi'],
+            'serving': '1 cup cooked',
+            'glycemic_index': 15, 'carbs_g': 5, 'fiber_g': 2, 'protein_g': 2, 'fat_g': 0.3,
+            'note': 'No ITGI entry; low GI assumed for a non-starchy vegetable',
+            'sources': ['USDA']
+        },
+        {
+            'name': 'Banana',
+            'aliases': ['bananas', 'kela'],
+            'serving': '1 medium',
+            'glycemic_index': 51, 'carbs_g': 27, 'fiber_g': 3.1, 'protein_g': 1.3, 'fat_g': 0.4,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Apple',
+            'aliases': ['apples', 'pear'],
+            'serving': '1 medium',
+            'glycemic_index': 36, 'carbs_g': 25, 'fiber_g': 4.4, 'protein_g': 0.5, 'fat_g': 0.3,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Mango',
+            'aliases': ['mangoes', 'aam', 'mango lassi'],
+            'serving': '1 cup sliced',
+            'glycemic_index': 51, 'carbs_g': 25, 'fiber_g': 2.6, 'protein_g': 1.4, 'fat_g': 0.6,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Orange',
+            'aliases': ['oranges', 'tangerine'],
+            'serving': '1 medium',
+            'glycemic_index': 43, 'carbs_g': 15, 'fiber_g': 3, 'protein_g': 1.2, 'fat_g': 0.2,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Fruit Juice',
+            'aliases': ['juice', 'orange juice', 'apple juice'],
+            'serving': '1 cup',
+            'glycemic_index': 50, 'carbs_g': 26, 'fiber_g': 0.5, 'protein_g': 1.7, 'fat_g': 0.5,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Dates',
+            'aliases': ['date', 'khajur'],
+            'serving': '3 dates',
+            'glycemic_index': 42, 'carbs_g': 18, 'fiber_g': 2, 'protein_g': 0.5, 'fat_g': 0.1,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Milk',
+            'aliases': ['chai', 'tea with milk', 'lassi'],
+            'serving': '1 cup',
+            'glycemic_index': 39, 'carbs_g': 12, 'fiber_g': 0, 'protein_g': 8, 'fat_g': 8,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Yogurt',
+            'aliases': ['curd', 'dahi', 'raita', 'buttermilk', 'chaas'],
+            'serving': '1 cup',
+            'glycemic_index': 41, 'carbs_g': 11, 'fiber_g': 0, 'protein_g': 9, 'fat_g': 8,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Paneer',
+            'aliases': ['cottage cheese', 'tofu', 'cheese'],
+            'serving': '100g',
+            'glycemic_index': 0, 'carbs_g': 3, 'fiber_g': 0, 'protein_g': 18, 'fat_g': 20,
+            'sources': ['USDA']
+        },
+        {
+            'name': 'Ghee',
+            'aliases': ['butter', 'clarified butter', 'oil'],
+            'serving': '1 tbsp',
+            'glycemic_index': 0, 'carbs_g': 0, 'fiber_g': 0, 'protein_g': 0, 'fat_g': 14,
+            'sources': ['USDA']
+        },
+        {
+            'name': 'Eggs',
+            'aliases': ['egg', 'omelette', 'boiled egg'],
+            'serving': '2 eggs',
+            'glycemic_index': 0, 'carbs_g': 1, 'fiber_g': 0, 'protein_g': 12, 'fat_g': 10,
+            'sources': ['USDA']
+        },
+        {
+            'name': 'Chicken',
+            'aliases': ['chicken curry', 'meat', 'mutton', 'lamb'],
+            'serving': '100g',
+            'glycemic_index': 0, 'carbs_g': 0, 'fiber_g': 0, 'protein_g': 27, 'fat_g': 4,
+            'sources': ['USDA']
+        },
+        {
+            'name': 'Fish',
+            'aliases': ['salmon', 'prawns', 'shrimp'],
+            'serving': '100g',
+            'glycemic_index': 0, 'carbs_g': 0, 'fiber_g': 0, 'protein_g': 22, 'fat_g': 5,
+            'sources': ['USDA']
+        },
+        {
+            'name': 'Almonds',
+            'aliases': ['nuts', 'badam', 'walnuts', 'cashews', 'peanuts'],
+            'serving': '1 oz',
+            'glycemic_index': 0, 'carbs_g': 6, 'fiber_g': 3.5, 'protein_g': 6, 'fat_g': 14,
+            'sources': ['USDA']
+        },
+        {
+            'name': 'Sugar',
+            'aliases': ['sweets', 'dessert', 'mithai', 'cake', 'cookies', 'biscuits', 'chocolate', 'ice cream'],
+            'serving': '1 tbsp',
+            'glycemic_index': 65, 'carbs_g': 12.5, 'fiber_g': 0, 'protein_g': 0, 'fat_g': 0,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Honey',
+            'aliases': ['madhu'],
+            'serving': '1 tbsp',
+            'glycemic_index': 61, 'carbs_g': 17, 'fiber_g': 0, 'protein_g': 0, 'fat_g': 0,
+            'sources': ['ITGI', 'USDA']
+        },
+        {
+            'name': 'Jaggery',
+            'aliases': ['gur', 'gud'],
+            'serving': '1 tbsp',
+            'glycemic_index': 84, 'carbs_g': 14, 'fiber_g': 0, 'protein_g': 0, 'fat_g': 0,
+            'note': 'No ITGI entry; GI typical of unrefined cane sugar',
+            'sources': ['USDA']
+        },
+        {
+            'name': 'Soft Drink',
+            'aliases': ['soda', 'cola', 'coke', 'pepsi', 'soft drinks'],
+            'serving': '1 can',
+            'glycemic_index': 63, 'carbs_g': 39, 'fiber_g': 0, 'protein_g': 0, 'fat_g': 0,
+            'sources': ['ITGI', 'USDA']
+        }
+    ]
@@ -0,0 +1,28 @@
+"""
+Gunicorn configuration for multi-worker deployments
+Loads the app (and the embedding model) once in the master process before
+forking, so every worker shares the model weights copy-on-write instead of
+holding its own copy.
+
+Usage:
+  gunicorn main:app -c gunicorn.conf.py
+"""
+
+import gc
+import os
+
+# Load the embedding model at import in the master (see main.py)
+os.environ.setdefault("PRELOAD_EMBEDDING_MODEL", "true")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# Services, connection pools and warmup run per worker through the app lifespan
+
+
+def pre_fork(server, worker):
+    # Move preloaded objects out of the GC's reach so collections in the
+    # workers do not touch (and copy) the shared pages
+    gc.freeze()
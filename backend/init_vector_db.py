@@ -31,11 +31,7 @@ def main():
         
         # Clear existing collection
         print("Clearing existing collection...")
-        vector_service.client.delete_collection("ayurveda_knowledge")
-        vector_service.collection = vector_service.client.create_collection(
-            name="ayurveda_knowledge",
-            metadata={"hnsw:space": "cosine"}
-        )
+        vector_service.reset()
     
     # Initialize knowledge base
     print("\nLoading Ayurvedic knowledge corpus...")
@@ -1,18 +1,31 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
+import math
 import os
+import json
+import asyncio
+import logging
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import jwt
-from jwt import PyJWKClient
 import httpx
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from services.auth_service import JWKSKeyStore, TokenVerifier, VerifiedTokenCache
 from services.supabase_service import SupabaseService
-from services.vector_service import VectorService
+from services.profile_cache import ProfileCache, create_profile_backend
+from services.vector_service import VectorService, get_embedding_model
 from services.ayurveda_service import AyurvedaService
+from services.write_behind import WriteBehindQueue
+from services.single_flight import SingleFlight
+from services.prediction_cache import prediction_request_key
+from services.glucose_ingest import GlucoseIngestService, create_idempotency_store, parse_body
+from services.history import decode_cursor, encode_cursor, select_columns, stream_ndjson
+from services.downsampling import bucket_points, downsample_readings, parse_bucket
 from models.schemas import (
     PredictionRequest,
     PredictionResponse,
@@ -24,7 +37,116 @@ from models.schemas import (
 
 load_dotenv()
 
-app = FastAPI(title="Ayurvedic Health Predictor API")
+logger = logging.getLogger(__name__)
+
+# Auth0 Configuration
+AUTH0_DOMAIN = os.getenv("AUTH0_DOMAIN")
+AUTH0_API_AUDIENCE = os.getenv("AUTH0_API_AUDIENCE")
+AUTH0_ALGORITHMS = ["RS256"]
+
+security = HTTPBearer()
+
+# Signing keys are loaded once per process and refreshed in the background;
+# verified tokens are cached by hash until they expire
+token_verifier = TokenVerifier(
+    key_store=JWKSKeyStore(
+        f"https://{AUTH0_DOMAIN}/.well-known/jwks.json",
+        refresh_interval=float(os.getenv("JWKS_REFRESH_INTERVAL", "3600"))
+    ),
+    issuer=f"https://{AUTH0_DOMAIN}/",
+    audience=AUTH0_API_AUDIENCE,
+    algorithms=AUTH0_ALGORITHMS,
+    token_cache=VerifiedTokenCache(
+        max_size=int(os.getenv("TOKEN_CACHE_SIZE", "10000")),
+        max_ttl=float(os.getenv("TOKEN_CACHE_TTL", "300"))
+    )
+)
+
+# Services are created on startup rather than at import, so configuration
+# errors surface in the server log instead of as import errors
+supabase_service: Optional[SupabaseService] = None
+vector_service: Optional[VectorService] = None
+ayurveda_service: Optional[AyurvedaService] = None
+prediction_writer: Optional[WriteBehindQueue] = None
+glucose_ingest: Optional[GlucoseIngestService] = None
+# /api/predict calls in flight, by user and canonical request
+prediction_requests = SingleFlight()
+
+MAX_BULK_READINGS = int(os.getenv("MAX_BULK_READINGS", "10000"))
+# Bulk upload bodies are refused beyond this size before they are parsed
+MAX_BULK_BODY_BYTES = int(os.getenv("MAX_BULK_BODY_BYTES", str(10 * 2 ** 20)))
+# Upper bound on points returned for charts (downsampled or bucketed)
+MAX_CHART_POINTS = 5000
+# Longest window (days) downsampled from raw readings; longer ones are
+# aggregated in the database so a chart never loads years of readings
+MAX_RAW_CHART_DAYS = int(os.getenv("MAX_RAW_CHART_DAYS", "30"))
+
+# Load the embedding model at import when running under a pre-forking server
+# (gunicorn --preload) so worker processes share its memory
+if os.getenv("PRELOAD_EMBEDDING_MODEL", "false").lower() == "true":
+    get_embedding_model(VectorService.MODEL_NAME)
+
+
+async def warmup(app: FastAPI):
+    """Load the model, index the corpus and precompute food suggestions"""
+    try:
+        await asyncio.to_thread(vector_service.warmup)
+        await ayurveda_service.refresh_food_recommendations()
+        app.state.ready = True
+    except Exception as e:
+        logger.exception("Warmup failed")
+        app.state.warmup_error = str(e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global supabase_service, vector_service, ayurveda_service, prediction_writer, glucose_ingest
+    
+    # Initialize Services
+    profile_cache = ProfileCache(
+        create_profile_backend(
+            os.getenv("PROFILE_CACHE_BACKEND", "memory"),
+            max_size=int(os.getenv("PROFILE_CACHE_SIZE", "10000")),
+            redis_url=os.getenv("REDIS_URL")
+        ),
+        ttl=float(os.getenv("PROFILE_CACHE_TTL", "300"))
+    )
+    supabase_service = SupabaseService(profile_cache=profile_cache)
+    vector_service = VectorService()
+    ayurveda_service = AyurvedaService(vector_service, supabase_service)
+    prediction_writer = WriteBehindQueue(
+        supabase_service.insert_predictions,
+        batch_size=int(os.getenv("PREDICTION_WRITE_BATCH_SIZE", "100")),
+        flush_interval=float(os.getenv("PREDICTION_WRITE_INTERVAL", "1.0")),
+        max_queue=int(os.getenv("PREDICTION_WRITE_QUEUE_SIZE", "10000"))
+    )
+    prediction_writer.start()
+    glucose_ingest = GlucoseIngestService(
+        supabase_service,
+        chunk_size=int(os.getenv("GLUCOSE_INSERT_CHUNK_SIZE", "1000")),
+        idempotency_ttl=float(os.getenv("IDEMPOTENCY_TTL", "86400")),
+        responses=create_idempotency_store(
+            os.getenv("IDEMPOTENCY_BACKEND", "memory"),
+            redis_url=os.getenv("REDIS_URL")
+        )
+    )
+    
+    app.state.ready = False
+    app.state.warmup_error = None
+    token_verifier.key_store.start()
+    warmup_task = asyncio.create_task(warmup(app))
+    
+    yield
+    
+    warmup_task.cancel()
+    await token_verifier.key_store.stop()
+    # Flush queued predictions before the connection pool closes
+    await prediction_writer.stop()
+    await glucose_ingest.close()
+    await supabase_service.close()
+
+
+app = FastAPI(title="Ayurvedic Health Predictor API", lifespan=lifespan)
 
 # CORS Configuration
 app.add_middleware(
@@ -35,45 +157,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Auth0 Configuration
-AUTH0_DOMAIN = os.getenv("AUTH0_DOMAIN")
-AUTH0_API_AUDIENCE = os.getenv("AUTH0_API_AUDIENCE")
-AUTH0_ALGORITHMS = ["RS256"]
-
-security = HTTPBearer()
-
-# Initialize Services
-supabase_service = SupabaseService()
-vector_service = VectorService()
-ayurveda_service = AyurvedaService(vector_service, supabase_service)
-
 
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """Verify JWT token from Auth0"""
     token = credentials.credentials
     
     try:
-        # Get Auth0 public key
-        jwks_url = f"https://{AUTH0_DOMAIN}/.well-known/jwks.json"
-        jwks_client = PyJWKClient(jwks_url)
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
-        
-        # Decode and verify token
-        payload = jwt.decode(
-            token,
-            signing_key.key,
-            algorithms=AUTH0_ALGORITHMS,
-            audience=AUTH0_API_AUDIENCE,
-            issuer=f"https://{AUTH0_DOMAIN}/"
-        )
-        
-        return payload
+        return await token_verifier.verify(token)
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has expired"
         )
-    except jwt.JWTClaimsError:
+    except (jwt.InvalidAudienceError, jwt.InvalidIssuerError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token claims"
@@ -85,6 +181,22 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
         )
 
 
+async def run_until_disconnected(http_request: Request, coro, poll_interval: float = 0.5):
+    """Await `coro`, cancelling it if the client disconnects before it finishes"""
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
 @app.get("/")
 async def root():
     return {"message": "Ayurvedic Health Predictor API", "status": "running"}
@@ -95,35 +207,96 @@ async def health_check():
     return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Report whether warmup has finished and the service can answer quickly"""
+    if app.state.warmup_error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Warmup failed: {app.state.warmup_error}"
+        )
+    if not app.state.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Warming up"
+        )
+    return {
+        "status": "ready",
+        "timestamp": datetime.utcnow().isoformat(),
+        "predictions": ayurveda_service.stats(),
+        "search": vector_service.stats(),
+        "prediction_requests": prediction_requests.stats(),
+        "prediction_writes": prediction_writer.stats(),
+        "profiles": supabase_service.profile_cache.stats()
+    }
+
+
+def save_prediction(user_id: str, meal_log: Optional[dict], prediction: dict):
+    """Queue a prediction for storage, linked to its meal log; never waits"""
+    prediction_writer.put({
+        "user_id": user_id,
+        "meal_log_id": meal_log.get("id") if meal_log else None,
+        "predicted_glucose": prediction["predictedGlucose"],
+        "explanation": prediction["explanation"],
+        "recommendations": prediction["recommendations"],
+        "dietary_suggestions": prediction.get("dietarySuggestions")
+    })
+
+
+async def log_and_predict(user_id: str, request: PredictionRequest, meal_items: List[str]) -> PredictionResponse:
+    """Log the meal and generate its prediction concurrently, then queue the prediction for storage"""
+    # The meal log is its own task, so it completes even if every client disconnects
+    log_task = asyncio.ensure_future(supabase_service.log_meal(
+        user_id=user_id,
+        meal_items=meal_items,
+        exercise=request.exercise.dict() if request.exercise else None,
+        lifestyle_factors=request.lifestyleFactors,
+        dosha=request.dosha
+    ))
+    prediction = await ayurveda_service.generate_prediction(
+        meal_items=meal_items,
+        exercise=request.exercise,
+        lifestyle_factors=request.lifestyleFactors,
+        dosha=request.dosha,
+        user_id=user_id,
+        use_cache=request.useCache
+    )
+    save_prediction(user_id, await asyncio.shield(log_task), prediction.dict())
+    return prediction
+
+
 @app.post("/api/predict", response_model=PredictionResponse)
 async def predict_glucose(
     request: PredictionRequest,
+    http_request: Request,
     user: dict = Depends(verify_token)
 ):
     """Generate glucose prediction and Ayurvedic recommendations"""
     user_id = user.get("sub")
     
+    meal_items = [item.value for item in request.mealItems]
+    
+    # Double submits and client retries of the same meal join the request
+    # already running and share its meal log and prediction. The shared work
+    # runs in its own task, shielded from each caller: a client that
+    # disconnects only stops its own wait, and the work is cancelled once
+    # every caller has gone.
+    key = (user_id, prediction_request_key(
+        meal_items, request.exercise, request.lifestyleFactors, request.dosha, request.useCache
+    ))
+    
     try:
-        # Log the food intake
-        await supabase_service.log_meal(
-            user_id=user_id,
-            meal_items=[item.value for item in request.mealItems],
-            exercise=request.exercise.dict() if request.exercise else None,
-            lifestyle_factors=request.lifestyleFactors,
-            dosha=request.dosha
+        return await run_until_disconnected(
+            http_request,
+            prediction_requests.do(key, lambda: log_and_predict(user_id, request, meal_items))
         )
-        
-        # Generate prediction using Ayurvedic principles
-        prediction = await ayurveda_service.generate_prediction(
-            meal_items=[item.value for item in request.mealItems],
-            exercise=request.exercise,
-            lifestyle_factors=request.lifestyleFactors,
-            dosha=request.dosha,
-            user_id=user_id
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Prediction timed out, please try again"
         )
-        
-        return prediction
-        
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -131,6 +304,79 @@ async def predict_glucose(
         )
 
 
+def log_meal_failure(task: asyncio.Task):
+    """Retrieve a background meal log's error so a disconnected stream still reports it"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Meal log failed: %r", task.exception())
+
+
+def save_when_logged(user_id: str, log_task: asyncio.Task, prediction: dict):
+    """Queue the prediction for storage once its meal log is written"""
+    def save(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is None:
+            save_prediction(user_id, task.result(), prediction)
+    log_task.add_done_callback(save)
+
+
+def sse_event(event: str, data) -> str:
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/api/predict/stream")
+async def predict_glucose_stream(
+    request: PredictionRequest,
+    user: dict = Depends(verify_token)
+):
+    """Stream the glucose prediction as Server-Sent Events
+    
+    Emits `token` events with the raw model output, `field`, `recommendation`
+    and `dietarySuggestion` events as each part is generated, and a final
+    `result` event carrying the complete PredictionResponse (or `error`).
+    """
+    user_id = user.get("sub")
+    
+    meal_items = [item.value for item in request.mealItems]
+    
+    async def event_stream():
+        # The meal is logged while the prediction streams. The log is its own
+        # task, so it completes (and the prediction is saved) even if the
+        # client disconnects; Starlette cancels this generator then, which
+        # closes the Groq stream and releases its concurrency slot
+        log_task = asyncio.ensure_future(supabase_service.log_meal(
+            user_id=user_id,
+            meal_items=meal_items,
+            exercise=request.exercise.dict() if request.exercise else None,
+            lifestyle_factors=request.lifestyleFactors,
+            dosha=request.dosha
+        ))
+        log_task.add_done_callback(log_meal_failure)
+        try:
+            async for event, data in ayurveda_service.stream_prediction(
+                meal_items=meal_items,
+                exercise=request.exercise,
+                lifestyle_factors=request.lifestyleFactors,
+                dosha=request.dosha,
+                user_id=user_id,
+                use_cache=request.useCache
+            ):
+                if event == "result":
+                    # As in /api/predict, the result follows a successful meal log
+                    save_when_logged(user_id, log_task, data)
+                    await asyncio.shield(log_task)
+                yield sse_event(event, data)
+        except asyncio.TimeoutError:
+            yield sse_event("error", {"detail": "Prediction timed out, please try again"})
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Error generating prediction: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/api/glucose-reading")
 async def add_glucose_reading(
     reading: GlucoseReading,
@@ -154,17 +400,159 @@ async def add_glucose_reading(
         )
 
 
+async def read_body(http_request: Request, limit: int) -> bytes:
+    """The request body, refused with a 413 as soon as it is known to exceed `limit` bytes"""
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Body larger than {limit} bytes"
+    )
+    content_length = http_request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > limit:
+        raise too_large
+    
+    # Chunked uploads have no Content-Length, so count while reading
+    chunks, size = [], 0
+    async for chunk in http_request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise too_large
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@app.post("/api/glucose-readings/bulk")
+async def add_glucose_readings(
+    http_request: Request,
+    user: dict = Depends(verify_token)
+):
+    """Log many glucose readings at once, e.g. a CGM syncing after being offline
+    
+    The body is a JSON array or NDJSON (application/x-ndjson) of readings
+    shaped like GlucoseReading, of at most MAX_BULK_BODY_BYTES. Readings
+    already stored for the same timestamp are reported as duplicates, so
+    uploads can safely be retried; an Idempotency-Key header makes a retry
+    return the original results (see GlucoseIngestService).
+    """
+    user_id = user.get("sub")
+    
+    body = await read_body(http_request, MAX_BULK_BODY_BYTES)
+    try:
+        items = parse_body(body, http_request.headers.get("content-type", ""))
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid body: {str(e)}"
+        )
+    if len(items) > MAX_BULK_READINGS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {MAX_BULK_READINGS} readings per request"
+        )
+    
+    try:
+        return await glucose_ingest.ingest(user_id, items, http_request.headers.get("idempotency-key"))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error logging glucose readings: {str(e)}"
+        )
+
+
+async def history_response(
+    table: str,
+    user_id: str,
+    days: int,
+    limit: int,
+    cursor: Optional[str],
+    fields: Optional[str],
+    format: Literal["json", "ndjson"]
+):
+    """One page of history as JSON with a `next_cursor`, or the whole window as NDJSON"""
+    try:
+        columns = select_columns(table, fields)
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if format == "ndjson":
+        return StreamingResponse(
+            stream_ndjson(
+                supabase_service, table, user_id, columns,
+                start=datetime.utcnow() - timedelta(days=days), after=after, page_size=limit
+            ),
+            media_type="application/x-ndjson"
+        )
+    
+    fetch = supabase_service.get_glucose_history if table == "glucose_readings" else supabase_service.get_meal_history
+    page = await fetch(user_id, days, columns=columns, limit=limit, after=after)
+    return {
+        "data": page,
+        "next_cursor": encode_cursor(page[-1]) if len(page) == limit else None
+    }
+
+
 @app.get("/api/glucose-history")
 async def get_glucose_history(
-    days: int = 30,
+    days: int = Query(30, ge=1, le=3650),
+    limit: int = Query(1000, ge=1, le=5000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
+    points: Optional[int] = Query(None, ge=3, le=MAX_CHART_POINTS),
+    bucket: Optional[str] = None,
     user: dict = Depends(verify_token)
 ):
-    """Get user's glucose reading history"""
+    """Get user's glucose reading history, newest first
+    
+    Returns `limit` readings and a `next_cursor` to pass back for the next
+    page; `fields` selects columns. `format=ndjson` streams every reading
+    in the window instead.
+    
+    For charts, `points=N` returns at most N readings (oldest first) chosen
+    to keep the curve's shape, and `bucket=15m|1h|1d` returns per-bucket
+    min/mean/max and percentiles, so the payload follows the chart width
+    rather than the number of readings. Beyond MAX_RAW_CHART_DAYS, `points`
+    returns at most N bucket means (with their min and max) instead.
+    """
     user_id = user.get("sub")
+    end = datetime.utcnow()
+    start = end - timedelta(days=days)
     
     try:
-        history = await supabase_service.get_glucose_history(user_id, days)
-        return {"data": history}
+        if bucket:
+            try:
+                bucket_seconds = parse_bucket(bucket)
+            except ValueError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            if days * 86400 / bucket_seconds > MAX_CHART_POINTS:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"bucket too small for {days} days (at most {MAX_CHART_POINTS} buckets)"
+                )
+            buckets = await supabase_service.get_glucose_buckets(user_id, start, end, bucket_seconds)
+            return {"data": buckets, "bucket": bucket}
+        
+        if points and days > MAX_RAW_CHART_DAYS:
+            # One bucket short, since epoch-aligned buckets can straddle both ends
+            bucket_seconds = math.ceil(days * 86400 / (points - 1))
+            buckets = await supabase_service.get_glucose_buckets(user_id, start, end, bucket_seconds)
+            return {
+                "data": bucket_points(buckets),
+                "total": sum(bucket["readings"] for bucket in buckets),
+                "bucket_seconds": bucket_seconds
+            }
+        
+        if points:
+            readings = await supabase_service.get_rows_between(
+                "glucose_readings", user_id, "glucose_value", start, page_size=5000
+            )
+            return {"data": downsample_readings(readings, points), "total": len(readings)}
+        
+        return await history_response("glucose_readings", user_id, days, limit, cursor, fields, format)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -180,7 +568,7 @@ async def get_profile(user: dict = Depends(verify_token)):
     try:
         profile = await supabase_service.get_user_profile(user_id)
         if not profile:
-            # Create default profile
+            # First login: create a default profile (idempotent if requests race)
             profile = await supabase_service.create_user_profile(
                 user_id=user_id,
                 email=user.get("email"),
@@ -242,15 +630,20 @@ async def get_food_suggestions(
 
 @app.get("/api/meal-history")
 async def get_meal_history(
-    days: int = 7,
+    days: int = Query(7, ge=1, le=3650),
+    limit: int = Query(1000, ge=1, le=5000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    format: Literal["json", "ndjson"] = "json",
     user: dict = Depends(verify_token)
 ):
-    """Get user's meal history"""
+    """Get user's meal history, newest first (paged like /api/glucose-history)"""
     user_id = user.get("sub")
     
     try:
-        history = await supabase_service.get_meal_history(user_id, days)
-        return {"data": history}
+        return await history_response("meal_logs", user_id, days, limit, cursor, fields, format)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -18,6 +18,7 @@ class PredictionRequest(BaseModel):
     exercise: Optional[Exercise] = None
     lifestyleFactors: str = ""
     dosha: str = "Vata-Pitta"
+    useCache: bool = True  # False forces a fresh prediction
 
 
 class DietarySuggestion(BaseModel):
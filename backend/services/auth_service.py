@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import jwt
+
+logger = logging.getLogger(__name__)
+
+
+class JWKSKeyStore:
+    """Process-wide store of JWKS signing keys, refreshed in the background"""
+
+    def __init__(
+        self,
+        jwks_url: str,
+        refresh_interval: float = 3600,
+        min_refresh_interval: float = 30,
+        fetcher: Optional[Callable[[], Awaitable[Dict[str, Any]]]] = None
+    ):
+        self.jwks_url = jwks_url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+
+        # The fetcher can be swapped for a local JWKS stub in tests
+        self._fetcher = fetcher or self._fetch_jwks
+        self._keys: Dict[str, jwt.PyJWK] = {}
+        self._last_refresh: Optional[float] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def _fetch_jwks(self) -> Dict[str, Any]:
+        """Download the JWKS document"""
+        async with httpx.AsyncClient(timeout=10) as client:
+            response = await client.get(self.jwks_url)
+            response.raise_for_status()
+            return response.json()
+
+    async def refresh(self):
+        """Reload all signing keys from the JWKS endpoint"""
+        jwks = await self._fetcher()
+        keys = {}
+        for key in jwt.PyJWKSet.from_dict(jwks).keys:
+            if key.key_id:
+                keys[key.key_id] = key
+
+        self._keys = keys
+        self._last_refresh = time.monotonic()
+
+    async def get_signing_key(self, kid: Optional[str]) -> jwt.PyJWK:
+        """Return the key for `kid`, refreshing the key set only if it is unknown"""
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            # Another request may have refreshed while we waited for the lock
+            key = self._keys.get(kid)
+            if key is None and self._can_refresh():
+                await self.refresh()
+                key = self._keys.get(kid)
+
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unable to find a signing key that matches: {kid}")
+        return key
+
+    def _can_refresh(self) -> bool:
+        """Rate limit refreshes so unknown `kid`s cannot hammer the JWKS endpoint"""
+        if self._last_refresh is None:
+            return True
+        return time.monotonic() - self._last_refresh >= self.min_refresh_interval
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning("JWKS refresh from %s failed: %s", self.jwks_url, e)
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self):
+        """Load the keys and keep them fresh in the background"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """Stop the background refresh"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+
+class VerifiedTokenCache:
+    """Short-lived LRU cache of verified token payloads keyed by token hash"""
+
+    def __init__(self, max_size: int = 10000, max_ttl: float = 300):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Return the cached payload if the token was verified and has not expired"""
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, payload = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return payload
+
+    def put(self, token: str, payload: Dict[str, Any]):
+        """Cache a verified payload until the earlier of its `exp` and `max_ttl`"""
+        expires_at = time.time() + self.max_ttl
+        if payload.get("exp") is not None:
+            expires_at = min(expires_at, float(payload["exp"]))
+        if expires_at <= time.time() or self.max_size <= 0:
+            return
+
+        key = self._key(token)
+        self._entries[key] = (expires_at, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class TokenVerifier:
+    """Verify RS256 access tokens against a cached JWKS key store"""
+
+    def __init__(
+        self,
+        key_store: JWKSKeyStore,
+        issuer: str,
+        audience: Optional[str],
+        algorithms: List[str],
+        token_cache: Optional[VerifiedTokenCache] = None
+    ):
+        self.key_store = key_store
+        self.issuer = issuer
+        self.audience = audience
+        self.algorithms = algorithms
+        self.token_cache = token_cache or VerifiedTokenCache()
+
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """Return the decoded payload, raising a `jwt.PyJWTError` if the token is invalid"""
+        payload = self.token_cache.get(token)
+        if payload is not None:
+            return payload
+
+        header = jwt.get_unverified_header(token)
+        signing_key = await self.key_store.get_signing_key(header.get("kid"))
+
+        payload = jwt.decode(
+            token,
+            signing_key.key,
+            algorithms=self.algorithms,
+            audience=self.audience,
+            issuer=self.issuer
+        )
+
+        self.token_cache.put(token, payload)
+        return payload
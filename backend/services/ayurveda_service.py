@@ -1,8 +1,35 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterator, AsyncIterator
 from models.schemas import PredictionResponse, DietarySuggestion, Exercise
-from groq import Groq
+from services.json_stream import IncrementalJSONParser, loads_lenient
+from services.vector_service import FOOD_FILTER, build_filter
+from services.prediction_cache import PredictionCache, prediction_cache_key
+from services.prompt_builder import PromptBuilder
+from services.glucose_estimator import GlucoseEstimator, response_features
+from services.response_model import ResponseModelStore
+from services.single_flight import SingleFlight
+from groq import AsyncGroq, APIError
+from collections import Counter
+import asyncio
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
+
+# Map conditions to Ayurvedic queries
+CONDITION_QUERIES = {
+    "cholesterol": "high cholesterol management foods herbs",
+    "glucose": "blood sugar glucose diabetes management",
+    "metabolism": "slow metabolism agni digestive fire",
+    "liver": "liver health yakrit detoxification",
+    "pancreas": "pancreas function insulin production",
+    "digestion": "digestive health gut wellness",
+    "general": "balanced diet health wellness"
+}
+
+# Dosha profiles users can select; their recommendations are precomputed
+DOSHA_TYPES = ["Vata", "Pitta", "Kapha", "Vata-Pitta", "Pitta-Kapha", "Vata-Kapha", "Tridoshic"]
+
 
 class AyurvedaService:
     def __init__(self, vector_service, supabase_service):
@@ -14,7 +41,41 @@ class AyurvedaService:
         if not api_key:
             raise ValueError("GROQ_API_KEY not found in environment variables")
         
-        self.client = Groq(api_key=api_key)
+        self.client = AsyncGroq(api_key=api_key)
+        
+        # Bound in-flight completions per worker and give up on slow ones
+        self.llm_timeout = float(os.getenv("GROQ_TIMEOUT", "30"))
+        self._llm_semaphore = asyncio.Semaphore(int(os.getenv("GROQ_MAX_CONCURRENCY", "8")))
+        
+        # Identical meals (same dosha, similar recent stats) reuse earlier predictions
+        self.prediction_cache = PredictionCache(
+            max_size=int(os.getenv("PREDICTION_CACHE_SIZE", "1000")),
+            ttl=float(os.getenv("PREDICTION_CACHE_TTL", "86400")) or None,
+            persist_path=os.getenv("PREDICTION_CACHE_PATH") or None
+        )
+        
+        # Deterministic glucose estimate from the food table
+        self.glucose_estimator = GlucoseEstimator()
+        
+        # Per-user response models written by train_response_models.py
+        self.response_models = ResponseModelStore.open(os.getenv("RESPONSE_MODEL_PATH", "./response_models.npz"))
+        self.response_model_min_meals = int(os.getenv("RESPONSE_MODEL_MIN_MEALS", "10"))
+        
+        # Retrieved context is trimmed to PROMPT_CONTEXT_TOKENS
+        self.prompt_builder = PromptBuilder(context_tokens=int(os.getenv("PROMPT_CONTEXT_TOKENS", "400")))
+        self.prompt_metrics: Counter = Counter(requests=0, estimated_prompt_tokens=0, prompt_tokens=0)
+        
+        # Responses parsed as-is, parsed after repairs, or unparseable
+        self.parse_metrics: Counter = Counter(parsed=0, repaired=0, failed=0)
+        
+        # Identical vector searches running at the same time (any users) share
+        # one search, and concurrent requests share one corpus check or rebuild
+        self._searches = SingleFlight()
+        
+        # (condition, dosha) -> recommendations, valid for one corpus version
+        self._food_recommendations: Dict[tuple, List[Dict[str, Any]]] = {}
+        self._food_recommendations_version = None
+        self._food_recommendations_task: Optional[asyncio.Task] = None
     
     async def generate_prediction(
         self,
@@ -22,213 +83,343 @@ class AyurvedaService:
         exercise: Optional[Exercise],
         lifestyle_factors: str,
         dosha: str,
-        user_id: str
+        user_id: str,
+        use_cache: bool = True
     ) -> PredictionResponse:
         """Generate comprehensive Ayurvedic analysis and glucose prediction"""
+        cache_key, cached, messages, estimate = await self._prepare_prediction(
+            meal_items, exercise, lifestyle_factors, dosha, user_id, use_cache
+        )
+        if cached is not None:
+            return cached
         
-        # Get relevant Ayurvedic knowledge from vector DB
-        meal_context = self._get_meal_context(meal_items, dosha)
+        # Generate with Groq (Free, Fast, Unlimited!); if it is slow or down the
+        # local estimate is returned on its own
+        try:
+            response_text = await self._complete(messages)
+        except (asyncio.TimeoutError, APIError) as e:
+            logger.warning("Groq unavailable, returning the local estimate: %r", e)
+            return self._local_prediction(estimate)
         
-        # Get user's historical data
-        user_stats = await self.supabase_service.get_user_statistics(user_id)
+        # Parse response; the generic fallback is not worth caching
+        prediction, parsed = self._parse_groq_response(response_text, estimate)
+        if parsed:
+            self.prediction_cache.set(cache_key, prediction)
         
-        # Build comprehensive prompt
-        prompt = self._build_analysis_prompt(
-            meal_items=meal_items,
-            exercise=exercise,
-            lifestyle_factors=lifestyle_factors,
-            dosha=dosha,
-            context=meal_context,
-            user_stats=user_stats
-        )
+        return prediction
+    
+    async def stream_prediction(
+        self,
+        meal_items: List[str],
+        exercise: Optional[Exercise],
+        lifestyle_factors: str,
+        dosha: str,
+        user_id: str,
+        use_cache: bool = True
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """Generate a prediction as (event, data) pairs while Groq is still writing it
         
-        # Generate with Groq (Free, Fast, Unlimited!)
-        response = self.client.chat.completions.create(
-            model="mixtral-8x7b-32768",  # Excellent quality, large context window
-            messages=[
-                {"role": "system", "content": "You are an expert Ayurvedic practitioner specializing in metabolic health, digestive wellness, and blood glucose management. Provide detailed, actionable advice based on Ayurvedic principles."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=2000
+        Yields `token` events with the raw completion text, a `field`,
+        `recommendation` or `dietarySuggestion` event as soon as each part of
+        the JSON answer is complete, and finally `result` with the full
+        PredictionResponse. Cached predictions are replayed immediately.
+        """
+        cache_key, cached, messages, estimate = await self._prepare_prediction(
+            meal_items, exercise, lifestyle_factors, dosha, user_id, use_cache
         )
+        if cached is not None:
+            for event in self._prediction_events(cached):
+                yield event
+            yield "result", cached.dict()
+            return
         
-        # Parse response
-        return self._parse_groq_response(response.choices[0].message.content)
-    
-    def _get_meal_context(self, meal_items: List[str], dosha: str) -> str:
-        """Retrieve relevant Ayurvedic context from vector database"""
-        contexts = []
+        # The local estimate is known before the first token
+        yield "field", {"name": "predictedGlucose", "value": estimate["predictedGlucose"]}
         
-        # Search for each meal item
-        for item in meal_items[:3]:  # Limit to first 3 items
-            results = self.vector_service.get_food_properties(item)
-            if results:
-                contexts.append(results[0])
+        parser = IncrementalJSONParser()
+        chunks = []
+        try:
+            async for delta in self._stream_complete(messages):
+                chunks.append(delta)
+                yield "token", delta
+                for key, index, value in parser.feed(delta):
+                    event = self._field_event(key, index, value)
+                    if event is not None and key != "predictedGlucose":
+                        yield event
+        except (asyncio.TimeoutError, APIError) as e:
+            logger.warning("Groq unavailable, returning the local estimate: %r", e)
+            prediction = self._local_prediction(estimate)
+            for event in self._prediction_events(prediction):
+                if event[0] != "field" or event[1]["name"] != "predictedGlucose":
+                    yield event
+            yield "result", prediction.dict()
+            return
         
-        # Search for dosha-specific guidance
-        dosha_results = self.vector_service.search(
-            f"{dosha} dietary guidelines foods to favor avoid",
-            n_results=3
-        )
-        contexts.extend([r['document'] for r in dosha_results])
-        
-        # Search for glucose management
-        glucose_results = self.vector_service.search(
-            "blood glucose management diabetes prevention ayurveda",
-            n_results=2
-        )
-        contexts.extend([r['document'] for r in glucose_results])
+        prediction, parsed = self._parse_groq_response("".join(chunks), estimate)
+        if parsed:
+            self.prediction_cache.set(cache_key, prediction)
         
-        return "\n\n".join(contexts)
+        yield "result", prediction.dict()
     
-    def _build_analysis_prompt(
+    async def _prepare_prediction(
         self,
         meal_items: List[str],
         exercise: Optional[Exercise],
         lifestyle_factors: str,
         dosha: str,
-        context: str,
-        user_stats: Dict[str, Any]
-    ) -> str:
-        """Build comprehensive prompt for Gemini"""
+        user_id: str,
+        use_cache: bool
+    ) -> Tuple[str, Optional[PredictionResponse], Optional[List[Dict[str, str]]], Dict[str, Any]]:
+        """Return the cache key, a cached prediction or the Groq messages, and the local estimate"""
         
-        meal_str = ", ".join(meal_items)
-        exercise_str = f"{exercise.type} for {exercise.duration}" if exercise and exercise.type else "No exercise logged"
+        # Get relevant Ayurvedic knowledge from vector DB (CPU bound, keep it off the
+        # event loop) while the user's historical data is fetched
+        context_task = asyncio.ensure_future(self._searches.do(
+            ("meal_context", tuple(meal_items[:3]), dosha),
+            lambda: asyncio.to_thread(self._get_meal_context, meal_items, dosha)
+        ))
+        try:
+            user_stats = await self.supabase_service.get_user_statistics(user_id)
+        except BaseException:
+            context_task.cancel()
+            raise
         
-        prompt = f"""You are an expert Ayurvedic practitioner specializing in metabolic health, digestive wellness, and blood glucose management.
-
-AYURVEDIC KNOWLEDGE BASE:
-{context}
-
-USER INFORMATION:
-- Primary Dosha: {dosha}
-- Recent Average Glucose (7 days): {user_stats.get('avg_glucose_7days', 'Not available')} mg/dL
-- Meal Logs (7 days): {user_stats.get('meal_logs_7days', 0)}
-
-CURRENT MEAL LOG:
-- Foods consumed: {meal_str}
-- Exercise: {exercise_str}
-- Other factors: {lifestyle_factors if lifestyle_factors else "None"}
-
-TASK:
-Analyze this meal using Ayurvedic principles and provide:
-
-1. BLOOD GLUCOSE PREDICTION: Estimate the likely blood glucose response (e.g., "Moderate rise to 120-140 mg/dL", "Stable around 90-110 mg/dL", "Significant spike above 160 mg/dL"). Consider:
-   - Glycemic nature of foods consumed
-   - Food combinations and order of consumption
-   - Impact of exercise on glucose metabolism
-   - Dosha-specific metabolic tendencies
-
-2. AYURVEDIC EXPLANATION: Explain using concepts like:
-   - Agni (digestive fire) state
-   - Food combinations (compatible/incompatible)
-   - Impact on doshas
-   - Effects on dhatus (tissues), especially rasa (plasma) and rakta (blood)
-   - Influence on liver (yakrit) and pancreas function
-
-3. PERSONALIZED RECOMMENDATIONS: Provide 4-6 specific, actionable recommendations for:
-   - Optimizing digestive health (Agni)
-   - Supporting liver and pancreas function
-   - Managing blood glucose naturally
-   - Balancing the {dosha} dosha
-   - Improving metabolism
-   - Include specific herbs, spices, or practices
-
-4. MEAL-SPECIFIC DIETARY SUGGESTIONS: For each meal (Breakfast, Lunch, Dinner, Snacks), provide:
-   - Foods to favor (3-4 specific items with quantities)
-   - Foods to avoid (2-3 specific items)
-   - Preparation and timing notes
-
-Focus on addressing:
-- High cholesterol management
-- Blood glucose regulation
-- Slow metabolism improvement
-- Liver health (yakrit)
-- Pancreas function
-- Digestive system optimization
-
-Format your response as JSON with this structure:
-{{
-  "predictedGlucose": "string describing glucose prediction",
-  "explanation": "detailed Ayurvedic explanation",
-  "recommendations": ["recommendation 1", "recommendation 2", ...],
-  "dietarySuggestions": [
-    {{
-      "meal": "Breakfast",
-      "foodsToFavor": "specific foods with quantities",
-      "foodsToAvoid": "specific foods",
-      "notes": "preparation and timing guidance"
-    }},
-    ...
-  ]
-}}
+        # The glucose figure comes from the food table, not the LLM (sub-millisecond),
+        # adjusted by the user's own response model when there is one
+        estimate = self._personalize(
+            self.glucose_estimator.estimate(meal_items, exercise, user_stats), user_id
+        )
+        
+        # Repeat meals are answered from the cache without calling Groq; the key
+        # includes this user's estimate, so the cached text matches its figure
+        cache_key = prediction_cache_key(meal_items, exercise, lifestyle_factors, dosha, user_stats, estimate)
+        if use_cache:
+            cached = self.prediction_cache.get(cache_key)
+            if cached is not None:
+                context_task.cancel()
+                return cache_key, cached, None, estimate
+        
+        result_sets = await context_task
+        
+        # Budgeted prompt behind a static, cacheable instruction prefix
+        messages, prompt_info = self.prompt_builder.build(
+            meal_items=meal_items,
+            exercise=exercise,
+            lifestyle_factors=lifestyle_factors,
+            dosha=dosha,
+            result_sets=result_sets,
+            user_stats=user_stats,
+            estimate=estimate
+        )
+        self.prompt_metrics["requests"] += 1
+        self.prompt_metrics["estimated_prompt_tokens"] += prompt_info["prompt_tokens"]
+        logger.info(
+            "Prediction prompt: ~%d tokens, %d context chunks (~%d tokens)",
+            prompt_info["prompt_tokens"], prompt_info["context_chunks"], prompt_info["context_tokens"]
+        )
+        
+        return cache_key, None, messages, estimate
+    
+    def _personalize(self, estimate: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+        """Re-estimate the rise with the user's learned model once it has seen enough meals"""
+        self.response_models.reload_if_changed()
+        if self.response_models.samples(user_id) < self.response_model_min_meals:
+            return estimate
+        
+        rise = float(self.response_models.predict([user_id], response_features([estimate]))[0])
+        spread = min(max(2 * (self.response_models.user_residual_std(user_id) or 0), 10), 60)
+        return self.glucose_estimator.with_rise({**estimate, "source": "personal"}, rise, spread)
+    
+    async def _complete(self, messages: List[Dict[str, str]]) -> str:
+        """Run a chat completion, raising asyncio.TimeoutError after GROQ_TIMEOUT seconds
 
-Be specific with food names, quantities, and preparation methods. Ground all recommendations in Ayurvedic principles."""
+        The time spent waiting for a free concurrency slot counts towards the
+        timeout, so a queue of requests falls back to the local estimate on time.
+        """
+        async with asyncio.timeout(self.llm_timeout):
+            async with self._llm_semaphore:
+                response = await self.client.chat.completions.create(
+                    model="mixtral-8x7b-32768",  # Excellent quality, large context window
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=2000
+                )
+        
+        self._record_usage(getattr(response, "usage", None))
+        return response.choices[0].message.content
+    
+    async def _stream_complete(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """Stream a chat completion's text, raising asyncio.TimeoutError after GROQ_TIMEOUT seconds
 
-        return prompt
+        As in `_complete`, waiting for a concurrency slot counts towards the timeout.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.llm_timeout
+        # Only the acquire is inside the timeout block; a deadline spanning the
+        # yields below would fire in the consumer's code instead of here
+        async with asyncio.timeout_at(deadline):
+            await self._llm_semaphore.acquire()
+        try:
+            stream = await asyncio.wait_for(
+                self.client.chat.completions.create(
+                    model="mixtral-8x7b-32768",
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=2000,
+                    stream=True
+                ),
+                timeout=max(deadline - loop.time(), 0)
+            )
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(
+                            stream.__anext__(), timeout=max(deadline - loop.time(), 0)
+                        )
+                    except StopAsyncIteration:
+                        break
+                    # Groq reports usage on the final chunk
+                    self._record_usage(getattr(getattr(chunk, "x_groq", None), "usage", None))
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        yield delta
+            finally:
+                await stream.close()
+        finally:
+            self._llm_semaphore.release()
     
-    def _parse_groq_response(self, response_text: str) -> PredictionResponse:
-        """Parse Gemini's response into structured format"""
-        import json
-        import re
-        
-        # Try to extract JSON from response
-        json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-        if json_match:
+    def _record_usage(self, usage):
+        """Add the provider-reported prompt tokens to the metrics"""
+        prompt_tokens = getattr(usage, "prompt_tokens", None)
+        if prompt_tokens:
+            self.prompt_metrics["prompt_tokens"] += prompt_tokens
+            logger.info("Groq usage: %d prompt tokens, %s completion tokens",
+                        prompt_tokens, getattr(usage, "completion_tokens", "?"))
+    
+    @staticmethod
+    def _field_event(key: str, index: Optional[int], value: Any) -> Optional[Tuple[str, Any]]:
+        """Map a completed top-level JSON field to a stream event"""
+        if key in ("predictedGlucose", "explanation") and index is None and isinstance(value, str):
+            return "field", {"name": key, "value": value}
+        if key == "recommendations" and index is not None and isinstance(value, str):
+            return "recommendation", {"index": index, "value": value}
+        if key == "dietarySuggestions" and index is not None and isinstance(value, dict):
             try:
-                data = json.loads(json_match.group())
-                
-                # Parse dietary suggestions if present
-                dietary_suggestions = None
-                if 'dietarySuggestions' in data and data['dietarySuggestions']:
-                    dietary_suggestions = [
-                        DietarySuggestion(**sug) for sug in data['dietarySuggestions']
-                    ]
-                
-                return PredictionResponse(
-                    predictedGlucose=data.get('predictedGlucose', 'Unable to predict'),
-                    explanation=data.get('explanation', ''),
-                    recommendations=data.get('recommendations', []),
-                    dietarySuggestions=dietary_suggestions
-                )
-            except json.JSONDecodeError:
-                pass
+                suggestion = DietarySuggestion(**value)
+            except (TypeError, ValueError):
+                return None
+            return "dietarySuggestion", {"index": index, "value": suggestion.dict()}
+        return None
+    
+    @staticmethod
+    def _prediction_events(prediction: PredictionResponse) -> Iterator[Tuple[str, Any]]:
+        """The field events for an already complete prediction"""
+        yield "field", {"name": "predictedGlucose", "value": prediction.predictedGlucose}
+        yield "field", {"name": "explanation", "value": prediction.explanation}
+        for index, recommendation in enumerate(prediction.recommendations):
+            yield "recommendation", {"index": index, "value": recommendation}
+        for index, suggestion in enumerate(prediction.dietarySuggestions or []):
+            yield "dietarySuggestion", {"index": index, "value": suggestion.dict()}
+    
+    def _get_meal_context(self, meal_items: List[str], dosha: str) -> List[List[Dict[str, Any]]]:
+        """Retrieve relevant Ayurvedic context (with distances) from vector database"""
+        food_items = meal_items[:3]  # Limit to first 3 items
+        
+        # One batched search: the top match for each meal item among food
+        # documents, diet/metabolism guidance for the user's doshas and
+        # glucose management among condition documents
+        queries = [self.vector_service.food_properties_query(item) for item in food_items]
+        queries.append(f"{dosha} dietary guidelines foods to favor avoid")
+        queries.append("blood glucose management diabetes prevention ayurveda")
+        n_results = [1] * len(food_items) + [3, 2]
+        filters = [FOOD_FILTER] * len(food_items) + [
+            build_filter(dosha=dosha, category=["diet", "metabolism"]),
+            build_filter(category="conditions")
+        ]
+        
+        return self.vector_service.search_many(queries, n_results, where=filters)
+    
+    def _parse_groq_response(self, response_text: str, estimate: Dict[str, Any]) -> Tuple[PredictionResponse, bool]:
+        """Parse Groq's response into structured format
+        
+        `predictedGlucose` always comes from the local estimate. The flag is
+        False when the response could not be parsed and the fallback was
+        returned; such predictions are not cached.
+        """
+        data, repaired = loads_lenient(response_text)
+        if isinstance(data, dict):
+            data['predictedGlucose'] = estimate['predictedGlucose']
+        prediction = self._validate_prediction(data) if isinstance(data, dict) else None
         
-        # Fallback parsing if JSON extraction fails
-        lines = response_text.split('\n')
+        if prediction is None:
+            self.parse_metrics["failed"] += 1
+            logger.warning(
+                "Unparseable prediction response (%d of %d failed): %r",
+                self.parse_metrics["failed"], sum(self.parse_metrics.values()), response_text[:200]
+            )
+            return self._local_prediction(estimate), False
+        
+        self.parse_metrics["repaired" if repaired else "parsed"] += 1
+        return prediction, True
+    
+    def _local_prediction(self, estimate: Dict[str, Any]) -> PredictionResponse:
+        """Prediction built from the local estimate alone, for when Groq has no usable answer"""
+        explanation, tips = self.glucose_estimator.explain(estimate)
         return PredictionResponse(
-            predictedGlucose="Moderate glucose response expected",
-            explanation=response_text[:500],
-            recommendations=["Consult with an Ayurvedic practitioner for personalized guidance"],
+            predictedGlucose=estimate['predictedGlucose'],
+            explanation=explanation + " The detailed Ayurvedic analysis is unavailable right now; please try again shortly.",
+            recommendations=tips,
             dietarySuggestions=None
         )
     
-    async def get_food_recommendations(
-        self,
-        condition: str,
-        dosha: str
-    ) -> List[Dict[str, Any]]:
-        """Get food recommendations for specific health conditions"""
+    @staticmethod
+    def _validate_prediction(data: Dict[str, Any]) -> Optional[PredictionResponse]:
+        """Build a PredictionResponse, dropping malformed recommendations and suggestions"""
+        predicted_glucose = data.get('predictedGlucose')
+        if not isinstance(predicted_glucose, str) or not predicted_glucose.strip():
+            return None
         
-        # Map conditions to Ayurvedic queries
-        condition_map = {
-            "cholesterol": "high cholesterol management foods herbs",
-            "glucose": "blood sugar glucose diabetes management",
-            "metabolism": "slow metabolism agni digestive fire",
-            "liver": "liver health yakrit detoxification",
-            "pancreas": "pancreas function insulin production",
-            "digestion": "digestive health gut wellness",
-            "general": "balanced diet health wellness"
-        }
-        
-        query = condition_map.get(condition.lower(), condition)
-        query += f" {dosha} dosha"
+        recommendations = data.get('recommendations') or []
+        if isinstance(recommendations, str):
+            recommendations = [recommendations]
+        elif not isinstance(recommendations, list):
+            recommendations = []
         
-        # Search vector database
-        results = self.vector_service.search(query, n_results=10)
+        dietary_suggestions = []
+        suggestions = data.get('dietarySuggestions')
+        for suggestion in suggestions if isinstance(suggestions, list) else []:
+            if not isinstance(suggestion, dict):
+                continue
+            try:
+                dietary_suggestions.append(DietarySuggestion(**suggestion))
+            except (TypeError, ValueError):
+                continue
         
-        # Process and structure results
+        explanation = data.get('explanation')
+        return PredictionResponse(
+            predictedGlucose=predicted_glucose,
+            explanation=explanation if isinstance(explanation, str) else '',
+            recommendations=[r for r in recommendations if isinstance(r, str) and r.strip()],
+            dietarySuggestions=dietary_suggestions or None
+        )
+    
+    def stats(self) -> Dict[str, Any]:
+        """Prediction cache, prompt size, response parsing and search coalescing counters"""
+        return {
+            "prediction_cache": self.prediction_cache.stats(),
+            "searches": self._searches.stats(),
+            "prompt": dict(self.prompt_metrics),
+            "parse": dict(self.parse_metrics)
+        }
+    
+    @staticmethod
+    def _food_recommendation_query(condition: str, dosha: str) -> str:
+        query = CONDITION_QUERIES.get(condition.lower(), condition)
+        return query + f" {dosha} dosha"
+    
+    @staticmethod
+    def _format_recommendations(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Process and structure search results"""
         recommendations = []
         for result in results:
             recommendations.append({
@@ -236,4 +427,74 @@ Be specific with food names, quantities, and preparation methods. Ground all rec
                 "relevance": 1 - (result['distance'] if result['distance'] else 0)
             })
         
-        return recommendations
\ No newline at end of file
+        return recommendations
+    
+    def warm_food_recommendations(self):
+        """Precompute recommendations for every known (condition, dosha) pair"""
+        version = self.vector_service.corpus_version
+        keys = [(condition, dosha) for condition in CONDITION_QUERIES for dosha in DOSHA_TYPES]
+        queries = [self._food_recommendation_query(condition, dosha) for condition, dosha in keys]
+        
+        result_sets = self.vector_service.search_many(queries, n_results=10)
+        
+        self._food_recommendations = {
+            (condition, dosha.lower()): self._format_recommendations(results)
+            for (condition, dosha), results in zip(keys, result_sets)
+        }
+        self._food_recommendations_version = version
+    
+    async def _check_corpus_version(self) -> str:
+        """The corpus version, re-hashing the collection once its TTL has passed"""
+        if self.vector_service.corpus_version_expired:
+            await self._searches.do(
+                "corpus_version", lambda: asyncio.to_thread(self.vector_service.refresh_corpus_version)
+            )
+        return self.vector_service.corpus_version
+    
+    async def refresh_food_recommendations(self):
+        """Rebuild the precomputed recommendations if the corpus has changed"""
+        if self._food_recommendations_version != await self._check_corpus_version():
+            await self._searches.do(
+                "food_recommendations", lambda: asyncio.to_thread(self.warm_food_recommendations)
+            )
+    
+    def _refresh_food_recommendations_in_background(self):
+        """Start a rebuild unless one is already running"""
+        task = self._food_recommendations_task
+        if task is None or task.done():
+            task = self._food_recommendations_task = asyncio.ensure_future(self.refresh_food_recommendations())
+            task.add_done_callback(self._log_refresh_failure)
+    
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Food recommendation rebuild failed: %r", task.exception())
+    
+    async def get_food_recommendations(
+        self,
+        condition: str,
+        dosha: str
+    ) -> List[Dict[str, Any]]:
+        """Get food recommendations for specific health conditions"""
+        key = (condition.lower(), dosha.lower())
+        
+        # Known conditions are served from the precomputed table. While it is
+        # cold or out of date it is rebuilt in the background, and this
+        # request is answered by the single search below instead.
+        if condition.lower() in CONDITION_QUERIES:
+            if self._food_recommendations_version == await self._check_corpus_version():
+                recommendations = self._food_recommendations.get(key)
+                if recommendations is not None:
+                    # Copies: the table is shared by every user
+                    return [dict(recommendation) for recommendation in recommendations]
+            else:
+                self._refresh_food_recommendations_in_background()
+        
+        # Free-text conditions, and known ones while the table is rebuilt
+        query = self._food_recommendation_query(condition, dosha)
+        results = await self._searches.do(
+            ("search", query),
+            lambda: asyncio.to_thread(self.vector_service.search, query, 10)
+        )
+        
+        return self._format_recommendations(results)
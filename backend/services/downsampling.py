@@ -0,0 +1,76 @@
+import re
+from typing import Any, Dict, List
+
+import numpy as np
+
+from services.glucose_ingest import to_microseconds
+
+BUCKET_UNITS = {"m": 60, "h": 3600, "d": 86400}
+BUCKET_PATTERN = re.compile(r"^(\d+)\s*(m|h|d)$")
+
+
+def parse_bucket(bucket: str) -> int:
+    """Seconds in a bucket size such as "15m", "1h" or "1d" """
+    match = BUCKET_PATTERN.match(bucket.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError("bucket must look like 5m, 1h or 1d")
+    return int(match.group(1)) * BUCKET_UNITS[match.group(2)]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of `threshold` points chosen by Largest-Triangle-Three-Buckets
+
+    Keeps the first and last points and, from each of the threshold - 2
+    equal buckets in between, the point forming the largest triangle with
+    the previously kept point and the mean of the next bucket. Peaks and
+    troughs survive, unlike plain decimation or averaging. `x` must be
+    sorted.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket boundaries over points 1..n-2, plus the last point as a final bucket
+    edges = np.append(np.linspace(1, n - 1, threshold - 1).astype(np.int64), n)
+    sizes = np.diff(edges)
+    mean_x = np.add.reduceat(x, edges[:-1]) / sizes
+    mean_y = np.add.reduceat(y, edges[:-1]) / sizes
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        # Twice the triangle area; the constant factor does not change the argmax
+        areas = np.abs(
+            (x[a] - mean_x[i + 1]) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (mean_y[i + 1] - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_readings(readings: List[Dict[str, Any]], points: int) -> List[Dict[str, Any]]:
+    """At most `points` of the readings (oldest first), chosen by LTTB"""
+    if len(readings) <= points:
+        return readings
+    x = np.array([to_microseconds(reading["timestamp"]) for reading in readings], dtype=np.float64)
+    y = np.array([float(reading["glucose_value"]) for reading in readings])
+    return [readings[i] for i in lttb(x, y, points)]
+
+
+def bucket_points(buckets: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Chart points from get_glucose_buckets rows: the bucket mean, with its min and max"""
+    return [
+        {
+            "timestamp": bucket["bucket"],
+            "glucose_value": bucket["mean_glucose"],
+            "min_glucose": bucket["min_glucose"],
+            "max_glucose": bucket["max_glucose"]
+        }
+        for bucket in buckets
+    ]
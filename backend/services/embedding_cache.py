@@ -0,0 +1,71 @@
+from typing import Callable, Dict, List, Optional
+import numpy as np
+
+from services.cache import TTLCache, SQLiteCacheStore
+
+
+def normalize_query(text: str) -> str:
+    """Canonical cache key for a query: lowercase with collapsed whitespace"""
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """Two-tier (memory LRU + optional SQLite) cache of query embeddings"""
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        namespace: str,
+        max_size: int = 2048,
+        ttl: Optional[float] = None,
+        persist_path: Optional[str] = None
+    ):
+        self._encode = encode
+        self.namespace = namespace
+        self.memory = TTLCache(max_size=max_size, ttl=ttl)
+        self.disk = SQLiteCacheStore(persist_path, ttl=ttl) if persist_path else None
+        self.disk_hits = 0
+
+    def _disk_key(self, key: str) -> str:
+        # Namespaced by model so a model change never serves stale vectors
+        return f"{self.namespace}:{key}"
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Return one float32 embedding per text, encoding all misses in one batch"""
+        keys = [normalize_query(text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+
+        for key in keys:
+            if key in vectors or key in missing:
+                continue
+
+            vector = self.memory.get(key)
+            if vector is None and self.disk is not None:
+                raw = self.disk.get(self._disk_key(key))
+                if raw is not None:
+                    vector = np.frombuffer(raw, dtype=np.float32)
+                    self.memory.set(key, vector)
+                    self.disk_hits += 1
+
+            if vector is None:
+                missing.append(key)
+            else:
+                vectors[key] = vector
+
+        if missing:
+            encoded = np.asarray(self._encode(missing), dtype=np.float32)
+            for key, vector in zip(missing, encoded):
+                vector.setflags(write=False)
+                vectors[key] = vector
+                self.memory.set(key, vector)
+            if self.disk is not None:
+                self.disk.set_many({self._disk_key(key): vectors[key].tobytes() for key in missing})
+
+        return np.stack([vectors[key] for key in keys])
+
+    def stats(self) -> Dict[str, object]:
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        stats["persistent"] = self.disk is not None
+        return stats
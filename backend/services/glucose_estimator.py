@@ -0,0 +1,235 @@
+import difflib
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from data.food_nutrition import get_food_nutrition
+from models.schemas import Exercise
+from services.embedding_cache import normalize_query
+
+# Columns of the per-food feature matrix
+FEATURES = ["glycemic_index", "carbs_g", "fiber_g", "protein_g", "fat_g", "glucose_effect"]
+GI, CARBS, FIBER, PROTEIN, FAT, EFFECT = range(len(FEATURES))
+
+# Items that match nothing are treated as a mixed dish of moderate glycemic load
+UNKNOWN_FOOD = [55, 20, 2, 4, 4, 0]
+
+# mg/dL of glucose rise per unit of glycemic load for a user averaging 100 mg/dL
+RISE_PER_GLYCEMIC_LOAD = 1.5
+
+# Meal profile fields a personal response model is fitted on (see ResponseModelStore)
+RESPONSE_FEATURES = ["glycemic_load", "damped_load", "fiber_g", "protein_g", "fat_g", "exercise_minutes"]
+
+QUANTITY_WORDS = {"half": 0.5, "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4}
+UNIT_WORDS = {
+    "cup", "cups", "bowl", "bowls", "plate", "plates", "slice", "slices", "piece", "pieces",
+    "serving", "servings", "glass", "glasses", "small", "medium", "large", "of"
+}
+LEADING_QUANTITY = re.compile(r"^(\d+(?:\.\d+)?|\d+/\d+|[a-z]+)\s+")
+
+
+def parse_quantity(item: str) -> Tuple[float, str]:
+    """Split "2 cups of rice" into (2.0, "rice"); items without a quantity are one serving"""
+    text = normalize_query(item)
+    servings = 1.0
+    match = LEADING_QUANTITY.match(text)
+    if match:
+        token = match.group(1)
+        if token in QUANTITY_WORDS:
+            servings = QUANTITY_WORDS[token]
+            text = text[match.end():]
+        elif token[0].isdigit():
+            numerator, _, denominator = token.partition("/")
+            try:
+                servings = float(numerator) / float(denominator) if denominator else float(numerator)
+            except (ValueError, ZeroDivisionError):
+                # "1/0 rice" and the like: one serving
+                servings = 1.0
+            text = text[match.end():]
+
+    words = text.split()
+    while words and words[0] in UNIT_WORDS:
+        words.pop(0)
+    return min(max(servings, 0.25), 5.0), " ".join(words)
+
+
+def exercise_minutes(exercise: Optional[Exercise]) -> float:
+    """Minutes of exercise from a free-text duration such as "30 min" or "1 hour" """
+    if not exercise or not exercise.type or not exercise.duration:
+        return 0.0
+    match = re.search(r"(\d+(?:\.\d+)?)", exercise.duration)
+    if not match:
+        return 0.0
+    minutes = float(match.group(1))
+    return minutes * 60 if re.search(r"\b(h|hr|hrs|hour|hours)\b", exercise.duration.lower()) else minutes
+
+
+def response_features(profiles: List[Dict[str, Any]]) -> np.ndarray:
+    """Design matrix (bias column first) for a batch of meal profiles"""
+    matrix = np.ones((len(profiles), len(RESPONSE_FEATURES) + 1), dtype=np.float64)
+    for i, profile in enumerate(profiles):
+        matrix[i, 1:] = [profile[name] for name in RESPONSE_FEATURES]
+    return matrix
+
+
+class GlucoseEstimator:
+    """Deterministic glucose-response estimate from the food database
+
+    The meal's glycemic load is computed from a per-food feature matrix,
+    damped by its fibre, protein and fat, by glucose-lowering herbs and by
+    exercise, and scaled by how well the user's recent readings are
+    controlled.
+    """
+
+    def __init__(self, foods: Optional[List[Dict[str, Any]]] = None, fuzzy_cutoff: float = 0.75):
+        self.foods = foods if foods is not None else get_food_nutrition()
+        self.fuzzy_cutoff = fuzzy_cutoff
+
+        # One row per food plus a final row for unmatched items
+        self.features = np.array(
+            [[float(food.get(column) or 0) for column in FEATURES] for food in self.foods] + [UNKNOWN_FOOD],
+            dtype=np.float64
+        )
+        self._unknown_row = len(self.foods)
+
+        # Names and aliases; longest first so "brown rice" wins over "rice"
+        self._index: Dict[str, int] = {}
+        for row, food in enumerate(self.foods):
+            for name in [food['name'], *food.get('aliases', [])]:
+                self._index.setdefault(normalize_query(name), row)
+        self._names = sorted(self._index, key=len, reverse=True)
+        self._pattern = re.compile(r"\b(" + "|".join(re.escape(name) for name in self._names) + r")s?\b")
+        self.match = lru_cache(maxsize=4096)(self._match)
+
+    def _match(self, name: str) -> Optional[int]:
+        """Row of the food `name` refers to: exact, whole-word, then fuzzy match"""
+        if not name:
+            return None
+        if name in self._index:
+            return self._index[name]
+        found = self._pattern.search(name)
+        if found:
+            return self._index[found.group(1)]
+        close = difflib.get_close_matches(name, self._names, n=1, cutoff=self.fuzzy_cutoff)
+        return self._index[close[0]] if close else None
+
+    def meal_profile(self, meal_items: List[str], exercise: Optional[Exercise] = None) -> Dict[str, Any]:
+        """Glycemic load and nutrients of a meal, independent of the user"""
+        items, rows, servings, foods, unmatched = [], [], [], [], []
+        for item in meal_items:
+            quantity, name = parse_quantity(item)
+            if not name:
+                continue
+            row = self.match(name)
+            if row is None:
+                unmatched.append(item)
+                row = self._unknown_row
+            else:
+                foods.append({"item": item, "food": self.foods[row]['name'], "servings": quantity})
+            items.append(item)
+            rows.append(row)
+            servings.append(quantity)
+
+        features = self.features[rows]
+        amounts = np.asarray(servings, dtype=np.float64)
+
+        # Glycemic load of each item and the meal's fibre, protein and fat
+        item_loads = amounts * features[:, CARBS] * features[:, GI] / 100
+        glycemic_load = float(item_loads.sum())
+        fiber, protein, fat = (float(total) for total in amounts @ features[:, [FIBER, PROTEIN, FAT]])
+
+        damping = 1 / (1 + 0.015 * fiber + 0.008 * protein + 0.006 * fat)
+        herbs = float(np.prod(1 + features[:, EFFECT]))
+        minutes = exercise_minutes(exercise)
+        activity = 1 - min(0.3, 0.01 * minutes)
+
+        highest = int(np.argmax(item_loads)) if rows else None
+        return {
+            "glycemic_load": glycemic_load,
+            "damped_load": glycemic_load * damping * herbs * activity,
+            "fiber_g": fiber,
+            "protein_g": protein,
+            "fat_g": fat,
+            "exercise_minutes": minutes,
+            "items": len(rows),
+            "foods": foods,
+            "unmatched": unmatched,
+            "highest_load_item": items[highest] if highest is not None and item_loads[highest] > 0 else None
+        }
+
+    def estimate(
+        self,
+        meal_items: List[str],
+        exercise: Optional[Exercise] = None,
+        user_stats: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Estimate the post-meal glucose peak for a meal"""
+        user_stats = user_stats or {}
+        profile = self.meal_profile(meal_items, exercise)
+
+        avg_glucose = user_stats.get('avg_glucose_7days')
+        baseline = float(avg_glucose or user_stats.get('last_glucose') or 95)
+        sensitivity = min(max(baseline / 100, 0.8), 2.0)
+        time_in_range = user_stats.get('time_in_range_7days')
+        if time_in_range is not None:
+            sensitivity *= 1 + 0.5 * (1 - float(time_in_range))
+
+        rise = profile["damped_load"] * RISE_PER_GLYCEMIC_LOAD * sensitivity
+        # Wider range when items had to be guessed
+        spread = max(10.0, 0.25 * rise) * (1 + len(profile["unmatched"]) / max(profile["items"], 1))
+
+        return self.with_rise({**profile, "baseline": round(baseline), "source": "food table"}, rise, spread)
+
+    @staticmethod
+    def with_rise(estimate: Dict[str, Any], rise: float, spread: float) -> Dict[str, Any]:
+        """Copy of `estimate` describing a peak `rise` mg/dL above its baseline, +/- spread/2"""
+        rise = max(float(rise), 0.0)
+        baseline = estimate["baseline"]
+        peak_low = int(round((baseline + rise - spread / 2) / 5) * 5)
+        peak_high = int(round((baseline + rise + spread / 2) / 5) * 5)
+
+        if rise < 20:
+            predicted = f"Stable around {peak_low}-{peak_high} mg/dL"
+        elif rise < 50:
+            predicted = f"Moderate rise to {peak_low}-{peak_high} mg/dL"
+        else:
+            predicted = f"Significant spike to {peak_low}-{peak_high} mg/dL"
+
+        return {
+            **estimate,
+            "predictedGlucose": predicted,
+            "peak_low": peak_low,
+            "peak_high": peak_high,
+            "rise": round(rise, 1)
+        }
+
+    @staticmethod
+    def explain(estimate: Dict[str, Any]) -> Tuple[str, List[str]]:
+        """Plain explanation and practical tips for an estimate, used when no LLM answer is available"""
+        foods = ", ".join(f["food"] for f in estimate["foods"]) or "your meal"
+        basis = (
+            "how your glucose has responded to your past meals"
+            if estimate.get("source") == "personal"
+            else f"your recent glucose around {estimate['baseline']} mg/dL"
+        )
+        explanation = (
+            f"Estimated from the glycemic load of {foods} (about {estimate['glycemic_load']:.0f}) "
+            f"and {basis}, allowing for the meal's fibre, protein and fat and any exercise logged."
+        )
+        if estimate["unmatched"]:
+            explanation += f" Not in our food table, so estimated as a mixed dish: {', '.join(estimate['unmatched'])}."
+
+        tips = []
+        if estimate["highest_load_item"] and estimate["rise"] >= 20:
+            tips.append(
+                f"Your {estimate['highest_load_item']} contributes most of the glucose load; "
+                f"try a smaller portion or swap it for barley, millet or mung dal"
+            )
+        if estimate["exercise_minutes"] < 10:
+            tips.append("Walk for 10-15 minutes after eating to support Agni and blunt the glucose rise")
+        if estimate["fiber_g"] < 8 and estimate["rise"] >= 20:
+            tips.append("Add a side of cooked vegetables or dal for fibre to slow glucose absorption")
+        tips.append("Take 1/2 tsp cinnamon or soaked fenugreek seeds with meals to support glucose balance")
+        return explanation, tips
@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from services.profile_cache import MemoryProfileBackend, RedisProfileBackend
+from services.supabase_service import SupabaseService
+
+logger = logging.getLogger(__name__)
+
+# Plausible CGM/meter range in mg/dL
+MIN_GLUCOSE = 20
+MAX_GLUCOSE = 600
+# Clock skew allowed for readings stamped in the future, in seconds
+MAX_FUTURE_SECONDS = 300
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+MICROSECOND = timedelta(microseconds=1)
+MISSING = np.iinfo(np.int64).min
+
+
+def parse_body(body: bytes, content_type: str = "") -> List[Any]:
+    """Items from a JSON array or an NDJSON stream (one reading per line)"""
+    text = body.decode("utf-8").strip()
+    if "ndjson" not in content_type and "jsonlines" not in content_type and text.startswith("["):
+        items = json.loads(text)
+        if not isinstance(items, list):
+            raise ValueError("Expected a JSON array of readings")
+        return items
+
+    items = []
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            items.append(json.loads(line))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {number} is not valid JSON: {e.msg}")
+    return items
+
+
+def to_microseconds(value: Any) -> int:
+    """UTC microseconds since the epoch for an ISO 8601 string; naive times are UTC"""
+    if not isinstance(value, str):
+        return MISSING
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return MISSING
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return (moment - EPOCH) // MICROSECOND
+
+
+def validate_readings(items: List[Any], now: Optional[datetime] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Check a batch of readings at once
+
+    Returns glucose values, timestamps (UTC microseconds) and an array of
+    error messages, empty where the reading is valid. Later readings with
+    the same timestamp as an earlier one in the batch are marked as
+    duplicates with the error "duplicate".
+    """
+    count = len(items)
+    values = np.full(count, np.nan)
+    timestamps = np.full(count, MISSING, dtype=np.int64)
+    is_object = np.zeros(count, dtype=bool)
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        is_object[i] = True
+        value = item.get("value")
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[i] = value
+        timestamps[i] = to_microseconds(item.get("timestamp"))
+
+    now = now or datetime.now(timezone.utc)
+    latest = (now - EPOCH) // MICROSECOND + MAX_FUTURE_SECONDS * 1_000_000
+
+    errors = np.full(count, "", dtype=object)
+    # Checked in reverse order of priority so the most basic problem wins
+    errors[timestamps > latest] = "timestamp is in the future"
+    errors[(values < MIN_GLUCOSE) | (values > MAX_GLUCOSE)] = f"value must be between {MIN_GLUCOSE} and {MAX_GLUCOSE} mg/dL"
+    errors[timestamps == MISSING] = "timestamp must be an ISO 8601 string"
+    errors[~np.isfinite(values)] = "value must be a number"
+    errors[~is_object] = "reading must be an object"
+
+    # First occurrence of each timestamp among the valid readings wins
+    valid = np.flatnonzero(errors == "")
+    _, first = np.unique(timestamps[valid], return_index=True)
+    repeated = np.ones(len(valid), dtype=bool)
+    repeated[first] = False
+    errors[valid[repeated]] = "duplicate"
+
+    return values, timestamps, errors
+
+
+def create_idempotency_store(name: str, max_size: int = 10000, redis_url: Optional[str] = None):
+    """Build the store selected by IDEMPOTENCY_BACKEND ("memory" or "redis")"""
+    if name == "memory":
+        return MemoryProfileBackend(max_size)
+    if name == "redis":
+        if not redis_url:
+            raise ValueError("IDEMPOTENCY_BACKEND=redis needs REDIS_URL")
+        return RedisProfileBackend(redis_url, prefix="idempotency:")
+    raise ValueError(f"Unknown IDEMPOTENCY_BACKEND: {name}")
+
+
+def isoformat(microseconds: np.ndarray) -> List[str]:
+    return [(EPOCH + timedelta(microseconds=int(us))).isoformat() for us in microseconds]
+
+
+class GlucoseIngestService:
+    """Bulk ingestion of glucose readings, e.g. a CGM syncing after being offline
+
+    Readings are validated as a batch and written in chunked multi-row
+    inserts. The (user_id, timestamp) unique index makes re-uploads
+    harmless: readings already stored are reported as duplicates.
+
+    Requests carrying an Idempotency-Key return the original results when
+    retried. Results are kept in `responses` (Redis when workers should
+    share them, see create_idempotency_store); a retry that arrives while
+    the original is still running waits for it on the same worker, but is
+    processed again on another one, which reports the readings as
+    duplicates instead of replaying the original results.
+    """
+
+    def __init__(
+        self,
+        supabase: SupabaseService,
+        chunk_size: int = 1000,
+        concurrency: int = 4,
+        idempotency_ttl: float = 86400,
+        responses=None
+    ):
+        self.supabase = supabase
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.idempotency_ttl = idempotency_ttl
+        self.responses = responses or MemoryProfileBackend()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def ingest(
+        self,
+        user_id: str,
+        items: List[Any],
+        idempotency_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Validate and store readings; returns a summary and one result per item"""
+        if not idempotency_key:
+            return await self._ingest(user_id, items)
+
+        # A retried request must carry the same readings as the original
+        fingerprint = hashlib.sha256(json.dumps(items, sort_keys=True, default=str).encode()).hexdigest()
+        key = hashlib.sha256(json.dumps([user_id, idempotency_key]).encode()).hexdigest()
+        while True:
+            stored = await self._stored(key)
+            if stored is not None:
+                if stored["fingerprint"] != fingerprint:
+                    raise ValueError("Idempotency-Key was already used with different readings")
+                return stored["response"]
+            pending = self._in_flight.get(key)
+            if pending is None:
+                break
+            # The same request is being processed; wait and replay its result
+            await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            response = await self._ingest(user_id, items)
+            await self._store(key, {"fingerprint": fingerprint, "response": response})
+            return response
+        finally:
+            del self._in_flight[key]
+            future.set_result(None)
+
+    async def _stored(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return await self.responses.get(key)
+        except Exception as e:
+            logger.warning("Idempotency store read failed: %r", e)
+            return None
+
+    async def _store(self, key: str, value: Dict[str, Any]):
+        try:
+            await self.responses.set(key, value, self.idempotency_ttl)
+        except Exception as e:
+            logger.warning("Idempotency store write failed: %r", e)
+
+    async def close(self):
+        await self.responses.close()
+
+    async def _ingest(self, user_id: str, items: List[Any]) -> Dict[str, Any]:
+        values, timestamps, errors = validate_readings(items)
+        valid = np.flatnonzero(errors == "")
+
+        notes = [items[i].get("notes") if isinstance(items[i].get("notes"), str) else None for i in valid]
+        rows = [
+            {"user_id": user_id, "glucose_value": float(value), "timestamp": timestamp, "notes": note}
+            for value, timestamp, note in zip(values[valid], isoformat(timestamps[valid]), notes)
+        ]
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def insert(chunk):
+            async with semaphore:
+                return await self.supabase.insert_glucose_readings(chunk)
+
+        chunks = [rows[start:start + self.chunk_size] for start in range(0, len(rows), self.chunk_size)]
+        inserted_rows = [row for chunk in await asyncio.gather(*(insert(c) for c in chunks)) for row in chunk]
+
+        # Rows the database ignored were already stored
+        inserted_at = np.array([to_microseconds(row["timestamp"]) for row in inserted_rows], dtype=np.int64)
+        inserted = np.isin(timestamps[valid], inserted_at)
+        errors[valid[~inserted]] = "duplicate"
+
+        results = []
+        for i, error in enumerate(errors):
+            if not error:
+                results.append({"index": i, "status": "inserted"})
+            elif error == "duplicate":
+                results.append({"index": i, "status": "duplicate"})
+            else:
+                results.append({"index": i, "status": "invalid", "error": error})
+
+        duplicates = int((errors == "duplicate").sum())
+        return {
+            "received": len(items),
+            "inserted": int(inserted.sum()),
+            "duplicates": duplicates,
+            "invalid": len(items) - int(inserted.sum()) - duplicates,
+            "results": results
+        }
@@ -0,0 +1,59 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+
+from services.supabase_service import SupabaseService
+
+# Columns clients may request with `fields`; id and timestamp are always returned
+HISTORY_COLUMNS = {
+    "glucose_readings": ["glucose_value", "notes", "created_at"],
+    "meal_logs": ["meal_items", "exercise", "lifestyle_factors", "dosha"]
+}
+
+
+def select_columns(table: str, fields: Optional[str] = None) -> str:
+    """PostgREST column list for a comma-separated `fields` parameter (default: all)"""
+    allowed = HISTORY_COLUMNS[table]
+    if not fields:
+        return ",".join(allowed)
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in allowed and field not in ("id", "timestamp")]
+    if unknown:
+        raise ValueError(f"Unknown fields {', '.join(unknown)}; choose from {', '.join(allowed)}")
+    return ",".join(field for field in dict.fromkeys(requested) if field in allowed)
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Opaque cursor pointing after `row` in (timestamp, id) order"""
+    raw = json.dumps([row["timestamp"], str(row["id"])]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Row position from a cursor; raises ValueError if it was not issued by us"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        # Both end up in a PostgREST filter, so only accept well-formed values
+        datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+        return {"timestamp": timestamp, "id": str(uuid.UUID(row_id))}
+    except (ValueError, TypeError, AttributeError):
+        raise ValueError("Invalid cursor")
+
+
+async def stream_ndjson(
+    supabase: SupabaseService,
+    table: str,
+    user_id: str,
+    columns: str,
+    start: Optional[datetime] = None,
+    after: Optional[Dict[str, Any]] = None,
+    page_size: int = 1000
+) -> AsyncIterator[bytes]:
+    """A user's rows newest first as NDJSON, one page in memory at a time"""
+    async for page in supabase.iter_pages(
+        table, user_id, columns, start=start, after=after, descending=True, page_size=page_size
+    ):
+        yield "".join(json.dumps(row, default=str) + "\n" for row in page).encode()
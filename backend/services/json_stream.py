@@ -0,0 +1,276 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+# (top-level key, array index or None, decoded value)
+FieldEvent = Tuple[str, Optional[int], Any]
+
+OPEN_QUOTES = {'"', "\u201c", "\u201d"}
+CLOSERS = {"{": "}", "[": "]"}
+_decoder = json.JSONDecoder()
+
+ESCAPED_CONTROLS = {"\n": "\\n", "\r": "\\r", "\t": "\\t"}
+
+
+def _close(out: List[str], stack: List[str]) -> str:
+    """Drop a dangling comma and close every open container"""
+    text = "".join(out).rstrip()
+    if text.endswith(","):
+        text = text[:-1]
+    return text + "".join(CLOSERS[opener] for opener in reversed(stack))
+
+
+def _ends_string(text: str, pos: int) -> bool:
+    """Whether a quote just before `pos` can close a string (valid JSON needs , : ] or } next)"""
+    while pos < len(text) and text[pos].isspace():
+        pos += 1
+    return pos == len(text) or text[pos] in ",:]}"
+
+
+def repair_json(text: str) -> Tuple[Optional[str], bool]:
+    """Extract the first JSON object in `text` and repair common LLM mistakes
+    
+    One pass balances braces outside strings, so prose or code fences around
+    the object are ignored. Smart quotes used as delimiters, unescaped quotes
+    and raw control characters inside strings, trailing commas, mismatched
+    closers and truncated output are fixed. Returns the JSON text (or None when there is no object)
+    and whether anything had to be repaired.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None, False
+    
+    out: List[str] = []
+    stack: List[str] = []
+    repaired = False
+    in_string = False
+    escape = False
+    smart_string = False
+    # Last point between two complete values: (output length, open containers)
+    safe: Optional[Tuple[int, List[str]]] = None
+    
+    for i in range(start, len(text)):
+        c = text[i]
+        if in_string:
+            if escape:
+                escape = False
+                out.append(c)
+            elif c == "\\":
+                escape = True
+                out.append(c)
+            elif c == '"' or (smart_string and c in OPEN_QUOTES):
+                if not _ends_string(text, i + 1):
+                    # A quote inside the text, not the end of the string
+                    repaired = True
+                    out.append('\\"')
+                    continue
+                if c != '"':
+                    repaired = True
+                in_string = False
+                out.append('"')
+            elif c < " ":
+                repaired = True
+                out.append(ESCAPED_CONTROLS.get(c, "\\u%04x" % ord(c)))
+            else:
+                out.append(c)
+            continue
+        
+        if c in OPEN_QUOTES:
+            in_string = True
+            smart_string = c != '"'
+            repaired = repaired or smart_string
+            out.append('"')
+        elif c in CLOSERS:
+            stack.append(c)
+            out.append(c)
+        elif c in "}]":
+            expected = CLOSERS[stack.pop()]
+            if c != expected:
+                repaired = True
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+                repaired = True
+            out.append(expected)
+            if not stack:
+                return "".join(out), repaired
+        else:
+            if c == ",":
+                safe = (len(out), list(stack))
+            out.append(c)
+    
+    # Truncated output: close what is open, or cut back to the last complete value
+    if escape:
+        out.pop()
+    if in_string:
+        out.append('"')
+    candidate = _close(out, stack)
+    try:
+        json.loads(candidate)
+    except ValueError:
+        if safe is None:
+            return None, True
+        candidate = _close(out[:safe[0]], safe[1])
+    return candidate, True
+
+
+def loads_lenient(text: str) -> Tuple[Optional[Any], bool]:
+    """Decode the first JSON object in `text`, repairing it if needed
+    
+    Returns the decoded value (None if nothing could be decoded) and whether
+    it needed repairs.
+    """
+    # Well-formed output skips the character-by-character repair pass
+    start = text.find("{")
+    if start < 0:
+        return None, False
+    try:
+        return _decoder.raw_decode(text, start)[0], False
+    except ValueError:
+        pass
+    
+    candidate, repaired = repair_json(text[start:])
+    if candidate is None:
+        return None, repaired
+    try:
+        return json.loads(candidate), repaired
+    except ValueError:
+        return None, True
+
+
+class IncrementalJSONParser:
+    """Single-pass scanner for a JSON object arriving in chunks.
+
+    Text before the first `{` is skipped. Each top-level field is decoded as
+    soon as its value is complete, and elements of top-level arrays are
+    decoded one by one, so consumers can act on them before the rest of the
+    object has been generated.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = "key"  # what comes next at depth 1: key, colon or value
+        self._key: Optional[str] = None
+        self._key_start: Optional[int] = None
+        self._value_start: Optional[int] = None
+        self._array = False
+        self._element_start: Optional[int] = None
+        self._element_index = 0
+
+    def feed(self, chunk: str) -> List[FieldEvent]:
+        """Consume the next chunk and return the fields completed by it"""
+        events: List[FieldEvent] = []
+        if self.done:
+            return events
+
+        if not self.buffer:
+            start = chunk.find("{")
+            if start < 0:
+                return events
+            chunk = chunk[start:]
+
+        offset = len(self.buffer)
+        self.buffer += chunk
+        for pos in range(offset, len(self.buffer)):
+            self._step(self.buffer[pos], pos, events)
+            if self.done:
+                break
+        return events
+
+    def _emit(self, events: List[FieldEvent], index: Optional[int], start: int, end: int):
+        fragment = self.buffer[start:end]
+        try:
+            value = json.loads(fragment)
+        except ValueError:
+            # Objects may still be repairable (smart quotes, trailing commas)
+            if not fragment.lstrip().startswith("{"):
+                return
+            value, _ = loads_lenient(fragment)
+            if value is None:
+                return
+        events.append((self._key, index, value))
+
+    def _step(self, c: str, pos: int, events: List[FieldEvent]):
+        depth = self._depth
+
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+            elif c == "\\":
+                self._escape = True
+            elif c == '"':
+                self._in_string = False
+                if depth == 1 and self._expect == "key" and self._key_start is not None:
+                    try:
+                        self._key = json.loads(self.buffer[self._key_start:pos + 1])
+                    except ValueError:
+                        self._key = None
+                    self._key_start = None
+                    self._expect = "colon"
+            return
+
+        if c.isspace():
+            return
+
+        if c == '"':
+            self._in_string = True
+            if depth == 1 and self._expect == "key":
+                self._key_start = pos
+            else:
+                self._mark_value_start(pos)
+            return
+
+        if c in "{[":
+            self._mark_value_start(pos)
+            if depth == 1 and c == "[" and self._value_start == pos:
+                self._array = True
+                self._element_start = None
+                self._element_index = 0
+            self._depth += 1
+            return
+
+        if c in "}]":
+            self._depth -= 1
+            if self._depth == 1 and self._array and c == "]":
+                if self._element_start is not None:
+                    self._emit(events, self._element_index, self._element_start, pos)
+                self._element_start = None
+            elif self._depth == 0:
+                if self._value_start is not None and not self._array:
+                    self._emit(events, None, self._value_start, pos)
+                self.done = True
+            return
+
+        if c == ":" and depth == 1 and self._expect == "colon":
+            self._expect = "value"
+            self._value_start = None
+            self._array = False
+            return
+
+        if c == ",":
+            if depth == 1:
+                if self._value_start is not None and not self._array:
+                    self._emit(events, None, self._value_start, pos)
+                self._expect = "key"
+                self._value_start = None
+                self._array = False
+            elif depth == 2 and self._array:
+                if self._element_start is not None:
+                    self._emit(events, self._element_index, self._element_start, pos)
+                    self._element_index += 1
+                self._element_start = None
+            return
+
+        # Numbers, true, false and null
+        self._mark_value_start(pos)
+
+    def _mark_value_start(self, pos: int):
+        """Record where a top-level value or top-level array element begins"""
+        if self._depth == 1 and self._expect == "value" and self._value_start is None:
+            self._value_start = pos
+        elif self._depth == 2 and self._array and self._element_start is None:
+            self._element_start = pos
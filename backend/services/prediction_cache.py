@@ -0,0 +1,98 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+from models.schemas import Exercise, PredictionResponse
+from services.cache import TTLCache, SQLiteCacheStore
+from services.embedding_cache import normalize_query
+
+
+def _bucket(value: Optional[float], size: float) -> Optional[float]:
+    """Round a statistic to a bucket so similar users share cache entries"""
+    if value is None:
+        return None
+    return round(float(value) / size) * size
+
+
+def _canonical_request(
+    meal_items: List[str],
+    exercise: Optional[Exercise],
+    lifestyle_factors: str,
+    dosha: str
+) -> Dict[str, Any]:
+    # Item order, case and spacing do not matter
+    return {
+        "meal": sorted(normalize_query(item) for item in meal_items if item.strip()),
+        "exercise": (
+            [normalize_query(exercise.type), normalize_query(exercise.duration)]
+            if exercise and exercise.type else None
+        ),
+        "lifestyle": normalize_query(lifestyle_factors or ""),
+        "dosha": normalize_query(dosha)
+    }
+
+
+def _digest(canonical: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode()).hexdigest()
+
+
+def prediction_cache_key(
+    meal_items: List[str],
+    exercise: Optional[Exercise],
+    lifestyle_factors: str,
+    dosha: str,
+    user_stats: Dict[str, Any],
+    estimate: Dict[str, Any]
+) -> str:
+    """Canonical cache key for a prediction request"""
+    # User statistics are bucketed so similar users share cache entries. The
+    # explanation is written about the estimate, so its peak range (5 mg/dL
+    # steps) is part of the key and a hit never describes another figure
+    canonical = _canonical_request(meal_items, exercise, lifestyle_factors, dosha)
+    canonical.update({
+        "avg_glucose": _bucket(user_stats.get("avg_glucose_7days"), 10),
+        "time_in_range": _bucket(user_stats.get("time_in_range_7days"), 0.1),
+        "last_glucose": _bucket(user_stats.get("last_glucose"), 20),
+        "estimate": estimate["predictedGlucose"]
+    })
+    return _digest(canonical)
+
+
+def prediction_request_key(
+    meal_items: List[str],
+    exercise: Optional[Exercise],
+    lifestyle_factors: str,
+    dosha: str,
+    use_cache: bool = True
+) -> str:
+    """Canonical key of a request as submitted, for coalescing duplicates"""
+    canonical = _canonical_request(meal_items, exercise, lifestyle_factors, dosha)
+    canonical["use_cache"] = use_cache
+    return _digest(canonical)
+
+
+class PredictionCache:
+    """Two-tier (memory LRU + optional SQLite) cache of generated predictions"""
+
+    def __init__(self, max_size: int = 1000, ttl: Optional[float] = None, persist_path: Optional[str] = None):
+        self.memory = TTLCache(max_size=max_size, ttl=ttl)
+        self.disk = SQLiteCacheStore(persist_path, ttl=ttl) if persist_path else None
+
+    def get(self, key: str) -> Optional[PredictionResponse]:
+        prediction = self.memory.get(key)
+        if prediction is None and self.disk is not None:
+            raw = self.disk.get(key)
+            if raw is not None:
+                prediction = PredictionResponse(**json.loads(raw))
+                self.memory.set(key, prediction)
+        return prediction
+
+    def set(self, key: str, prediction: PredictionResponse):
+        self.memory.set(key, prediction)
+        if self.disk is not None:
+            self.disk.set(key, json.dumps(prediction.dict()).encode())
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats["persistent"] = self.disk is not None
+        return stats
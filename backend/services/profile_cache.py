@@ -0,0 +1,134 @@
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.cache import TTLCache
+from services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryProfileBackend:
+    """Per-process LRU of profiles; also the stand-in for a shared backend in tests"""
+
+    def __init__(self, max_size: int = 10000):
+        self.cache = TTLCache(max_size=max_size)
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.cache.get(key)
+        # Copies, so callers cannot change the cached profile
+        return dict(value) if value is not None else None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        self.cache.set(key, dict(value), ttl=ttl)
+
+    async def delete(self, key: str):
+        self.cache.delete(key)
+
+    async def close(self):
+        pass
+
+
+class RedisProfileBackend:
+    """Profiles in Redis, shared by every worker (needs `pip install redis`)"""
+
+    def __init__(self, url: str, prefix: str = "profile:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self.client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    async def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None):
+        await self.client.set(self.prefix + key, json.dumps(value, default=str), ex=int(ttl) if ttl else None)
+
+    async def delete(self, key: str):
+        await self.client.delete(self.prefix + key)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_profile_backend(name: str, max_size: int = 10000, redis_url: Optional[str] = None):
+    """Build the backend selected by PROFILE_CACHE_BACKEND ("memory" or "redis")"""
+    if name == "memory":
+        return MemoryProfileBackend(max_size)
+    if name == "redis":
+        if not redis_url:
+            raise ValueError("PROFILE_CACHE_BACKEND=redis needs REDIS_URL")
+        return RedisProfileBackend(redis_url)
+    raise ValueError(f"Unknown PROFILE_CACHE_BACKEND: {name}")
+
+
+class ProfileCache:
+    """Read-through cache of user profiles
+
+    Misses are loaded once however many requests ask at the same time, and
+    a profile invalidated while it is being loaded is not stored. If the
+    backend is unreachable, profiles are read from the database directly.
+    """
+
+    def __init__(self, backend=None, ttl: Optional[float] = 300):
+        self.backend = backend or MemoryProfileBackend()
+        self.ttl = ttl
+        self._loads = SingleFlight()
+        self._stale = set()
+        self.hits = 0
+        self.misses = 0
+
+    async def get(
+        self,
+        user_id: str,
+        load: Callable[[str], Awaitable[Optional[Dict[str, Any]]]]
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            profile = await self.backend.get(user_id)
+        except Exception as e:
+            logger.warning("Profile cache read failed: %r", e)
+            return await load(user_id)
+
+        if profile is not None:
+            self.hits += 1
+            return profile
+        self.misses += 1
+        return await self._loads.do(user_id, lambda: self._load(user_id, load))
+
+    async def _load(self, user_id: str, load) -> Optional[Dict[str, Any]]:
+        self._stale.discard(user_id)
+        try:
+            profile = await load(user_id)
+            # Missing profiles are not cached; first login creates them
+            if profile is not None and user_id not in self._stale:
+                await self.set(user_id, profile)
+            return profile
+        finally:
+            self._stale.discard(user_id)
+
+    async def set(self, user_id: str, profile: Dict[str, Any]):
+        try:
+            await self.backend.set(user_id, profile, self.ttl)
+        except Exception as e:
+            logger.warning("Profile cache write failed: %r", e)
+
+    async def invalidate(self, user_id: str):
+        if self._loads.in_flight(user_id):
+            self._stale.add(user_id)
+        try:
+            await self.backend.delete(user_id)
+        except Exception as e:
+            logger.warning("Profile cache invalidation failed: %r", e)
+
+    async def close(self):
+        await self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else None,
+            "loads": self._loads.stats()
+        }
@@ -0,0 +1,140 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.schemas import Exercise
+from services.embedding_cache import normalize_query
+
+# Rough size of an English token for Mixtral-family tokenizers
+CHARS_PER_TOKEN = 4
+
+# Sent unchanged with every request so the provider can cache the prefix;
+# nothing request-specific may be interpolated here
+SYSTEM_PROMPT = """You are an expert Ayurvedic practitioner specializing in metabolic health, digestive wellness, and blood glucose management. Ground all advice in Ayurvedic principles and be specific with food names, quantities and preparation methods.
+
+For the meal log you are given, provide:
+
+1. predictedGlucose: the GLUCOSE ESTIMATE given with the meal, copied unchanged. It is computed from glycemic load; do not re-estimate it.
+
+2. explanation: an Ayurvedic explanation of that estimate covering the glycemic nature of the foods, Agni (digestive fire), food compatibility and order, exercise, impact on the doshas, effects on the dhatus (especially rasa and rakta), and the influence on liver (yakrit) and pancreas function.
+
+3. recommendations: 4-6 specific, actionable recommendations (herbs, spices or practices) for digestive health, liver and pancreas support, natural blood glucose management, balancing the user's dosha and improving metabolism.
+
+4. dietarySuggestions: for Breakfast, Lunch, Dinner and Snacks, 3-4 foods to favor with quantities, 2-3 foods to avoid, and preparation and timing notes.
+
+Keep high cholesterol, blood glucose regulation, slow metabolism, liver health, pancreas function and digestion in focus.
+
+Respond with JSON only, in this structure:
+{
+  "predictedGlucose": "string describing glucose prediction",
+  "explanation": "detailed Ayurvedic explanation",
+  "recommendations": ["recommendation 1", "recommendation 2"],
+  "dietarySuggestions": [
+    {"meal": "Breakfast", "foodsToFavor": "specific foods with quantities", "foodsToAvoid": "specific foods", "notes": "preparation and timing guidance"}
+  ]
+}"""
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of `text`"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` to roughly `max_tokens`, preferring a sentence boundary"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    sentence_end = cut.rfind(". ")
+    if sentence_end > max_chars // 2:
+        return cut[:sentence_end + 1]
+    return cut.rsplit(" ", 1)[0] + "..."
+
+
+class PromptBuilder:
+    """Builds the Groq messages for a prediction within a context token budget"""
+
+    def __init__(self, context_tokens: int = 400, min_chunk_tokens: int = 24):
+        self.context_tokens = context_tokens
+        self.min_chunk_tokens = min_chunk_tokens
+
+    def select_context(self, result_sets: List[List[Dict[str, Any]]]) -> List[str]:
+        """De-duplicate and rank retrieved chunks, then fit them to the budget
+
+        Every query's best hit is considered before any query's second hit,
+        and hits of the same rank are ordered by distance, so each query keeps
+        a voice even when the budget is tight.
+        """
+        best: Dict[str, tuple] = {}
+        for results in result_sets:
+            for rank, result in enumerate(results):
+                text = " ".join(result['document'].split())
+                distance = result.get('distance')
+                key = normalize_query(text)
+                order = (rank, distance if distance is not None else math.inf)
+                if key not in best or order < best[key][0]:
+                    best[key] = (order, text)
+
+        chunks = []
+        remaining = self.context_tokens
+        for _, text in sorted(best.values(), key=lambda item: item[0]):
+            tokens = estimate_tokens(text)
+            if tokens > remaining:
+                if remaining < self.min_chunk_tokens:
+                    break
+                text = trim_to_tokens(text, remaining)
+                tokens = estimate_tokens(text)
+            chunks.append(text)
+            remaining -= tokens
+
+        return chunks
+
+    def build(
+        self,
+        meal_items: List[str],
+        exercise: Optional[Exercise],
+        lifestyle_factors: str,
+        dosha: str,
+        result_sets: List[List[Dict[str, Any]]],
+        user_stats: Dict[str, Any],
+        estimate: Dict[str, Any]
+    ) -> Tuple[List[Dict[str, str]], Dict[str, int]]:
+        """Build the messages for one prediction and their estimated token counts"""
+        chunks = self.select_context(result_sets)
+        context = "\n".join(f"- {chunk}" for chunk in chunks)
+
+        meal_str = ", ".join(meal_items)
+        exercise_str = f"{exercise.type} for {exercise.duration}" if exercise and exercise.type else "none"
+        time_in_range = user_stats.get('time_in_range_7days')
+        time_in_range_str = f"{time_in_range:.0%}" if time_in_range is not None else "n/a"
+        avg_glucose = user_stats.get('avg_glucose_7days')
+        avg_glucose_str = f"{avg_glucose} mg/dL" if avg_glucose is not None else "n/a"
+        last_glucose = user_stats.get('last_glucose')
+        last_glucose_str = f"{last_glucose} mg/dL" if last_glucose is not None else "n/a"
+
+        user_prompt = f"""AYURVEDIC KNOWLEDGE:
+{context or "- none retrieved"}
+
+USER:
+- Primary dosha: {dosha}
+- 7-day average glucose: {avg_glucose_str}
+- 7-day time in range (70-180 mg/dL): {time_in_range_str}
+- Last glucose reading: {last_glucose_str}
+- Meals logged (7 days): {user_stats.get('meal_logs_7days', 0)}
+
+MEAL:
+- Foods: {meal_str}
+- Exercise: {exercise_str}
+- Other factors: {lifestyle_factors or "none"}
+
+GLUCOSE ESTIMATE: {estimate['predictedGlucose']} (glycemic load {estimate['glycemic_load']:.0f}, from about {estimate['baseline']} mg/dL)"""
+
+        messages = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+        return messages, {
+            "prompt_tokens": estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(user_prompt),
+            "context_chunks": len(chunks),
+            "context_tokens": estimate_tokens(context)
+        }
@@ -0,0 +1,218 @@
+import logging
+import os
+import threading
+import time
+import zipfile
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from services.glucose_estimator import RESPONSE_FEATURES
+
+DIMENSIONS = len(RESPONSE_FEATURES) + 1  # plus the bias column
+
+# What np.load and _read raise on a truncated, corrupt or outdated model file
+MODEL_FILE_ERRORS = (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile, zlib.error)
+
+logger = logging.getLogger(__name__)
+
+
+def post_meal_responses(
+    meal_times: np.ndarray,
+    reading_times: np.ndarray,
+    reading_values: np.ndarray,
+    baseline_window: float = 3600,
+    response_window: float = 3 * 3600
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Glucose rise after each meal, from one user's readings sorted by time
+
+    The baseline is the last reading at most `baseline_window` seconds
+    before the meal, the response the highest reading within
+    `response_window` seconds after it. Returns a mask of meals that have
+    both and their rise (peak minus baseline).
+    """
+    if len(reading_times) == 0 or len(meal_times) == 0:
+        return np.zeros(len(meal_times), dtype=bool), np.zeros(0)
+
+    before = np.searchsorted(reading_times, meal_times, side="right") - 1
+    start = before + 1
+    end = np.searchsorted(reading_times, meal_times + response_window, side="right")
+
+    has_baseline = (before >= 0) & (meal_times - reading_times[np.maximum(before, 0)] <= baseline_window)
+    valid = has_baseline & (end > start)
+    if not valid.any():
+        return valid, np.zeros(0)
+
+    # Maximum over every [start, end) slice in one call: reduceat over the
+    # interleaved boundaries reduces each pair, with a pad so `end` is in range
+    padded = np.append(reading_values, -np.inf)
+    bounds = np.column_stack([start[valid], end[valid]]).ravel()
+    peaks = np.maximum.reduceat(padded, bounds)[::2]
+
+    return valid, peaks - reading_values[before[valid]]
+
+
+class ResponseModelStore:
+    """Per-user ridge regressions of post-meal glucose rise on meal features
+
+    Each user's model is kept as sufficient statistics (XᵀX, Xᵀy, yᵀy and
+    the sample count), so new meals are added incrementally and all users
+    are refitted with one batched solve. Users are shrunk towards the pooled
+    population model, so a handful of meals gives a gentle adjustment.
+    """
+
+    def __init__(self, ridge: float = 5.0):
+        self.ridge = ridge
+        self.user_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self.xtx = np.zeros((0, DIMENSIONS, DIMENSIONS))
+        self.xty = np.zeros((0, DIMENSIONS))
+        self.yty = np.zeros(0)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.weights = np.zeros((0, DIMENSIONS))
+        self.residual_std = np.zeros(0)
+        self.population_weights = np.zeros(DIMENSIONS)
+        self.trained_until: Optional[float] = None  # unix time of the newest meal included
+
+        self.path: Optional[str] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _row(self, user_id: str) -> int:
+        row = self._rows.get(user_id)
+        if row is None:
+            row = self._rows[user_id] = len(self.user_ids)
+            self.user_ids.append(user_id)
+        return row
+
+    def update(self, user_ids: Iterable[str], X: np.ndarray, y: np.ndarray):
+        """Add samples (one row of X and y per meal) to the users' statistics"""
+        rows = np.array([self._row(user_id) for user_id in user_ids], dtype=np.int64)
+        grow = len(self.user_ids) - len(self.counts)
+        if grow > 0:
+            self.xtx = np.concatenate([self.xtx, np.zeros((grow, DIMENSIONS, DIMENSIONS))])
+            self.xty = np.concatenate([self.xty, np.zeros((grow, DIMENSIONS))])
+            self.yty = np.concatenate([self.yty, np.zeros(grow)])
+            self.counts = np.concatenate([self.counts, np.zeros(grow, dtype=np.int64)])
+        if len(rows) == 0:
+            return
+
+        np.add.at(self.xtx, rows, X[:, :, None] * X[:, None, :])
+        np.add.at(self.xty, rows, X * y[:, None])
+        np.add.at(self.yty, rows, y * y)
+        np.add.at(self.counts, rows, 1)
+
+    def fit(self):
+        """Refit the population model and every user's model"""
+        identity = np.eye(DIMENSIONS)
+        identity[0, 0] = 0  # the intercept is not penalised in the population fit
+
+        if self.counts.sum() > 0:
+            self.population_weights = np.linalg.solve(
+                self.xtx.sum(axis=0) + self.ridge * identity, self.xty.sum(axis=0)
+            )
+
+        # Ridge towards the population weights: (XᵀX + λI) w = Xᵀy + λ w_pop
+        lhs = self.xtx + self.ridge * np.eye(DIMENSIONS)
+        rhs = self.xty + self.ridge * self.population_weights
+        self.weights = np.linalg.solve(lhs, rhs[..., None])[..., 0]
+
+        # Residual sum of squares from the statistics: yᵀy - 2wᵀXᵀy + wᵀXᵀXw
+        rss = (
+            self.yty
+            - 2 * np.einsum("ud,ud->u", self.weights, self.xty)
+            + np.einsum("ud,ude,ue->u", self.weights, self.xtx, self.weights)
+        )
+        self.residual_std = np.sqrt(np.maximum(rss, 0) / np.maximum(self.counts, 1))
+
+    def samples(self, user_id: str) -> int:
+        row = self._rows.get(user_id)
+        return int(self.counts[row]) if row is not None and row < len(self.counts) else 0
+
+    def predict(self, user_ids: List[str], X: np.ndarray) -> np.ndarray:
+        """Predicted rise for each row of X; unknown users get the population model"""
+        weights = np.array([
+            self.weights[self._rows[user_id]] if user_id in self._rows else self.population_weights
+            for user_id in user_ids
+        ]).reshape(len(user_ids), DIMENSIONS)
+        return np.einsum("nd,nd->n", weights, X)
+
+    def user_residual_std(self, user_id: str) -> Optional[float]:
+        row = self._rows.get(user_id)
+        return float(self.residual_std[row]) if row is not None and row < len(self.residual_std) else None
+
+    def save(self, path: str):
+        """Write the store to a compressed .npz file (atomically)"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = path + ".tmp.npz"
+        np.savez_compressed(
+            temporary,
+            user_ids=np.array(self.user_ids, dtype=str),
+            xtx=self.xtx, xty=self.xty, yty=self.yty, counts=self.counts,
+            weights=self.weights, residual_std=self.residual_std,
+            population_weights=self.population_weights,
+            ridge=self.ridge,
+            trained_until=np.nan if self.trained_until is None else self.trained_until,
+            features=np.array(RESPONSE_FEATURES, dtype=str)
+        )
+        os.replace(temporary, path)
+
+    @classmethod
+    def open(cls, path: str) -> "ResponseModelStore":
+        """Store served from `path`: a file that cannot be read is logged and
+        skipped, and picked up by reload_if_changed once it is rewritten"""
+        store = cls()
+        store.path = path
+        store.reload_if_changed(interval=0)
+        return store
+
+    @classmethod
+    def load(cls, path: str) -> "ResponseModelStore":
+        store = cls()
+        store.path = path
+        if os.path.exists(path):
+            store._read(path)
+        return store
+
+    def _read(self, path: str):
+        with np.load(path) as data:
+            if list(data["features"]) != RESPONSE_FEATURES:
+                raise ValueError(f"{path} was trained on different features; retrain it")
+            self.user_ids = [str(user_id) for user_id in data["user_ids"]]
+            self._rows = {user_id: row for row, user_id in enumerate(self.user_ids)}
+            self.xtx, self.xty, self.yty = data["xtx"], data["xty"], data["yty"]
+            self.counts = data["counts"]
+            self.weights, self.residual_std = data["weights"], data["residual_std"]
+            self.population_weights = data["population_weights"]
+            self.ridge = float(data["ridge"])
+            trained_until = float(data["trained_until"])
+            self.trained_until = None if np.isnan(trained_until) else trained_until
+        self._mtime = os.path.getmtime(path)
+
+    def reload_if_changed(self, interval: float = 60):
+        """Pick up a retrained file, checking its mtime at most every `interval` seconds"""
+        now = time.monotonic()
+        if not self.path or now - self._checked_at < interval:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    try:
+                        fresh = ResponseModelStore.load(self.path)
+                    except MODEL_FILE_ERRORS as e:
+                        # Keep serving the current models until the file changes again
+                        logger.warning("Keeping the current response models, %s is unreadable: %r", self.path, e)
+                        self._mtime = mtime
+                        return
+                    self.__dict__.update({
+                        key: value for key, value in fresh.__dict__.items() if key not in ("_lock", "_checked_at")
+                    })
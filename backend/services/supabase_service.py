@@ -1,26 +1,109 @@
 import os
-from supabase import create_client, Client
+import json
+import httpx
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any
+
+from services.profile_cache import ProfileCache
+from services.single_flight import SingleFlight
+
+# Tables where (user_id, timestamp) is unique: timestamp alone orders a
+# user's rows, so their (user_id, timestamp DESC) index needs no extra sort
+UNIQUE_TIMESTAMP_TABLES = {"glucose_readings"}
 
 
 class SupabaseService:
-    def __init__(self):
+    def __init__(
+        self,
+        rest_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        profile_cache: Optional[ProfileCache] = None
+    ):
+        """Async PostgREST client for Supabase.
+
+        `rest_url` (or SUPABASE_REST_URL) points the service at any PostgREST
+        server, e.g. a local one for tests; `transport` accepts an
+        httpx.MockTransport to run against a fake backend. Profiles are read
+        through `profile_cache` when one is given.
+        """
+        self.profile_cache = profile_cache
+        # Concurrent statistics requests for the same user and window share one query
+        self._statistics = SingleFlight()
         supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_KEY")
-        
-        if not supabase_url or not supabase_key:
-            raise ValueError("Supabase credentials not found in environment variables")
-        
-        self.client: Client = create_client(supabase_url, supabase_key)
-    
+        supabase_key = api_key or os.getenv("SUPABASE_KEY")
+        rest_url = rest_url or os.getenv("SUPABASE_REST_URL")
+
+        if not rest_url:
+            if not supabase_url or not supabase_key:
+                raise ValueError("Supabase credentials not found in environment variables")
+            rest_url = f"{supabase_url.rstrip('/')}/rest/v1"
+
+        headers = {}
+        if supabase_key:
+            headers = {"apikey": supabase_key, "Authorization": f"Bearer {supabase_key}"}
+
+        # A single pooled client keeps connections to PostgREST alive across requests
+        self.client = httpx.AsyncClient(
+            base_url=rest_url,
+            headers=headers,
+            limits=httpx.Limits(
+                max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20")),
+                max_keepalive_connections=int(os.getenv("SUPABASE_MAX_KEEPALIVE", "10")),
+                keepalive_expiry=float(os.getenv("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+            ),
+            timeout=float(os.getenv("SUPABASE_TIMEOUT", "10")),
+            transport=transport
+        )
+
+    async def close(self):
+        """Close pooled connections"""
+        await self.client.aclose()
+        if self.profile_cache:
+            await self.profile_cache.close()
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        data: Any = None,
+        prefer: Optional[str] = None
+    ) -> Any:
+        """Send a request to PostgREST and return the decoded JSON body"""
+        headers = {"Content-Type": "application/json"}
+        if prefer:
+            headers["Prefer"] = prefer
+
+        content = json.dumps(data, default=str) if data is not None else None
+        response = await self.client.request(method, path, params=params, content=content, headers=headers)
+        response.raise_for_status()
+        return response.json() if response.content else None
+
+    async def _select(self, table: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return await self._request("GET", f"/{table}", params=params) or []
+
+    async def _insert(self, table: str, data: Any) -> List[Dict[str, Any]]:
+        return await self._request("POST", f"/{table}", data=data, prefer="return=representation") or []
+
+    async def _bulk_insert(self, table: str, rows: List[Dict[str, Any]]):
+        """Insert rows (all with the same keys) in one request without returning them"""
+        await self._request("POST", f"/{table}", data=rows, prefer="return=minimal")
+
+    async def _update(self, table: str, data: Dict[str, Any], params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return await self._request("PATCH", f"/{table}", params=params, data=data, prefer="return=representation") or []
+
     async def create_user_profile(
         self,
         user_id: str,
         email: Optional[str] = None,
         name: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Create a new user profile"""
+        """Create the user's profile unless it exists; returns the stored profile
+
+        Safe to call concurrently: the insert ignores an existing row, and
+        whichever request loses the race reads the winner's profile.
+        """
         data = {
             "user_id": user_id,
             "email": email,
@@ -29,15 +112,31 @@ class SupabaseService:
             "created_at": datetime.utcnow().isoformat(),
             "updated_at": datetime.utcnow().isoformat()
         }
-        
-        result = self.client.table("user_profiles").insert(data).execute()
-        return result.data[0] if result.data else None
-    
+
+        result = await self._request(
+            "POST",
+            "/user_profiles",
+            params={"on_conflict": "user_id"},
+            data=data,
+            prefer="resolution=ignore-duplicates,return=representation"
+        )
+        if not result:
+            return await self.get_user_profile(user_id)
+
+        if self.profile_cache:
+            await self.profile_cache.set(user_id, result[0])
+        return result[0]
+
     async def get_user_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user profile by user_id"""
-        result = self.client.table("user_profiles").select("*").eq("user_id", user_id).execute()
-        return result.data[0] if result.data else None
-    
+        if self.profile_cache:
+            return await self.profile_cache.get(user_id, self._fetch_user_profile)
+        return await self._fetch_user_profile(user_id)
+
+    async def _fetch_user_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        result = await self._select("user_profiles", {"select": "*", "user_id": f"eq.{user_id}"})
+        return result[0] if result else None
+
     async def update_user_profile(
         self,
         user_id: str,
@@ -45,10 +144,12 @@ class SupabaseService:
     ) -> Dict[str, Any]:
         """Update user profile"""
         profile_data["updated_at"] = datetime.utcnow().isoformat()
-        
-        result = self.client.table("user_profiles").update(profile_data).eq("user_id", user_id).execute()
-        return result.data[0] if result.data else None
-    
+
+        result = await self._update("user_profiles", profile_data, {"user_id": f"eq.{user_id}"})
+        if self.profile_cache:
+            await self.profile_cache.invalidate(user_id)
+        return result[0] if result else None
+
     async def log_meal(
         self,
         user_id: str,
@@ -66,22 +167,26 @@ class SupabaseService:
             "dosha": dosha,
             "timestamp": datetime.utcnow().isoformat()
         }
-        
-        result = self.client.table("meal_logs").insert(data).execute()
-        return result.data[0] if result.data else None
-    
+
+        result = await self._insert("meal_logs", data)
+        return result[0] if result else None
+
+    async def insert_predictions(self, rows: List[Dict[str, Any]]):
+        """Store a batch of prediction rows in one insert"""
+        await self._bulk_insert("predictions", rows)
+
     async def get_meal_history(
         self,
         user_id: str,
-        days: int = 7
+        days: int = 7,
+        columns: str = "meal_items,exercise,lifestyle_factors,dosha",
+        limit: int = 1000,
+        after: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
-        """Get user's meal history for the last N days"""
-        cutoff_date = (datetime.utcnow() - timedelta(days=days)).isoformat()
-        
-        result = self.client.table("meal_logs").select("*").eq("user_id", user_id).gte("timestamp", cutoff_date).order("timestamp", desc=True).execute()
-        
-        return result.data if result.data else []
-    
+        """One page of the user's meals from the last N days, newest first"""
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        return await self.get_page("meal_logs", user_id, columns, start=cutoff_date, after=after, descending=True, limit=limit)
+
     async def add_glucose_reading(
         self,
         user_id: str,
@@ -96,42 +201,168 @@ class SupabaseService:
             "timestamp": timestamp.isoformat(),
             "notes": notes
         }
-        
-        result = self.client.table("glucose_readings").insert(data).execute()
-        return result.data[0] if result.data else None
-    
+
+        result = await self._insert("glucose_readings", data)
+        return result[0] if result else None
+
+    async def insert_glucose_readings(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert readings in one request, skipping any (user_id, timestamp) already stored
+
+        Returns the id and timestamp of the rows actually inserted.
+        """
+        return await self._request(
+            "POST", "/glucose_readings",
+            params={"on_conflict": "user_id,timestamp", "select": "id,timestamp"},
+            data=rows,
+            prefer="resolution=ignore-duplicates,return=representation"
+        ) or []
+
     async def get_glucose_history(
         self,
         user_id: str,
-        days: int = 30
+        days: int = 30,
+        columns: str = "glucose_value,notes,created_at",
+        limit: int = 1000,
+        after: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """One page of the user's glucose readings from the last N days, newest first"""
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        return await self.get_page("glucose_readings", user_id, columns, start=cutoff_date, after=after, descending=True, limit=limit)
+
+    async def iter_user_ids(self, page_size: int = 1000) -> AsyncIterator[List[str]]:
+        """Yield pages of all profile user ids (needs a service-role key)"""
+        last = None
+        while True:
+            params = {"select": "user_id", "order": "user_id.asc", "limit": page_size}
+            if last is not None:
+                params["user_id"] = f'gt."{last}"'
+            rows = await self._select("user_profiles", params)
+            if not rows:
+                return
+            yield [row["user_id"] for row in rows]
+            if len(rows) < page_size:
+                return
+            last = rows[-1]["user_id"]
+
+    @staticmethod
+    def _after(last: Dict[str, Any], descending: bool = False) -> str:
+        """PostgREST filter for rows after `last` in (timestamp, id) order"""
+        op = "lt" if descending else "gt"
+        return (
+            f'(timestamp.{op}."{last["timestamp"]}",'
+            f'and(timestamp.eq."{last["timestamp"]}",id.{op}.{last["id"]}))'
+        )
+
+    async def get_page(
+        self,
+        table: str,
+        user_id: str,
+        columns: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[Dict[str, Any]] = None,
+        descending: bool = False,
+        limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """One keyset page of a user's rows with start <= timestamp < end
+
+        Rows are ordered by (timestamp, id), so no row is skipped or repeated
+        when several share a timestamp; `after` is the last row (its
+        timestamp and id) of the previous page. Served by the table's
+        (user_id, timestamp DESC) index.
+        """
+        unique = table in UNIQUE_TIMESTAMP_TABLES
+        filters = []
+        if start is not None:
+            filters.append(f'timestamp.gte."{start.isoformat()}"')
+        if end is not None:
+            filters.append(f'timestamp.lt."{end.isoformat()}"')
+        if after is not None and unique:
+            filters.append(f'timestamp.{"lt" if descending else "gt"}."{after["timestamp"]}"')
+
+        direction = "desc" if descending else "asc"
+        params = {
+            "select": f"id,timestamp,{columns}" if columns else "id,timestamp",
+            "user_id": f"eq.{user_id}",
+            "order": f"timestamp.{direction}" if unique else f"timestamp.{direction},id.{direction}",
+            "limit": limit
+        }
+        if filters:
+            params["and"] = f"({','.join(filters)})"
+        if after is not None and not unique:
+            params["or"] = self._after(after, descending)
+        return await self._select(table, params)
+
+    async def iter_pages(
+        self,
+        table: str,
+        user_id: str,
+        columns: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[Dict[str, Any]] = None,
+        descending: bool = False,
+        page_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield every page of a user's rows in the window"""
+        while True:
+            page = await self.get_page(table, user_id, columns, start, end, after, descending, page_size)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            after = page[-1]
+
+    async def get_rows_between(
+        self,
+        table: str,
+        user_id: str,
+        columns: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        page_size: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """All of a user's rows with start <= timestamp < end, oldest first"""
+        rows: List[Dict[str, Any]] = []
+        async for page in self.iter_pages(table, user_id, columns, start, end, page_size=page_size):
+            rows.extend(page)
+        return rows
+
+    async def _rpc(self, function: str, params: Dict[str, Any]) -> Any:
+        return await self._request("POST", f"/rpc/{function}", data=params)
+
+    async def get_glucose_buckets(
+        self,
+        user_id: str,
+        start: datetime,
+        end: datetime,
+        bucket_seconds: int
     ) -> List[Dict[str, Any]]:
-        """Get glucose reading history"""
-        cutoff_date = (datetime.utcnow() - timedelta(days=days)).isoformat()
-        
-        result = self.client.table("glucose_readings").select("*").eq("user_id", user_id).gte("timestamp", cutoff_date).order("timestamp", desc=True).execute()
-        
-        return result.data if result.data else []
-    
-    async def get_user_statistics(self, user_id: str) -> Dict[str, Any]:
-        """Get user's health statistics"""
-        # Get recent glucose readings
-        recent_glucose = await self.get_glucose_history(user_id, days=7)
-        
-        # Calculate averages
-        if recent_glucose:
-            avg_glucose = sum(r["glucose_value"] for r in recent_glucose) / len(recent_glucose)
-            max_glucose = max(r["glucose_value"] for r in recent_glucose)
-            min_glucose = min(r["glucose_value"] for r in recent_glucose)
-        else:
-            avg_glucose = max_glucose = min_glucose = None
-        
-        # Get meal count
-        recent_meals = await self.get_meal_history(user_id, days=7)
-        
+        """Per-bucket count, min/mean/max and 5th-95th percentiles of a user's readings"""
+        return await self._rpc("get_glucose_buckets", {
+            "p_user_id": user_id,
+            "p_start": start.isoformat(),
+            "p_end": end.isoformat(),
+            "p_bucket": f"{bucket_seconds} seconds"
+        }) or []
+
+    async def get_user_statistics(self, user_id: str, days: int = 7) -> Dict[str, Any]:
+        """Get user's rolling-window health statistics from the hourly glucose summaries"""
+        result = await self._statistics.do(
+            (user_id, days),
+            lambda: self._rpc("get_user_statistics", {"p_user_id": user_id, "p_days": days})
+        )
+        stats = result[0] if result else {}
+
+        avg_glucose = stats.get("avg_glucose")
+        time_in_range = stats.get("time_in_range")
         return {
-            "avg_glucose_7days": avg_glucose,
-            "max_glucose_7days": max_glucose,
-            "min_glucose_7days": min_glucose,
-            "meal_logs_7days": len(recent_meals),
-            "glucose_readings_7days": len(recent_glucose)
-        }
\ No newline at end of file
+            "avg_glucose_7days": float(avg_glucose) if avg_glucose is not None else None,
+            "max_glucose_7days": stats.get("max_glucose"),
+            "min_glucose_7days": stats.get("min_glucose"),
+            "time_in_range_7days": float(time_in_range) if time_in_range is not None else None,
+            "last_glucose": stats.get("last_glucose"),
+            "last_glucose_at": stats.get("last_glucose_at"),
+            "meal_logs_7days": stats.get("meal_logs", 0),
+            "glucose_readings_7days": stats.get("glucose_readings", 0)
+        }
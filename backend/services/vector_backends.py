@@ -0,0 +1,206 @@
+from typing import List, Dict, Any, Optional
+import numpy as np
+
+
+class ChromaBackend:
+    """ChromaDB collection with HNSW cosine index"""
+
+    def __init__(self, persist_directory: str, collection_name: str = "ayurveda_knowledge"):
+        import chromadb
+        from chromadb.config import Settings
+
+        self.collection_name = collection_name
+        self.client = chromadb.Client(Settings(
+            persist_directory=persist_directory,
+            anonymized_telemetry=False
+        ))
+
+        # Create or get collection
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+    def add(
+        self,
+        ids: List[str],
+        documents: List[str],
+        embeddings: np.ndarray,
+        metadatas: Optional[List[Dict[str, Any]]] = None
+    ):
+        if metadatas:
+            self.collection.add(
+                documents=documents,
+                embeddings=np.asarray(embeddings).tolist(),
+                metadatas=metadatas,
+                ids=ids
+            )
+        else:
+            self.collection.add(
+                documents=documents,
+                embeddings=np.asarray(embeddings).tolist(),
+                ids=ids
+            )
+
+    def query(
+        self,
+        embeddings: np.ndarray,
+        n_results: int,
+        where: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        kwargs = {"where": where} if where else {}
+        return self.collection.query(
+            query_embeddings=np.asarray(embeddings).tolist(),
+            n_results=n_results,
+            **kwargs
+        )
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def get_all(self) -> Dict[str, Any]:
+        return self.collection.get(include=["documents", "metadatas"])
+
+    def reset(self):
+        """Drop and recreate the collection"""
+        self.client.delete_collection(self.collection_name)
+        self.collection = self.client.create_collection(
+            name=self.collection_name,
+            metadata={"hnsw:space": "cosine"}
+        )
+
+
+class NumpyBackend:
+    """Exact in-memory cosine search over one contiguous float32 matrix.
+
+    Embeddings are L2-normalized once when added, so a query is a single
+    matrix product followed by `argpartition`. Metadata filters are evaluated
+    as boolean masks over per-key value columns before scoring. Results use
+    the same shape and cosine distances as a Chroma query.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self._columns: Dict[str, np.ndarray] = {}
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+    def add(
+        self,
+        ids: List[str],
+        documents: List[str],
+        embeddings: np.ndarray,
+        metadatas: Optional[List[Dict[str, Any]]] = None
+    ):
+        vectors = self._normalize(embeddings)
+        self.matrix = np.ascontiguousarray(
+            vectors if self.matrix.size == 0 else np.vstack([self.matrix, vectors])
+        )
+        self.ids.extend(ids)
+        self.documents.extend(documents)
+        self.metadatas.extend(metadatas or [{} for _ in documents])
+        self._build_columns()
+
+    def _build_columns(self):
+        """Index metadata as one object array per key for vectorized filtering"""
+        keys = {key for metadata in self.metadatas for key in metadata}
+        self._columns = {
+            key: np.array([metadata.get(key) for metadata in self.metadatas], dtype=object)
+            for key in keys
+        }
+
+    def _column(self, key: str) -> np.ndarray:
+        column = self._columns.get(key)
+        if column is None:
+            return np.full(len(self.ids), None, dtype=object)
+        return column
+
+    def _mask(self, where: Dict[str, Any]) -> np.ndarray:
+        """Evaluate a Chroma-style `where` filter ($eq, $ne, $in, $nin, $and, $or)"""
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self._mask(clause)
+            elif key == "$or":
+                any_mask = np.zeros(len(self.ids), dtype=bool)
+                for clause in condition:
+                    any_mask |= self._mask(clause)
+                mask &= any_mask
+            else:
+                column = self._column(key)
+                if not isinstance(condition, dict):
+                    condition = {"$eq": condition}
+                for operator, value in condition.items():
+                    if operator == "$eq":
+                        mask &= column == value
+                    elif operator == "$ne":
+                        mask &= column != value
+                    elif operator == "$in":
+                        mask &= np.isin(column, value)
+                    elif operator == "$nin":
+                        mask &= ~np.isin(column, value)
+                    else:
+                        raise ValueError(f"Unsupported filter operator: {operator}")
+        return mask
+
+    def query(
+        self,
+        embeddings: np.ndarray,
+        n_results: int,
+        where: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        queries = self._normalize(np.atleast_2d(embeddings))
+
+        candidates = None
+        matrix = self.matrix
+        if where:
+            candidates = np.flatnonzero(self._mask(where))
+            matrix = self.matrix[candidates]
+
+        k = min(n_results, len(matrix))
+        if k == 0:
+            empty = [[] for _ in range(len(queries))]
+            return {"ids": empty, "documents": empty, "distances": empty, "metadatas": empty}
+
+        scores = queries @ matrix.T
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        if candidates is not None:
+            top = candidates[top]
+
+        return {
+            "ids": [[self.ids[i] for i in row] for row in top],
+            "documents": [[self.documents[i] for i in row] for row in top],
+            "distances": (1 - top_scores).tolist(),
+            "metadatas": [[self.metadatas[i] for i in row] for row in top]
+        }
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    def get_all(self) -> Dict[str, Any]:
+        return {"ids": list(self.ids), "documents": list(self.documents), "metadatas": list(self.metadatas)}
+
+
+def create_vector_backend(name: str, persist_directory: str, collection_name: str = "ayurveda_knowledge"):
+    """Build the backend selected by VECTOR_BACKEND ("chroma" or "numpy")"""
+    if name == "chroma":
+        return ChromaBackend(persist_directory, collection_name)
+    if name == "numpy":
+        return NumpyBackend()
+    raise ValueError(f"Unknown VECTOR_BACKEND: {name}")
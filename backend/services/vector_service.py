@@ -1,83 +1,289 @@
 import os
-from typing import List, Dict, Any
+import json
+import hashlib
+import threading
+import time
+from typing import List, Dict, Any, Optional, Union
 import numpy as np
 from sentence_transformers import SentenceTransformer
-import chromadb
-from chromadb.config import Settings
+
+from services.embedding_cache import EmbeddingCache
+from services.vector_backends import create_vector_backend
+
+
+def dosha_components(dosha: str) -> List[str]:
+    """Split a dosha profile such as "Vata-Pitta" into corpus dosha labels"""
+    if dosha.strip().lower() == "tridoshic":
+        return ["vata", "pitta", "kapha"]
+    return [part.strip().lower() for part in dosha.replace("/", "-").split("-") if part.strip()]
+
+
+def build_filter(
+    dosha: Optional[str] = None,
+    category: Union[None, str, List[str]] = None,
+    topic: Union[None, str, List[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """Build a metadata `where` filter over the corpus dosha/category/topic fields"""
+    clauses = []
+    if dosha:
+        clauses.append({"dosha": {"$in": dosha_components(dosha)}})
+    for key, value in (("category", category), ("topic", topic)):
+        if isinstance(value, list):
+            clauses.append({key: {"$in": value}})
+        elif value:
+            clauses.append({key: value})
+    
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+# Food lookups only need the per-food and dosha diet documents
+FOOD_FILTER = build_filter(category=["foods", "diet"])
+
+_models: Dict[str, SentenceTransformer] = {}
+_models_lock = threading.Lock()
+
+# Engines whose retrieval has not been checked against torch on the corpus
+# (benchmarks/benchmark_embedding_engines.py); opt in with EMBEDDING_EXPERIMENTAL=true
+EXPERIMENTAL_ENGINES = ("onnx", "openvino")
+
+
+def embedding_engine() -> str:
+    """The engine selected by EMBEDDING_BACKEND, refusing unverified ones unless opted in"""
+    backend = os.getenv("EMBEDDING_BACKEND", "torch").lower() or "torch"
+    if backend == "torch":
+        return backend
+    if backend not in EXPERIMENTAL_ENGINES:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+    if os.getenv("EMBEDDING_EXPERIMENTAL", "false").lower() != "true":
+        raise ValueError(
+            f"EMBEDDING_BACKEND={backend} is experimental (parity with torch is unverified); "
+            "set EMBEDDING_EXPERIMENTAL=true to use it"
+        )
+    return backend
+
+
+def get_embedding_model(
+    model_name: str,
+    backend: Optional[str] = None,
+    model_file: Optional[str] = None
+) -> SentenceTransformer:
+    """Load an embedding model once per process and share it.
+
+    `backend` selects the inference engine ("torch", or the experimental
+    "onnx"/"openvino", which need `pip install sentence-transformers[onnx]`);
+    `model_file` picks an exported variant such as onnx/model_quint8_avx2.onnx
+    (int8). Both default to EMBEDDING_BACKEND (see embedding_engine) /
+    EMBEDDING_MODEL_FILE.
+
+    Calling this before the server forks its workers (gunicorn --preload,
+    see gunicorn.conf.py) lets every worker share the weights copy-on-write.
+    """
+    backend = backend or embedding_engine()
+    model_file = model_file or os.getenv("EMBEDDING_MODEL_FILE") or None
+    key = f"{model_name}:{backend}:{model_file or ''}"
+    
+    with _models_lock:
+        if key not in _models:
+            if backend == "torch":
+                _models[key] = SentenceTransformer(model_name)
+            else:
+                _models[key] = SentenceTransformer(
+                    model_name,
+                    backend=backend,
+                    model_kwargs={"file_name": model_file} if model_file else None
+                )
+        return _models[key]
+
+
+def collection_name(embedding_id: str, default_id: str, base: str = "ayurveda_knowledge") -> str:
+    """Collection holding documents embedded by `embedding_id`
+
+    Vectors from different engines (or an int8 export) are not comparable,
+    so each engine indexes the corpus in its own collection. The default
+    engine keeps the original name, so existing collections stay valid.
+    """
+    if embedding_id == default_id:
+        return base
+    return f"{base}_{hashlib.sha256(embedding_id.encode()).hexdigest()[:12]}"
 
 
 class VectorService:
+    MODEL_NAME = 'all-MiniLM-L6-v2'  # Lightweight, free model
+    
     def __init__(self):
-        """Initialize vector database with ChromaDB (free, local/cloud option)"""
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')  # Lightweight, free model
-        
-        # Initialize ChromaDB
-        persist_directory = os.getenv("CHROMA_PERSIST_DIR", "./chroma_db")
-        self.client = chromadb.Client(Settings(
-            persist_directory=persist_directory,
-            anonymized_telemetry=False
-        ))
+        """Initialize vector database (ChromaDB by default, or in-memory NumPy)"""
+        self.model_name = self.MODEL_NAME  # Loaded on first use, see get_embedding_model
+        self.embedding_backend = embedding_engine()
+        self.model_file = os.getenv("EMBEDDING_MODEL_FILE") or None
+        self.embedding_id = f"{self.model_name}:{self.embedding_backend}:{self.model_file or ''}"
+        
+        # Most queries are fixed templates, so cache their embeddings (per
+        # engine, since quantized models produce slightly different vectors)
+        self.embedding_cache = EmbeddingCache(
+            lambda texts: self.model.encode(texts),
+            namespace=self.embedding_id,
+            max_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")),
+            ttl=float(os.getenv("EMBEDDING_CACHE_TTL", "0")) or None,
+            persist_path=os.getenv("EMBEDDING_CACHE_PATH") or None
+        )
+        
+        # Initialize the document index; switching engines opens (and on
+        # warmup fills) that engine's collection, so documents are re-embedded
+        self.backend = create_vector_backend(
+            os.getenv("VECTOR_BACKEND", "chroma").lower(),
+            persist_directory=os.getenv("CHROMA_PERSIST_DIR", "./chroma_db"),
+            collection_name=collection_name(self.embedding_id, f"{self.MODEL_NAME}:torch:")
+        )
         
-        # Create or get collection
-        self.collection = self.client.get_or_create_collection(
-            name="ayurveda_knowledge",
-            metadata={"hnsw:space": "cosine"}
+        # Another process (init_vector_db.py) may reload a persistent collection,
+        # so the corpus hash is re-read after CORPUS_VERSION_TTL seconds
+        self.corpus_version_ttl = float(os.getenv("CORPUS_VERSION_TTL", "60"))
+        self._corpus_version = None
+        self._corpus_checked_at = 0.0
+    
+    @property
+    def model(self) -> SentenceTransformer:
+        return get_embedding_model(self.model_name, self.embedding_backend, self.model_file)
+    
+    def warmup(self):
+        """Load the model, populate the index and run one query so the first request is fast"""
+        self.initialize_ayurveda_knowledge()
+        self.search("ayurveda", n_results=1)
+    
+    @property
+    def corpus_version_expired(self) -> bool:
+        """Whether the corpus hash must be recomputed before it can be trusted"""
+        return (
+            self._corpus_version is None
+            or time.monotonic() - self._corpus_checked_at >= self.corpus_version_ttl
         )
     
+    @property
+    def corpus_version(self) -> str:
+        """Hash of the indexed corpus and its embedding engine, recomputed when documents change or it expires"""
+        if self.corpus_version_expired:
+            self.refresh_corpus_version()
+        return self._corpus_version
+    
+    def refresh_corpus_version(self) -> str:
+        """Recompute the corpus hash, e.g. after another process reloaded the collection"""
+        contents = self.backend.get_all()
+        entries = sorted(zip(
+            contents['ids'],
+            contents['documents'] or [],
+            [json.dumps(m, sort_keys=True) for m in contents['metadatas'] or []]
+        ))
+        
+        digest = hashlib.sha256(self.embedding_id.encode())
+        for entry in entries:
+            digest.update("\x1f".join(entry).encode())
+            digest.update(b"\x1e")
+        
+        self._corpus_version = digest.hexdigest()
+        self._corpus_checked_at = time.monotonic()
+        return self._corpus_version
+    
     def add_documents(self, documents: List[str], metadata: List[Dict[str, Any]] = None):
         """Add documents to the vector database"""
         if not documents:
             return
         
         # Generate embeddings
-        embeddings = self.model.encode(documents).tolist()
-        
-        # Generate IDs
-        ids = [f"doc_{i}" for i in range(len(documents))]
-        
-        # Add to collection
-        if metadata:
-            self.collection.add(
-                documents=documents,
-                embeddings=embeddings,
-                metadatas=metadata,
-                ids=ids
-            )
-        else:
-            self.collection.add(
-                documents=documents,
-                embeddings=embeddings,
-                ids=ids
-            )
+        embeddings = self.model.encode(documents)
+        self._corpus_version = None
+        
+        # Generate IDs (continuing after the documents already indexed)
+        start = self.get_collection_count()
+        ids = [f"doc_{start + i}" for i in range(len(documents))]
+        
+        # Add to the index
+        self.backend.add(ids, documents, embeddings, metadata)
     
-    def search(self, query: str, n_results: int = 5) -> List[Dict[str, Any]]:
-        """Search for relevant documents"""
-        # Generate query embedding
-        query_embedding = self.model.encode([query])[0].tolist()
+    def reset(self):
+        """Remove all documents from the index"""
+        self.backend.reset()
+        self._corpus_version = None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Query embedding cache counters"""
+        return {"embedding_cache": self.embedding_cache.stats()}
+    
+    def search(
+        self,
+        query: str,
+        n_results: int = 5,
+        where: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for relevant documents, optionally restricted by a metadata filter"""
+        return self.search_many([query], n_results, where)[0]
+    
+    def search_many(
+        self,
+        queries: List[str],
+        n_results: Union[int, List[int]] = 5,
+        where: Union[None, Dict[str, Any], List[Optional[Dict[str, Any]]]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Search for several queries with one batched encode and one index query per filter"""
+        if not queries:
+            return []
         
-        # Search in collection
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=n_results
-        )
+        limits = n_results if isinstance(n_results, list) else [n_results] * len(queries)
+        filters = where if isinstance(where, list) else [where] * len(queries)
         
-        # Format results
+        # Generate all query embeddings in one pass (cached queries are skipped)
+        query_embeddings = self.embedding_cache.encode(queries)
+        
+        # Queries sharing a filter go to the index together
+        groups: Dict[str, List[int]] = {}
+        for i, query_filter in enumerate(filters):
+            groups.setdefault(json.dumps(query_filter, sort_keys=True), []).append(i)
+        
+        result_sets: List[List[Dict[str, Any]]] = [[] for _ in queries]
+        for indices in groups.values():
+            results = self.backend.query(
+                query_embeddings[indices],
+                n_results=max(limits[i] for i in indices),
+                where=filters[indices[0]]
+            )
+            for position, i in enumerate(indices):
+                result_sets[i] = self._format_results(results, position)[:limits[i]]
+        
+        return result_sets
+    
+    @staticmethod
+    def unique_documents(result_sets: List[List[Dict[str, Any]]]) -> List[str]:
+        """Flatten `search_many` results, keeping the first hit of each document"""
+        documents = []
+        seen = set()
+        for results in result_sets:
+            for result in results:
+                if result['document'] not in seen:
+                    seen.add(result['document'])
+                    documents.append(result['document'])
+        
+        return documents
+    
+    @staticmethod
+    def _format_results(results: Dict[str, Any], index: int) -> List[Dict[str, Any]]:
+        """Format the results of the `index`-th query of a backend query"""
         formatted_results = []
-        if results['documents'] and results['documents'][0]:
-            for i, doc in enumerate(results['documents'][0]):
+        if results['documents'] and results['documents'][index]:
+            for i, doc in enumerate(results['documents'][index]):
                 result = {
                     'document': doc,
-                    'distance': results['distances'][0][i] if results['distances'] else None
+                    'distance': results['distances'][index][i] if results['distances'] else None
                 }
-                if results['metadatas'] and results['metadatas'][0]:
-                    result['metadata'] = results['metadatas'][0][i]
+                if results['metadatas'] and results['metadatas'][index]:
+                    result['metadata'] = results['metadatas'][index][i]
                 formatted_results.append(result)
         
         return formatted_results
     
     def get_collection_count(self) -> int:
         """Get number of documents in collection"""
-        return self.collection.count()
+        return self.backend.count()
     
     def initialize_ayurveda_knowledge(self):
         """Initialize the database with Ayurvedic knowledge"""
@@ -101,17 +307,31 @@ class VectorService:
         
         print(f"Added {len(documents)} documents to knowledge base")
     
-    def search_by_condition(self, condition: str, dosha: str = None) -> List[str]:
+    def search_by_condition(
+        self,
+        condition: str,
+        dosha: str = None,
+        category: Union[None, str, List[str]] = None
+    ) -> List[str]:
         """Search for foods and remedies for specific health conditions"""
         query = f"{condition}"
         if dosha:
             query += f" {dosha} dosha"
         
-        results = self.search(query, n_results=10)
+        results = self.search(query, n_results=10, where=build_filter(category=category))
         return [r['document'] for r in results]
     
-    def get_food_properties(self, food_name: str) -> List[str]:
+    @staticmethod
+    def food_properties_query(food_name: str) -> str:
+        """Query used to look up the Ayurvedic properties of a food item"""
+        return f"properties of {food_name} taste qualities effects"
+    
+    def get_food_properties(
+        self,
+        food_name: str,
+        where: Optional[Dict[str, Any]] = FOOD_FILTER
+    ) -> List[str]:
         """Get Ayurvedic properties of a food item"""
-        query = f"properties of {food_name} taste qualities effects"
-        results = self.search(query, n_results=5)
-        return [r['document'] for r in results]
\ No newline at end of file
+        query = self.food_properties_query(food_name)
+        results = self.search(query, n_results=5, where=where)
+        return [r['document'] for r in results]
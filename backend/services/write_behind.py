@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Network errors, rate limiting and server errors are worth retrying"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, (httpx.TransportError, asyncio.TimeoutError, OSError))
+
+
+class WriteBehindQueue:
+    """Buffers rows and writes them in batches from a background task
+
+    `put` never waits, so callers add no latency. Rows are flushed when
+    `batch_size` have accumulated or `flush_interval` seconds after the
+    first one arrived. Failed batches are retried with exponential backoff;
+    a batch the server rejects outright is written row by row so one bad
+    row does not take the others with it.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_queue: int = 10000,
+        max_retries: int = 5,
+        retry_backoff: float = 0.5
+    ):
+        self.write = write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.retries = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10):
+        """Flush what is queued and stop the background task"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Write-behind queue not drained on shutdown, %d rows lost", self._queue.qsize())
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def put(self, row: Dict[str, Any]) -> bool:
+        """Queue a row for writing; returns False (and drops it) if the queue is full"""
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Write-behind queue full, dropping row")
+            return False
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "retries": self.retries
+        }
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._flush(batch)
+            except Exception:
+                logger.exception("Write-behind flush failed")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _flush(self, batch: List[Dict[str, Any]]):
+        self.batches += 1
+        try:
+            await self._write_with_retry(batch)
+            self.written += len(batch)
+            return
+        except Exception as e:
+            if is_retryable(e) or len(batch) == 1:
+                self.dropped += len(batch)
+                logger.error("Dropping %d rows after failed writes: %r", len(batch), e)
+                return
+
+        # Rejected batch: isolate the offending rows
+        for row in batch:
+            try:
+                await self._write_with_retry([row])
+                self.written += 1
+            except Exception as e:
+                self.dropped += 1
+                logger.error("Dropping rejected row: %r", e)
+
+    async def _write_with_retry(self, rows: List[Dict[str, Any]]):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self.write(rows)
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                self.retries += 1
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
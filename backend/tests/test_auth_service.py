@@ -0,0 +1,139 @@
+import asyncio
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from services.auth_service import JWKSKeyStore, TokenVerifier, VerifiedTokenCache
+
+ISSUER = "https://example.supabase.co/auth/v1"
+
+
+def make_key(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update(kid=kid, use="sig", alg="RS256")
+    return private_key, jwk
+
+
+class FakeJWKS:
+    """JWKS endpoint whose keys can be rotated"""
+
+    def __init__(self, *jwks):
+        self.keys = list(jwks)
+        self.fetches = 0
+
+    async def __call__(self):
+        self.fetches += 1
+        return {"keys": list(self.keys)}
+
+
+@pytest.fixture(scope="module")
+def keys():
+    return make_key("k1"), make_key("k2")
+
+
+def sign(private_key, kid, **claims):
+    payload = {"sub": "u1", "iss": ISSUER, "aud": "authenticated", "exp": int(time.time()) + 600}
+    payload.update(claims)
+    return jwt.encode(payload, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+def make_verifier(jwks, **kwargs):
+    store = JWKSKeyStore("https://example.invalid/jwks", fetcher=jwks, **kwargs)
+    return TokenVerifier(store, issuer=ISSUER, audience="authenticated", algorithms=["RS256"])
+
+
+def test_keys_are_fetched_once_for_many_tokens(keys):
+    (private_key, jwk), _ = keys
+    jwks = FakeJWKS(jwk)
+    tokens = [sign(private_key, "k1", sub=f"u{i}") for i in range(20)]
+
+    verifier = make_verifier(jwks)
+
+    async def run():
+        return await asyncio.gather(*[verifier.verify(token) for token in tokens])
+
+    payloads = asyncio.run(run())
+
+    assert [payload["sub"] for payload in payloads] == [f"u{i}" for i in range(20)]
+    assert jwks.fetches == 1
+
+
+def test_unknown_kid_refreshes_the_key_set(keys):
+    (old_key, old_jwk), (new_key, new_jwk) = keys
+    jwks = FakeJWKS(old_jwk)
+    verifier = make_verifier(jwks, min_refresh_interval=0)
+
+    async def run():
+        await verifier.verify(sign(old_key, "k1"))
+        jwks.keys.append(new_jwk)
+        return await verifier.verify(sign(new_key, "k2"))
+
+    assert asyncio.run(run())["sub"] == "u1"
+    assert jwks.fetches == 2
+
+
+def test_unknown_kid_refreshes_are_rate_limited(keys):
+    (private_key, jwk), (other_key, _) = keys
+    jwks = FakeJWKS(jwk)
+    verifier = make_verifier(jwks, min_refresh_interval=30)
+
+    async def run():
+        await verifier.verify(sign(private_key, "k1"))
+        for _ in range(5):
+            with pytest.raises(jwt.InvalidTokenError):
+                await verifier.verify(sign(other_key, "nope"))
+
+    asyncio.run(run())
+    assert jwks.fetches == 1
+
+
+def test_invalid_tokens_are_rejected_and_not_cached(keys):
+    (private_key, jwk), (other_key, _) = keys
+    verifier = make_verifier(FakeJWKS(jwk))
+    forged = sign(other_key, "k1")
+    wrong_issuer = sign(private_key, "k1", iss="https://evil.example")
+
+    for token in (forged, wrong_issuer, forged):
+        with pytest.raises(jwt.PyJWTError):
+            asyncio.run(verifier.verify(token))
+    assert verifier.token_cache.get(forged) is None
+
+
+def test_verified_tokens_skip_signature_checks(keys, monkeypatch):
+    (private_key, jwk), _ = keys
+    verifier = make_verifier(FakeJWKS(jwk))
+    token = sign(private_key, "k1")
+    first = asyncio.run(verifier.verify(token))
+
+    monkeypatch.setattr(jwt, "decode", lambda *args, **kwargs: pytest.fail("decoded again"))
+    assert asyncio.run(verifier.verify(token)) is first
+
+
+def test_token_cache_honours_exp_and_max_ttl(monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(time, "time", lambda: now)
+    cache = VerifiedTokenCache(max_ttl=300)
+
+    cache.put("short", {"sub": "u1", "exp": now + 10})
+    cache.put("long", {"sub": "u2", "exp": now + 3600})
+    cache.put("expired", {"sub": "u3", "exp": now - 1})
+    assert cache.get("short") and cache.get("long") and cache.get("expired") is None
+
+    now += 60
+    assert cache.get("short") is None and cache.get("long")
+    now += 300
+    assert cache.get("long") is None
+
+
+def test_token_cache_evicts_least_recently_used():
+    cache = VerifiedTokenCache(max_size=2)
+    cache.put("a", {"sub": "a"})
+    cache.put("b", {"sub": "b"})
+    cache.get("a")
+    cache.put("c", {"sub": "c"})
+
+    assert cache.get("a") and cache.get("c") and cache.get("b") is None
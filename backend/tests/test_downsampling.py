@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+import main
+from services.downsampling import bucket_points, downsample_readings, lttb, parse_bucket
+
+
+@pytest.mark.parametrize("bucket, seconds", [("5m", 300), ("1h", 3600), (" 2H ", 7200), ("1d", 86400)])
+def test_parse_bucket(bucket, seconds):
+    assert parse_bucket(bucket) == seconds
+
+
+@pytest.mark.parametrize("bucket", ["0h", "1w", "h", "1.5h", ""])
+def test_parse_bucket_rejects(bucket):
+    with pytest.raises(ValueError):
+        parse_bucket(bucket)
+
+
+def test_lttb_keeps_ends_and_spikes():
+    x = np.arange(1000, dtype=np.float64)
+    y = np.full(1000, 100.0)
+    y[400], y[700] = 250.0, 45.0
+
+    selected = lttb(x, y, 50)
+
+    assert len(selected) == 50
+    assert selected[0] == 0 and selected[-1] == 999
+    assert np.all(np.diff(selected) > 0)
+    assert 400 in selected and 700 in selected
+
+
+def test_lttb_returns_everything_below_the_threshold():
+    assert list(lttb(np.arange(5), np.arange(5), 10)) == [0, 1, 2, 3, 4]
+    assert list(lttb(np.arange(5), np.arange(5), 2)) == [0, 1, 2, 3, 4]
+
+
+def test_downsample_readings():
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    readings = [
+        {"timestamp": (start + timedelta(minutes=5 * i)).isoformat(), "glucose_value": 100 + (i % 7)}
+        for i in range(500)
+    ]
+
+    sampled = downsample_readings(readings, 40)
+
+    assert len(sampled) == 40
+    assert sampled[0] is readings[0] and sampled[-1] is readings[-1]
+    assert downsample_readings(readings[:10], 40) == readings[:10]
+
+
+def test_bucket_points():
+    rows = [{"bucket": "2026-01-01T00:00:00+00:00", "readings": 12, "min_glucose": 90,
+             "mean_glucose": 104.5, "max_glucose": 130, "p5": 91.0}]
+    assert bucket_points(rows) == [{
+        "timestamp": "2026-01-01T00:00:00+00:00", "glucose_value": 104.5, "min_glucose": 90, "max_glucose": 130
+    }]
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.calls = []
+
+    async def get_glucose_buckets(self, user_id, start, end, bucket_seconds):
+        self.calls.append(("buckets", bucket_seconds))
+        count = int((end - start).total_seconds() // bucket_seconds)
+        return [
+            {"bucket": (start + timedelta(seconds=bucket_seconds * i)).isoformat(), "readings": 3,
+             "min_glucose": 90, "mean_glucose": 100, "max_glucose": 110}
+            for i in range(count)
+        ]
+
+    async def get_rows_between(self, table, user_id, columns, start, end=None, page_size=1000):
+        self.calls.append(("rows", page_size))
+        return [
+            {"timestamp": (start + timedelta(minutes=5 * i)).isoformat(), "glucose_value": 100 + i % 9}
+            for i in range(2000)
+        ]
+
+
+def chart(monkeypatch, days, points):
+    supabase = FakeSupabase()
+    monkeypatch.setattr(main, "supabase_service", supabase, raising=False)
+    response = asyncio.run(main.get_glucose_history(
+        days=days, limit=1000, cursor=None, fields=None, format="json",
+        points=points, bucket=None, user={"sub": "u1"}
+    ))
+    return supabase.calls, response
+
+
+def test_short_chart_windows_are_downsampled_from_readings(monkeypatch):
+    calls, response = chart(monkeypatch, days=7, points=100)
+
+    assert [call[0] for call in calls] == ["rows"]
+    assert len(response["data"]) == 100 and response["total"] == 2000
+
+
+def test_long_chart_windows_are_bucketed_in_the_database(monkeypatch):
+    calls, response = chart(monkeypatch, days=3650, points=500)
+
+    assert [call[0] for call in calls] == ["buckets"]
+    assert len(response["data"]) <= 500
+    assert response["bucket_seconds"] == calls[0][1]
@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+import numpy as np
+import pytest
+
+from services.ayurveda_service import AyurvedaService
+from services.vector_service import VectorService
+
+
+class FakeVectorService:
+    """Corpus whose version can be changed behind the service's back"""
+
+    def __init__(self):
+        self.version = "v1"
+        self.corpus_version_expired = True
+        self.refreshes = 0
+        self.rebuilds = 0
+        self.searches = 0
+
+    @property
+    def corpus_version(self):
+        return self.version
+
+    def refresh_corpus_version(self):
+        self.refreshes += 1
+        time.sleep(0.02)
+        self.corpus_version_expired = False
+        return self.version
+
+    def search(self, query, n_results=10):
+        self.searches += 1
+        time.sleep(0.01)
+        return [{"document": f"{self.version} live: {query}", "distance": 0.5}]
+
+    def search_many(self, queries, n_results=10):
+        self.rebuilds += 1
+        time.sleep(0.05)
+        return [[{"document": f"{self.version}: {query}", "distance": 0.25}] for query in queries]
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("RESPONSE_MODEL_PATH", str(tmp_path / "none.npz"))
+    monkeypatch.delenv("PREDICTION_CACHE_PATH", raising=False)
+    return AyurvedaService(FakeVectorService(), supabase_service=None)
+
+
+def suggest(service, count=20, settle=True):
+    """`count` concurrent requests, then (if `settle`) wait for any background rebuild"""
+    async def run():
+        results = await asyncio.gather(*[
+            service.get_food_recommendations("glucose", "Vata") for _ in range(count)
+        ])
+        if settle and service._food_recommendations_task is not None:
+            await service._food_recommendations_task
+        return results
+    return asyncio.run(run())
+
+
+def test_cold_table_is_built_once_in_the_background(service):
+    results = suggest(service)
+
+    vectors = service.vector_service
+    assert vectors.refreshes == 1 and vectors.rebuilds == 1
+    # Requests that arrived before the table was built shared one live search
+    assert vectors.searches == 1
+    assert all(result == results[0] for result in results)
+    assert results[0][0]["context"].startswith("v1 live:")
+
+    results = suggest(service)
+    assert vectors.searches == 1 and vectors.rebuilds == 1
+    assert results[0][0]["relevance"] == 0.75
+
+
+def test_callers_cannot_change_the_shared_table(service):
+    asyncio.run(service.refresh_food_recommendations())
+
+    first = suggest(service, count=1)[0]
+    first[0]["context"] = "changed"
+    first.clear()
+
+    assert suggest(service, count=1)[0][0]["context"].startswith("v1:")
+
+
+def test_table_is_rebuilt_when_the_corpus_changes(service):
+    asyncio.run(service.refresh_food_recommendations())
+    service.vector_service.version = "v2"
+    service.vector_service.corpus_version_expired = True
+
+    # Out of date: answered live from the new corpus while the table rebuilds
+    assert suggest(service, count=5)[0][0]["context"].startswith("v2 live:")
+    assert service.vector_service.rebuilds == 2
+    assert suggest(service, count=5)[0][0]["context"].startswith("v2:")
+
+
+def test_corpus_version_is_rechecked_after_its_ttl(monkeypatch):
+    monkeypatch.setenv("VECTOR_BACKEND", "numpy")
+    monkeypatch.setenv("CORPUS_VERSION_TTL", "60")
+    vectors = VectorService()
+    before = vectors.corpus_version
+    assert not vectors.corpus_version_expired
+
+    # Written straight to the index, as another process would
+    vectors.backend.add(["doc_0"], ["Fresh ginger kindles agni"], np.ones((1, 4)), [{"category": "diet"}])
+    assert vectors.corpus_version == before
+
+    vectors._corpus_checked_at -= 60
+    assert vectors.corpus_version_expired
+    assert vectors.corpus_version != before
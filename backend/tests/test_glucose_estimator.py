@@ -0,0 +1,82 @@
+import pytest
+
+from data.food_nutrition import SOURCES, get_food_nutrition
+from models.schemas import Exercise
+from services.glucose_estimator import GlucoseEstimator, exercise_minutes, parse_quantity
+
+
+@pytest.fixture(scope="module")
+def estimator():
+    return GlucoseEstimator()
+
+
+@pytest.mark.parametrize("item, expected", [
+    ("rice", (1.0, "rice")),
+    ("2 cups of rice", (2.0, "rice")),
+    ("1/2 bowl dal", (0.5, "dal")),
+    ("half cup rice", (0.5, "rice")),
+    ("two slices of bread", (2.0, "bread")),
+    ("12 eggs", (5.0, "eggs")),
+    ("0 rice", (0.25, "rice")),
+])
+def test_parse_quantity(item, expected):
+    assert parse_quantity(item) == expected
+
+
+@pytest.mark.parametrize("item", ["1/0 rice", "0/0 rice"])
+def test_parse_quantity_zero_denominator_is_one_serving(item):
+    assert parse_quantity(item) == (1.0, "rice")
+
+
+def test_exercise_minutes():
+    assert exercise_minutes(None) == 0
+    assert exercise_minutes(Exercise(type="walk", duration="30 min")) == 30
+    assert exercise_minutes(Exercise(type="yoga", duration="1 hour")) == 60
+    assert exercise_minutes(Exercise(type="walk", duration="a while")) == 0
+
+
+def test_match_exact_alias_word_and_fuzzy(estimator):
+    name = lambda item: estimator.foods[estimator.match(item)]["name"]
+    assert name("white rice") == "White Rice"
+    assert name("chawal") == "White Rice"
+    assert name("brown rice with ghee") == "Brown Rice"
+    assert name("basmatti") == "Basmati Rice"
+    assert estimator.match("xyzzy") is None
+
+
+def test_fibre_and_exercise_lower_the_estimate(estimator):
+    rice = estimator.estimate(["2 cups white rice"])
+    with_dal = estimator.estimate(["2 cups white rice", "mung dal"])
+    walked = estimator.estimate(["2 cups white rice"], Exercise(type="walk", duration="30 min"))
+
+    assert with_dal["glycemic_load"] > rice["glycemic_load"]
+    assert with_dal["damped_load"] / with_dal["glycemic_load"] < rice["damped_load"] / rice["glycemic_load"]
+    assert walked["damped_load"] < rice["damped_load"]
+    assert rice["highest_load_item"] == "2 cups white rice"
+
+
+def test_unmatched_items_widen_the_range(estimator):
+    known = estimator.estimate(["rice"])
+    guessed = estimator.estimate(["rice", "xyzzy"])
+
+    assert guessed["unmatched"] == ["xyzzy"]
+    assert guessed["peak_high"] - guessed["peak_low"] > known["peak_high"] - known["peak_low"]
+
+
+def test_poorly_controlled_users_rise_more(estimator):
+    controlled = estimator.estimate(["rice"], user_stats={"avg_glucose_7days": 100, "time_in_range_7days": 1.0})
+    uncontrolled = estimator.estimate(["rice"], user_stats={"avg_glucose_7days": 160, "time_in_range_7days": 0.4})
+
+    assert uncontrolled["peak_low"] - uncontrolled["baseline"] > controlled["peak_low"] - controlled["baseline"]
+
+
+def test_empty_meal_is_stable(estimator):
+    estimate = estimator.estimate([])
+    assert estimate["predictedGlucose"].startswith("Stable")
+    assert estimate["highest_load_item"] is None
+
+
+def test_every_food_cites_known_sources():
+    for food in get_food_nutrition():
+        assert food["sources"], food["name"]
+        assert set(food["sources"]) <= set(SOURCES), food["name"]
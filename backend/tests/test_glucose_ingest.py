@@ -0,0 +1,219 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import main
+from services.glucose_ingest import (
+    GlucoseIngestService, create_idempotency_store, parse_body, to_microseconds, validate_readings
+)
+from services.profile_cache import MemoryProfileBackend
+
+NOW = datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc)
+READINGS = [
+    {"value": 110, "timestamp": "2026-03-01T08:00:00Z", "notes": "fasting"},
+    {"value": 145.5, "timestamp": "2026-03-01T08:05:00+00:00"},
+    {"value": 150, "timestamp": "2026-03-01T08:10:00"},
+]
+
+
+def test_json_array_and_ndjson_give_the_same_readings():
+    ndjson = "\n".join(json.dumps(reading) for reading in READINGS) + "\n\n"
+
+    assert parse_body(json.dumps(READINGS).encode()) == READINGS
+    assert parse_body(ndjson.encode(), "application/x-ndjson") == READINGS
+    # NDJSON whose first reading is an array is not mistaken for a JSON array
+    assert parse_body(b"[1]\n[2]", "application/x-ndjson") == [[1], [2]]
+
+
+def test_bad_ndjson_lines_are_reported():
+    with pytest.raises(ValueError, match="Line 2"):
+        parse_body(b'{"value": 100}\n{"value": \n', "application/x-ndjson")
+
+
+def test_invalid_readings_get_a_reason():
+    items = [
+        READINGS[0],
+        "120 at 8am",
+        {"value": "high", "timestamp": "2026-03-01T08:00:00Z"},
+        {"value": 100, "timestamp": 1772352000},
+        {"value": 900, "timestamp": "2026-03-01T09:00:00Z"},
+        {"value": True, "timestamp": "2026-03-01T09:00:00Z"},
+        {"value": 100, "timestamp": "2026-03-02T09:00:00Z"},
+    ]
+    values, timestamps, errors = validate_readings(items, now=NOW)
+
+    assert errors.tolist() == [
+        "",
+        "reading must be an object",
+        "value must be a number",
+        "timestamp must be an ISO 8601 string",
+        "value must be between 20 and 600 mg/dL",
+        "value must be a number",
+        "timestamp is in the future",
+    ]
+    assert timestamps[0] == to_microseconds("2026-03-01T08:00:00+00:00")
+
+
+def test_repeated_timestamps_keep_the_first_reading():
+    items = [READINGS[0], {"value": 500, "timestamp": "2026-03-01T08:00:00+00:00"}, {"value": 5}, READINGS[1]]
+    _, _, errors = validate_readings(items, now=NOW)
+
+    # "Z" and "+00:00" forms of the same instant are the same timestamp
+    assert errors.tolist() == ["", "duplicate", "timestamp must be an ISO 8601 string", ""]
+
+
+class FakeSupabase:
+    """PostgREST glucose_readings with the (user_id, timestamp) unique index"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.stored = set()
+        self.inserts = []
+
+    async def insert_glucose_readings(self, rows):
+        self.inserts.append(len(rows))
+        await asyncio.sleep(self.delay)
+        inserted = []
+        for row in rows:
+            key = (row["user_id"], to_microseconds(row["timestamp"]))
+            if key not in self.stored:
+                self.stored.add(key)
+                inserted.append({"id": len(self.stored), "timestamp": row["timestamp"]})
+        return inserted
+
+
+def hourly(count, start=0):
+    return [{"value": 100 + i % 50, "timestamp": f"2026-02-{1 + (start + i) // 24:02d}T{(start + i) % 24:02d}:00:00Z"}
+            for i in range(count)]
+
+
+def test_readings_are_inserted_in_chunks_and_reuploads_are_duplicates():
+    supabase = FakeSupabase()
+    service = GlucoseIngestService(supabase, chunk_size=4)
+    items = hourly(10) + [{"value": "bad"}]
+
+    async def run():
+        return await service.ingest("u1", items), await service.ingest("u1", items[5:])
+
+    first, second = asyncio.run(run())
+
+    assert supabase.inserts == [4, 4, 2, 4, 1]
+    assert (first["inserted"], first["duplicates"], first["invalid"]) == (10, 0, 1)
+    assert first["results"][10] == {"index": 10, "status": "invalid", "error": "value must be a number"}
+    assert (second["inserted"], second["duplicates"], second["invalid"]) == (0, 5, 1)
+
+
+def test_a_replayed_idempotency_key_returns_the_original_results():
+    supabase = FakeSupabase(delay=0.02)
+    service = GlucoseIngestService(supabase)
+
+    async def run():
+        concurrent = await asyncio.gather(*[service.ingest("u1", READINGS, "sync-1") for _ in range(3)])
+        later = await service.ingest("u1", READINGS, "sync-1")
+        with pytest.raises(ValueError):
+            await service.ingest("u1", READINGS[:1], "sync-1")
+        other_user = await service.ingest("u2", READINGS, "sync-1")
+        return concurrent, later, other_user
+
+    concurrent, later, other_user = asyncio.run(run())
+
+    assert supabase.inserts == [3, 3]
+    assert all(response == later for response in concurrent) and later["inserted"] == 3
+    assert other_user["inserted"] == 3
+
+
+def test_workers_sharing_a_store_replay_each_others_results():
+    supabase, shared = FakeSupabase(), MemoryProfileBackend()
+    workers = [GlucoseIngestService(supabase, responses=shared) for _ in range(2)]
+
+    async def run():
+        first = await workers[0].ingest("u1", READINGS, "sync-1")
+        return first, await workers[1].ingest("u1", READINGS, "sync-1")
+
+    first, retry = asyncio.run(run())
+
+    assert retry == first and retry["inserted"] == 3
+    assert supabase.inserts == [3]
+
+
+def test_idempotency_store_selection():
+    assert isinstance(create_idempotency_store("memory"), MemoryProfileBackend)
+    with pytest.raises(ValueError):
+        create_idempotency_store("redis")
+    with pytest.raises(ValueError):
+        create_idempotency_store("sqlite")
+
+
+def http_request(body: bytes, content_type="application/json", content_length=True, idempotency_key=None):
+    """A Starlette request whose body arrives in 1 KB chunks; counts the chunks read"""
+    headers = [(b"content-type", content_type.encode())]
+    if content_length:
+        headers.append((b"content-length", str(len(body)).encode()))
+    if idempotency_key:
+        headers.append((b"idempotency-key", idempotency_key.encode()))
+    chunks = [body[i:i + 1024] for i in range(0, len(body), 1024)] or [b""]
+    reads = []
+
+    async def receive():
+        reads.append(1)
+        chunk = chunks[len(reads) - 1]
+        return {"type": "http.request", "body": chunk, "more_body": len(reads) < len(chunks)}
+
+    scope = {"type": "http", "method": "POST", "path": "/api/glucose-readings/bulk", "headers": headers}
+    return Request(scope, receive), reads
+
+
+@pytest.fixture
+def supabase(monkeypatch):
+    supabase = FakeSupabase()
+    monkeypatch.setattr(main, "glucose_ingest", GlucoseIngestService(supabase), raising=False)
+    return supabase
+
+
+def upload(request):
+    return asyncio.run(main.add_glucose_readings(request, {"sub": "u1"}))
+
+
+def test_bulk_endpoint_accepts_ndjson_and_replays_idempotent_uploads(supabase):
+    body = "\n".join(json.dumps(reading) for reading in READINGS).encode()
+
+    first = upload(http_request(body, "application/x-ndjson", idempotency_key="sync-1")[0])
+    retry = upload(http_request(body, "application/x-ndjson", idempotency_key="sync-1")[0])
+
+    assert first["inserted"] == 3 and retry == first
+    assert supabase.inserts == [3]
+
+
+def test_too_many_readings_are_refused(supabase, monkeypatch):
+    monkeypatch.setattr(main, "MAX_BULK_READINGS", 2)
+    with pytest.raises(HTTPException) as error:
+        upload(http_request(json.dumps(READINGS).encode())[0])
+
+    assert error.value.status_code == 413
+    assert supabase.inserts == []
+
+
+def test_oversized_bodies_are_refused_before_they_are_read(supabase, monkeypatch):
+    monkeypatch.setattr(main, "MAX_BULK_BODY_BYTES", 4096)
+    body = json.dumps(hourly(200)).encode()
+
+    request, reads = http_request(body)
+    with pytest.raises(HTTPException) as error:
+        upload(request)
+    assert error.value.status_code == 413 and reads == []
+
+    # Without a Content-Length the upload stops once it passes the limit
+    request, reads = http_request(body, content_length=False)
+    with pytest.raises(HTTPException) as error:
+        upload(request)
+    assert error.value.status_code == 413 and len(reads) == 5 < len(body) / 1024
+
+
+def test_malformed_bodies_are_a_400(supabase):
+    with pytest.raises(HTTPException) as error:
+        upload(http_request(b'[{"value": 100,')[0])
+    assert error.value.status_code == 400
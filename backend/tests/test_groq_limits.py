@@ -0,0 +1,69 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from services.ayurveda_service import AyurvedaService
+
+
+class SlowCompletions:
+    """Groq chat completions that take `delay` seconds to answer"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        message = SimpleNamespace(content="{}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+@pytest.fixture
+def service(monkeypatch, tmp_path):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("GROQ_TIMEOUT", "0.1")
+    monkeypatch.setenv("GROQ_MAX_CONCURRENCY", "1")
+    monkeypatch.setenv("RESPONSE_MODEL_PATH", str(tmp_path / "none.npz"))
+    monkeypatch.delenv("PREDICTION_CACHE_PATH", raising=False)
+    service = AyurvedaService(vector_service=None, supabase_service=None)
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=SlowCompletions(delay=5)))
+    return service
+
+
+def test_waiting_for_a_slot_counts_towards_the_timeout(service):
+    async def timed():
+        start = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            await service._complete([])
+        return time.monotonic() - start
+
+    async def run():
+        return await asyncio.gather(timed(), timed())
+
+    elapsed = asyncio.run(run())
+
+    # The second request queued behind the first but still gives up on time
+    assert max(elapsed) < 0.18
+    assert service.client.chat.completions.calls == 1
+
+
+def test_streaming_times_out_while_queued_and_frees_the_slot(service):
+    async def run():
+        await service._llm_semaphore.acquire()
+        start = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            async for _ in service._stream_complete([]):
+                pass
+        elapsed = time.monotonic() - start
+        service._llm_semaphore.release()
+
+        with pytest.raises(asyncio.TimeoutError):
+            async for _ in service._stream_complete([]):
+                pass
+        return elapsed
+
+    assert asyncio.run(run()) < 0.18
+    assert not service._llm_semaphore.locked()
@@ -0,0 +1,105 @@
+import asyncio
+import base64
+import json
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from services.history import decode_cursor, encode_cursor, select_columns, stream_ndjson
+
+ROW_ID = str(uuid.UUID(int=7))
+
+
+def test_cursor_round_trip():
+    row = {"timestamp": "2026-01-01T08:00:00+00:00", "id": ROW_ID, "meal_items": ["rice"]}
+    cursor = encode_cursor(row)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == {"timestamp": row["timestamp"], "id": ROW_ID}
+
+
+def forge(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor",
+    forge(["2026-01-01T08:00:00Z", "1),user_id.neq.(x"]),
+    forge(['2026-01-01",id.gt.0', ROW_ID]),
+    forge({"timestamp": "2026-01-01", "id": ROW_ID}),
+    forge([1, 2]),
+])
+def test_tampered_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_select_columns():
+    assert select_columns("meal_logs") == "meal_items,exercise,lifestyle_factors,dosha"
+    assert select_columns("glucose_readings", "glucose_value, id,glucose_value") == "glucose_value"
+    with pytest.raises(ValueError):
+        select_columns("glucose_readings", "glucose_value,user_id")
+
+
+class FakeSupabase:
+    """Meal log rows newest first, paged by the `after` row"""
+
+    def __init__(self, count):
+        self.rows = [
+            {"timestamp": f"2026-01-01T{23 - i // 2:02d}:00:00+00:00", "id": str(uuid.UUID(int=count - i))}
+            for i in range(count)
+        ]
+
+    def _after(self, after):
+        if after is None:
+            return self.rows
+        key = (after["timestamp"], after["id"])
+        return [row for row in self.rows if (row["timestamp"], row["id"]) < key]
+
+    async def get_meal_history(self, user_id, days, columns, limit, after=None):
+        return self._after(after)[:limit]
+
+    async def iter_pages(self, table, user_id, columns, start=None, after=None, descending=True, page_size=1000):
+        rows = self._after(after)
+        for i in range(0, len(rows), page_size):
+            yield rows[i:i + page_size]
+
+
+def history(cursor=None, format="json", limit=4):
+    return asyncio.run(main.get_meal_history(
+        days=7, limit=limit, cursor=cursor, fields=None, format=format, user={"sub": "u1"}
+    ))
+
+
+def test_pages_follow_next_cursor_to_the_end(monkeypatch):
+    supabase = FakeSupabase(10)
+    monkeypatch.setattr(main, "supabase_service", supabase, raising=False)
+
+    rows, cursor = [], None
+    while True:
+        page = history(cursor)
+        rows.extend(page["data"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert rows == supabase.rows
+
+
+def test_bad_cursor_is_a_400(monkeypatch):
+    monkeypatch.setattr(main, "supabase_service", FakeSupabase(3), raising=False)
+    with pytest.raises(HTTPException) as error:
+        history(cursor="garbage")
+    assert error.value.status_code == 400
+
+
+def test_ndjson_streams_every_row():
+    supabase = FakeSupabase(5)
+
+    async def collect():
+        return b"".join([chunk async for chunk in stream_ndjson(supabase, "meal_logs", "u1", "", page_size=2)])
+
+    lines = asyncio.run(collect()).decode().splitlines()
+    assert [json.loads(line) for line in lines] == supabase.rows
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from services.json_stream import IncrementalJSONParser, loads_lenient, repair_json
+
+PREDICTION = {
+    "predictedGlucose": "140-160 mg/dL",
+    "explanation": "Rice is high GI; ghee slows absorption.",
+    "recommendations": ["Walk for 15 minutes", "Add bitter gourd"],
+    "dietarySuggestions": [{"food": "Millet", "reason": "Lower GI"}]
+}
+
+
+def test_well_formed_output_is_not_marked_repaired():
+    text = "Here is the prediction:\n```json\n" + json.dumps(PREDICTION) + "\n```"
+    assert loads_lenient(text) == (PREDICTION, False)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": [1, 2,], "b": 3,}', {"a": [1, 2], "b": 3}),
+    ('{“a”: “ghee”}', {"a": "ghee"}),
+    ('{"a": "the "warming" spices"}', {"a": 'the "warming" spices'}),
+    ('{"a": "line one\nline two"}', {"a": "line one\nline two"}),
+    ('{"a": [1, 2}', {"a": [1, 2]}),
+])
+def test_common_llm_mistakes_are_repaired(text, expected):
+    assert loads_lenient(text) == (expected, True)
+
+
+def test_truncated_output_keeps_the_complete_fields():
+    text = json.dumps(PREDICTION)
+    data, repaired = loads_lenient(text[:text.index("Add bitter") + 5])
+
+    assert repaired
+    assert data["predictedGlucose"] == PREDICTION["predictedGlucose"]
+    assert data["recommendations"][0] == "Walk for 15 minutes"
+
+
+def test_no_object_is_none():
+    assert loads_lenient("I cannot help with that.") == (None, False)
+    assert repair_json("no braces here") == (None, False)
+
+
+def test_text_after_the_object_is_ignored():
+    assert repair_json('{"a": 1} and {"b": 2}') == ('{"a": 1}', False)
+
+
+def feed(text, size):
+    parser = IncrementalJSONParser()
+    events = []
+    for i in range(0, len(text), size):
+        events.extend(parser.feed(text[i:i + size]))
+    return parser, events
+
+
+@pytest.mark.parametrize("size", [1, 7, 1000])
+def test_fields_and_array_elements_are_emitted_as_they_complete(size):
+    parser, events = feed("Sure! " + json.dumps(PREDICTION) + " trailing", size)
+
+    assert parser.done
+    assert events == [
+        ("predictedGlucose", None, "140-160 mg/dL"),
+        ("explanation", None, PREDICTION["explanation"]),
+        ("recommendations", 0, "Walk for 15 minutes"),
+        ("recommendations", 1, "Add bitter gourd"),
+        ("dietarySuggestions", 0, {"food": "Millet", "reason": "Lower GI"}),
+    ]
+
+
+def test_a_field_is_emitted_before_the_object_is_finished():
+    parser = IncrementalJSONParser()
+
+    assert parser.feed('{"predictedGlucose": "150 mg/dL", "explan') == [("predictedGlucose", None, "150 mg/dL")]
+    assert not parser.done
+
+
+def test_malformed_array_objects_are_repaired_while_streaming():
+    _, events = feed('{"dietarySuggestions": [{"food": "Moong", "reason": "Light",}]}', 5)
+    assert events == [("dietarySuggestions", 0, {"food": "Moong", "reason": "Light"})]
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import main
+from models.schemas import PredictionRequest, PredictionResponse
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.meal_logs = 0
+
+    async def log_meal(self, **kwargs):
+        self.meal_logs += 1
+        await asyncio.sleep(0.05)
+        return {"id": f"meal-{self.meal_logs}"}
+
+
+class FakeAyurveda:
+    def __init__(self, delay):
+        self.delay = delay
+        self.predictions = 0
+        self.cancelled = 0
+
+    async def generate_prediction(self, **kwargs):
+        self.predictions += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return PredictionResponse(predictedGlucose="Stable around 100-110 mg/dL", explanation="", recommendations=[])
+
+
+class FakeWriter:
+    def __init__(self):
+        self.rows = []
+
+    def put(self, row):
+        self.rows.append(row)
+        return True
+
+
+class Client:
+    def __init__(self, disconnected=False):
+        self.disconnected = disconnected
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+@pytest.fixture
+def services(monkeypatch):
+    supabase, ayurveda, writer = FakeSupabase(), FakeAyurveda(delay=0.8), FakeWriter()
+    monkeypatch.setattr(main, "supabase_service", supabase)
+    monkeypatch.setattr(main, "ayurveda_service", ayurveda)
+    monkeypatch.setattr(main, "prediction_writer", writer)
+    monkeypatch.setattr(main, "prediction_requests", main.SingleFlight())
+    return supabase, ayurveda, writer
+
+
+def request(*items, dosha="Vata"):
+    return PredictionRequest(mealItems=[{"id": i, "value": item} for i, item in enumerate(items)], dosha=dosha)
+
+
+def test_identical_requests_share_one_meal_log_and_prediction(services):
+    supabase, ayurveda, writer = services
+
+    async def run():
+        return await asyncio.gather(
+            main.predict_glucose(request("Rice", "dal"), Client(), {"sub": "u1"}),
+            main.predict_glucose(request("dal", " rice "), Client(), {"sub": "u1"}),
+            main.predict_glucose(request("rice", "dal", dosha="vata"), Client(), {"sub": "u1"}),
+        )
+
+    results = asyncio.run(run())
+    assert supabase.meal_logs == 1 and ayurveda.predictions == 1 and len(writer.rows) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_other_users_and_meals_are_not_shared(services):
+    supabase, ayurveda, _ = services
+
+    async def run():
+        await asyncio.gather(
+            main.predict_glucose(request("rice"), Client(), {"sub": "u1"}),
+            main.predict_glucose(request("rice"), Client(), {"sub": "u2"}),
+            main.predict_glucose(request("oats"), Client(), {"sub": "u1"}),
+        )
+
+    asyncio.run(run())
+    assert ayurveda.predictions == 3
+
+
+def test_first_caller_disconnecting_leaves_the_others_their_result(services):
+    supabase, ayurveda, writer = services
+
+    async def run():
+        first = asyncio.ensure_future(main.predict_glucose(request("rice"), Client(disconnected=True), {"sub": "u1"}))
+        await asyncio.sleep(0.01)
+        second = main.predict_glucose(request("rice"), Client(), {"sub": "u1"})
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    first, second = asyncio.run(run())
+    assert isinstance(first, HTTPException) and first.status_code == 499
+    assert isinstance(second, PredictionResponse)
+    assert ayurveda.predictions == 1 and ayurveda.cancelled == 0
+    assert len(writer.rows) == 1
+
+
+def test_work_is_cancelled_once_every_caller_disconnects(services):
+    supabase, ayurveda, writer = services
+
+    async def run():
+        await asyncio.gather(
+            main.predict_glucose(request("rice"), Client(disconnected=True), {"sub": "u1"}),
+            main.predict_glucose(request("rice"), Client(disconnected=True), {"sub": "u1"}),
+            return_exceptions=True
+        )
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert ayurveda.cancelled == 1
+    # The meal was still logged, but there is no prediction to store
+    assert supabase.meal_logs == 1 and writer.rows == []
@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+import pytest
+
+import main
+from models.schemas import PredictionRequest
+
+RESULT = {
+    "predictedGlucose": "Stable around 100-110 mg/dL",
+    "explanation": "Mung dal is light and balancing.",
+    "recommendations": ["Walk after eating"],
+    "dietarySuggestions": None
+}
+
+
+class FakeSupabase:
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.meal_logs = 0
+
+    async def log_meal(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        self.meal_logs += 1
+        return {"id": f"meal-{self.meal_logs}"}
+
+
+class FakeAyurveda:
+    async def stream_prediction(self, **kwargs):
+        yield "token", {"text": "{"}
+        yield "field", {"name": "predictedGlucose", "value": RESULT["predictedGlucose"]}
+        yield "recommendation", {"index": 0, "value": RESULT["recommendations"][0]}
+        yield "result", RESULT
+
+
+class FakeWriter:
+    def __init__(self):
+        self.rows = []
+
+    def put(self, row):
+        self.rows.append(row)
+        return True
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    writer = FakeWriter()
+    monkeypatch.setattr(main, "ayurveda_service", FakeAyurveda(), raising=False)
+    monkeypatch.setattr(main, "prediction_writer", writer, raising=False)
+    return writer
+
+
+def stream(supabase, monkeypatch):
+    monkeypatch.setattr(main, "supabase_service", supabase, raising=False)
+    request = PredictionRequest(mealItems=[{"id": 0, "value": "mung dal"}], dosha="Pitta")
+    return main.predict_glucose_stream(request, {"sub": "u1"})
+
+
+def parse(messages):
+    events = []
+    for message in messages:
+        event, data = message.strip().split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def collect(supabase, monkeypatch):
+    async def run():
+        response = await stream(supabase, monkeypatch)
+        messages = [message async for message in response.body_iterator]
+        return parse(messages)
+
+    return asyncio.run(run())
+
+
+def test_result_is_the_last_event_and_is_saved(writer, monkeypatch):
+    events = collect(FakeSupabase(delay=0.05), monkeypatch)
+
+    assert [event for event, _ in events] == ["token", "field", "recommendation", "result"]
+    assert events[-1][1] == RESULT
+    assert len(writer.rows) == 1 and writer.rows[0]["meal_log_id"] == "meal-1"
+
+
+def test_a_failed_meal_log_is_an_error_instead_of_the_result(writer, monkeypatch):
+    events = collect(FakeSupabase(error=RuntimeError("insert failed")), monkeypatch)
+
+    assert [event for event, _ in events] == ["token", "field", "recommendation", "error"]
+    assert "insert failed" in events[-1][1]["detail"]
+    assert writer.rows == []
+
+
+def disconnect_after(supabase, monkeypatch, count):
+    """Read `count` events, then drop the connection as Starlette does"""
+    errors = []
+
+    async def run():
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        response = await stream(supabase, monkeypatch)
+        reader = response.body_iterator
+
+        async def read():
+            for _ in range(count):
+                await reader.__anext__()
+            await reader.__anext__()
+
+        task = asyncio.ensure_future(read())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    return errors
+
+
+def test_prediction_is_saved_when_the_client_leaves_before_the_log_is_written(writer, monkeypatch):
+    supabase = FakeSupabase(delay=0.05)
+    errors = disconnect_after(supabase, monkeypatch, 3)
+
+    assert supabase.meal_logs == 1
+    assert len(writer.rows) == 1 and writer.rows[0]["meal_log_id"] == "meal-1"
+    assert errors == []
+
+
+def test_a_failed_meal_log_after_a_disconnect_is_retrieved(writer, monkeypatch):
+    errors = disconnect_after(FakeSupabase(delay=0.05, error=RuntimeError("insert failed")), monkeypatch, 1)
+
+    assert writer.rows == []
+    assert errors == []
@@ -0,0 +1,67 @@
+from models.schemas import DietarySuggestion, Exercise, PredictionResponse
+from services.glucose_estimator import GlucoseEstimator
+from services.prediction_cache import PredictionCache, prediction_cache_key
+
+STATS = {"avg_glucose_7days": 112, "time_in_range_7days": 0.82, "last_glucose": 118}
+ESTIMATE = {"predictedGlucose": "Moderate rise to 140-160 mg/dL"}
+
+PREDICTION = PredictionResponse(
+    predictedGlucose="Moderate rise to 140-160 mg/dL",
+    explanation="Rice is heavy for Kapha; the dal balances it.",
+    recommendations=["Walk for 15 minutes"],
+    dietarySuggestions=[DietarySuggestion(meal="Lunch", foodsToFavor="Barley", foodsToAvoid="White rice", notes="")]
+)
+
+
+def key(meal=("rice", "dal"), exercise=None, lifestyle="", dosha="Kapha", stats=STATS, estimate=ESTIMATE):
+    return prediction_cache_key(list(meal), exercise, lifestyle, dosha, stats, estimate)
+
+
+def test_equivalent_requests_share_a_key():
+    assert key() == key(meal=(" Dal", "RICE"), dosha="kapha")
+    assert key(exercise=Exercise(type="Walk", duration="15 min")) == key(exercise=Exercise(type="walk", duration="15  min"))
+
+
+def test_user_statistics_are_bucketed():
+    assert key() == key(stats={"avg_glucose_7days": 114, "time_in_range_7days": 0.79, "last_glucose": 122})
+    assert key() != key(stats={**STATS, "avg_glucose_7days": 131})
+    assert key() != key(stats={**STATS, "time_in_range_7days": 0.6})
+    assert key() != key(stats={})
+
+
+def test_the_estimate_is_part_of_the_key():
+    estimator = GlucoseEstimator()
+    low = estimator.estimate(["rice", "dal"], user_stats=STATS)
+    high = estimator.with_rise(low, low["rise"] + 30, 20)
+
+    assert key(estimate=low) == key(estimate=dict(low))
+    assert key(estimate=low) != key(estimate=high)
+
+
+def test_memory_tier():
+    cache = PredictionCache(max_size=1)
+    cache.set("a", PREDICTION)
+
+    assert cache.get("a") == PREDICTION and cache.get("b") is None
+    cache.set("b", PREDICTION)
+    assert cache.get("a") is None
+    assert cache.stats()["persistent"] is False
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / "predictions.sqlite3")
+    PredictionCache(persist_path=path).set("a", PREDICTION)
+
+    restarted = PredictionCache(persist_path=path)
+    assert restarted.get("a") == PREDICTION
+    # Promoted to memory, so the next read does not touch the disk
+    restarted.disk.clear()
+    assert restarted.get("a") == PREDICTION
+    assert restarted.stats()["persistent"] is True
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = PredictionCache(ttl=-1, persist_path=str(tmp_path / "predictions.sqlite3"))
+    cache.set("a", PREDICTION)
+
+    assert cache.get("a") is None
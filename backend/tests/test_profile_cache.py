@@ -0,0 +1,157 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from services.profile_cache import MemoryProfileBackend, ProfileCache, create_profile_backend
+from services.supabase_service import SupabaseService
+
+
+class FakeProfiles:
+    """PostgREST /user_profiles with a unique user_id, answering slowly"""
+
+    def __init__(self):
+        self.rows = {}
+        self.selects = 0
+        self.inserts = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.01)
+        if request.method == "GET":
+            self.selects += 1
+            row = self.rows.get(request.url.params["user_id"][len("eq."):])
+            return httpx.Response(200, json=[row] if row else [])
+
+        if request.method == "PATCH":
+            row = self.rows[request.url.params["user_id"][len("eq."):]]
+            row.update(json.loads(request.content))
+            return httpx.Response(200, json=[row])
+
+        self.inserts += 1
+        assert request.url.params["on_conflict"] == "user_id"
+        assert "resolution=ignore-duplicates" in request.headers["prefer"]
+        row = json.loads(request.content)
+        if row["user_id"] in self.rows:
+            return httpx.Response(201, json=[])
+        self.rows[row["user_id"]] = row
+        return httpx.Response(201, json=[row])
+
+
+def service(backend=None):
+    profiles = FakeProfiles()
+    supabase = SupabaseService(
+        rest_url="http://postgrest.test/rest/v1",
+        transport=httpx.MockTransport(profiles),
+        profile_cache=ProfileCache(backend, ttl=300)
+    )
+    return profiles, supabase
+
+
+def test_concurrent_first_logins_create_one_profile():
+    profiles, supabase = service()
+
+    async def run():
+        return await asyncio.gather(*[supabase.create_user_profile("u1", name=f"n{i}") for i in range(5)])
+
+    results = asyncio.run(run())
+
+    assert profiles.inserts == 5 and len(profiles.rows) == 1
+    assert all(result == profiles.rows["u1"] for result in results)
+
+
+def test_profiles_are_read_through_the_cache():
+    profiles, supabase = service()
+
+    async def run():
+        await supabase.create_user_profile("u1")
+        supabase.profile_cache.backend.cache.clear()
+        await asyncio.gather(*[supabase.get_user_profile("u1") for _ in range(10)])
+        await supabase.get_user_profile("u1")
+        return supabase.profile_cache.stats()
+
+    stats = asyncio.run(run())
+
+    assert profiles.selects == 1
+    assert stats["misses"] == 10 and stats["hits"] == 1
+    assert stats["loads"]["joined"] == 9
+
+
+def test_missing_profiles_are_not_cached():
+    profiles, supabase = service()
+
+    async def run():
+        assert await supabase.get_user_profile("u1") is None
+        await supabase.create_user_profile("u1")
+        return await supabase.get_user_profile("u1")
+
+    assert asyncio.run(run())["user_id"] == "u1"
+    assert profiles.selects == 1
+
+
+def test_updates_invalidate_the_cached_profile():
+    profiles, supabase = service()
+
+    async def run():
+        await supabase.create_user_profile("u1")
+        await supabase.update_user_profile("u1", {"dosha": "Kapha"})
+        return await supabase.get_user_profile("u1")
+
+    assert asyncio.run(run())["dosha"] == "Kapha"
+    assert profiles.selects == 1
+
+
+def test_a_profile_invalidated_mid_load_is_not_stored():
+    cache = ProfileCache(ttl=300)
+    loaded = asyncio.Event()
+
+    async def load(user_id):
+        loaded.set()
+        await asyncio.sleep(0.02)
+        return {"user_id": user_id, "dosha": "Vata"}
+
+    async def run():
+        reader = asyncio.ensure_future(cache.get("u1", load))
+        await loaded.wait()
+        await cache.invalidate("u1")
+        await reader
+        return await cache.backend.get("u1")
+
+    assert asyncio.run(run()) is None
+
+
+class BrokenBackend(MemoryProfileBackend):
+    async def get(self, key):
+        raise ConnectionError("redis down")
+
+    async def set(self, key, value, ttl=None):
+        raise ConnectionError("redis down")
+
+
+def test_an_unreachable_backend_falls_back_to_the_database():
+    profiles, supabase = service(BrokenBackend())
+
+    async def run():
+        await supabase.create_user_profile("u1")
+        return await supabase.get_user_profile("u1")
+
+    assert asyncio.run(run())["user_id"] == "u1"
+    assert profiles.selects == 1
+
+
+def test_cached_profiles_are_copies():
+    async def run():
+        backend = MemoryProfileBackend()
+        await backend.set("u1", {"dosha": "Vata"})
+        (await backend.get("u1"))["dosha"] = "Pitta"
+        return await backend.get("u1")
+
+    assert asyncio.run(run()) == {"dosha": "Vata"}
+
+
+def test_backend_selection():
+    assert isinstance(create_profile_backend("memory"), MemoryProfileBackend)
+    with pytest.raises(ValueError):
+        create_profile_backend("redis")
+    with pytest.raises(ValueError):
+        create_profile_backend("memcached")
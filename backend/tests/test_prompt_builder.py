@@ -0,0 +1,88 @@
+from models.schemas import Exercise
+from services.prompt_builder import SYSTEM_PROMPT, PromptBuilder, estimate_tokens, trim_to_tokens
+
+ESTIMATE = {"predictedGlucose": "Moderate rise to 140-160 mg/dL", "glycemic_load": 23.4, "baseline": 105}
+
+
+def hit(document, distance=None):
+    return {"document": document, "distance": distance}
+
+
+def test_duplicates_keep_their_best_rank():
+    builder = PromptBuilder()
+    chunks = builder.select_context([
+        [hit("Ghee kindles Agni.", 0.2), hit("Barley suits Kapha.", 0.3)],
+        [hit("barley  suits KAPHA.", 0.1), hit("ghee kindles agni.", 0.05)],
+    ])
+
+    # Each document once, in the form and at the rank of its best hit
+    assert chunks == ["barley suits KAPHA.", "Ghee kindles Agni."]
+
+
+def test_every_query_best_hit_comes_first_ordered_by_distance():
+    builder = PromptBuilder()
+    chunks = builder.select_context([
+        [hit("a0", 0.4), hit("a1", 0.1)],
+        [hit("b0", 0.2), hit("b1", 0.3), hit("b2", 0.05)],
+        [hit("c0"), hit("c1", 0.2)],
+    ])
+
+    # Hits without a distance sort last within their rank
+    assert chunks == ["b0", "a0", "c0", "a1", "c1", "b1", "b2"]
+
+
+def test_context_is_trimmed_to_the_budget():
+    builder = PromptBuilder(context_tokens=40, min_chunk_tokens=10)
+    first = "Pitta is hot and sharp. " * 4
+    second = "Mung dal is cooling and light. It is easy to digest. Eat it with rice at lunch."
+    third = "Kapha needs warming spices."
+
+    chunks = builder.select_context([[hit(first, 0.1)], [hit(second, 0.2)], [hit(third, 0.3)]])
+
+    assert chunks[0] == first.strip()
+    # The second chunk is cut at a sentence boundary to what is left
+    assert second.startswith(chunks[1]) and chunks[1].endswith(".") and chunks[1] != second
+    # Fewer than min_chunk_tokens remain, so the third is dropped rather than cut to a stub
+    assert len(chunks) == 2
+    assert sum(estimate_tokens(chunk) for chunk in chunks) <= 40
+
+
+def test_trim_to_tokens():
+    assert trim_to_tokens("short", 10) == "short"
+    assert trim_to_tokens("one two three four five six", 3) == "one two..."
+    assert trim_to_tokens("First sentence here. Second one.", 6) == "First sentence here."
+
+
+def build(builder=None, result_sets=(), exercise=None, user_stats=None):
+    return (builder or PromptBuilder()).build(
+        meal_items=["rice", "mung dal"],
+        exercise=exercise,
+        lifestyle_factors="",
+        dosha="Pitta",
+        result_sets=list(result_sets),
+        user_stats=user_stats or {},
+        estimate=ESTIMATE
+    )
+
+
+def test_build_keeps_a_static_system_prompt():
+    (system, user), info = build(
+        result_sets=[[hit("Ghee kindles Agni.", 0.1)]],
+        exercise=Exercise(type="Walk", duration="15 min"),
+        user_stats={"avg_glucose_7days": 112, "time_in_range_7days": 0.8, "meal_logs_7days": 9}
+    )
+
+    assert system == {"role": "system", "content": SYSTEM_PROMPT}
+    assert "- Ghee kindles Agni." in user["content"]
+    assert "Walk for 15 min" in user["content"] and "80%" in user["content"]
+    assert "GLUCOSE ESTIMATE: Moderate rise to 140-160 mg/dL (glycemic load 23" in user["content"]
+    assert info["context_chunks"] == 1
+    assert info["prompt_tokens"] == estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(user["content"])
+
+
+def test_build_without_context_or_statistics():
+    (_, user), info = build()
+
+    assert "- none retrieved" in user["content"]
+    assert "7-day average glucose: n/a" in user["content"] and "Exercise: none" in user["content"]
+    assert info["context_chunks"] == 0 and info["context_tokens"] == 0
@@ -0,0 +1,122 @@
+import os
+
+import numpy as np
+import pytest
+
+from services import response_model
+from services.response_model import DIMENSIONS, ResponseModelStore, post_meal_responses
+
+HOUR = 3600.0
+
+
+def test_post_meal_responses():
+    readings = np.array([0, 0.5, 1.5, 2.5, 10, 10.5, 11, 20]) * HOUR
+    values = np.array([100, 95, 150, 120, 110, 130, 125, 90], dtype=float)
+    meals = np.array([0.75, 10.2, 19.0, 30]) * HOUR
+
+    valid, rises = post_meal_responses(meals, readings, values)
+
+    # The 19:00 meal has no reading in the hour before it; the 30:00 meal none after it
+    assert valid.tolist() == [True, True, False, False]
+    assert rises.tolist() == [150 - 95, 130 - 110]
+
+
+def test_post_meal_responses_without_data():
+    valid, rises = post_meal_responses(np.array([HOUR]), np.array([]), np.array([]))
+    assert valid.tolist() == [False] and len(rises) == 0
+
+
+def features(x):
+    """Rows of [bias, x, 0, ...]"""
+    X = np.zeros((len(x), DIMENSIONS))
+    X[:, 0] = 1
+    X[:, 1] = x
+    return X
+
+
+def trained_store(ridge=5.0):
+    """A population with rise = 2x, plus a user with rise = 5x seen 200 times and once"""
+    rng = np.random.default_rng(0)
+    store = ResponseModelStore(ridge=ridge)
+    x = rng.uniform(0, 10, 2000)
+    store.update([f"p{i % 50}" for i in range(len(x))], features(x), 2 * x)
+    x = rng.uniform(0, 10, 200)
+    store.update(["regular"] * len(x), features(x), 5 * x)
+    store.update(["newcomer"], features([8.0]), np.array([40.0]))
+    store.fit()
+    return store
+
+
+def test_users_are_shrunk_towards_the_population():
+    store = trained_store()
+    x = features([10.0])
+
+    population = store.predict(["unknown"], x)[0]
+    regular = store.predict(["regular"], x)[0]
+    newcomer = store.predict(["newcomer"], x)[0]
+
+    assert 20 < population < 30
+    assert regular == pytest.approx(50, rel=0.05)
+    # One meal moves the newcomer only part of the way from the population
+    assert population < newcomer < regular
+    assert store.samples("regular") == 200 and store.samples("unknown") == 0
+    assert store.user_residual_std("regular") == pytest.approx(0, abs=0.5)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    store = trained_store()
+    store.trained_until = 1.7e9
+    path = str(tmp_path / "models" / "response_models.npz")
+    store.save(path)
+
+    loaded = ResponseModelStore.load(path)
+    x = features([3.0, 7.0])
+    users = ["regular", "newcomer"]
+
+    np.testing.assert_allclose(loaded.predict(users, x), store.predict(users, x))
+    assert loaded.user_ids == store.user_ids and loaded.trained_until == 1.7e9
+
+
+def test_a_model_trained_on_other_features_is_refused(tmp_path, monkeypatch):
+    path = str(tmp_path / "response_models.npz")
+    with monkeypatch.context() as patch:
+        patch.setattr(response_model, "RESPONSE_FEATURES", ["glycemic_load"])
+        trained_store().save(path)
+
+    with pytest.raises(ValueError):
+        ResponseModelStore.load(path)
+
+    # Served, it starts empty instead of failing
+    store = ResponseModelStore.open(path)
+    assert store.samples("regular") == 0
+
+
+def rewrite(path, data, mtime):
+    with open(path, "wb") as f:
+        f.write(data)
+    os.utime(path, (mtime, mtime))
+
+
+def test_an_unreadable_retrained_file_keeps_the_current_models(tmp_path):
+    path = str(tmp_path / "response_models.npz")
+    trained_store().save(path)
+    good = open(path, "rb").read()
+    store = ResponseModelStore.open(path)
+    before = store.predict(["regular"], features([10.0]))
+
+    rewrite(path, good[:len(good) // 2], mtime=1)
+    store.reload_if_changed(interval=0)
+    np.testing.assert_allclose(store.predict(["regular"], features([10.0])), before)
+
+    rewrite(path, b"", mtime=2)
+    store.reload_if_changed(interval=0)
+    assert store.samples("regular") == 200
+
+    # A complete file written later is picked up
+    fresh = ResponseModelStore()
+    fresh.update(["other"], features([1.0]), np.array([3.0]))
+    fresh.fit()
+    fresh.save(path)
+    os.utime(path, (3, 3))
+    store.reload_if_changed(interval=0)
+    assert store.samples("other") == 1 and store.samples("regular") == 0
@@ -0,0 +1,84 @@
+import asyncio
+
+from services.single_flight import SingleFlight
+
+
+class Work:
+    def __init__(self, delay=0.05, error=None):
+        self.delay = delay
+        self.error = error
+        self.started = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return self.started
+
+
+def test_concurrent_callers_share_one_call():
+    async def run():
+        flight, work = SingleFlight(), Work()
+        results = await asyncio.gather(*[flight.do("k", work) for _ in range(10)])
+        return flight, work, results
+
+    flight, work, results = asyncio.run(run())
+    assert results == [1] * 10
+    assert work.started == 1
+    assert flight.stats() == {"in_flight": 0, "started": 1, "joined": 9}
+
+
+def test_different_keys_run_separately():
+    async def run():
+        flight, work = SingleFlight(), Work()
+        await asyncio.gather(flight.do("a", work), flight.do("b", work))
+        return work
+
+    assert asyncio.run(run()).started == 2
+
+
+def test_errors_reach_every_caller():
+    async def run():
+        flight = SingleFlight()
+        work = Work(error=RuntimeError("groq down"))
+        return await asyncio.gather(*[flight.do("k", work) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_a_cancelled_caller_does_not_cancel_the_others():
+    async def run():
+        flight, work = SingleFlight(), Work()
+        first = asyncio.ensure_future(flight.do("k", work))
+        second = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return work, await second, first
+
+    work, result, first = asyncio.run(run())
+    assert result == 1 and work.cancelled == 0
+    assert first.cancelled()
+
+
+def test_call_is_cancelled_when_every_caller_leaves():
+    async def run():
+        flight, work = SingleFlight(), Work()
+        caller = asyncio.ensure_future(flight.do("k", work))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        await asyncio.sleep(0)
+        # Arrives before the cancellation has landed: must not join the dying call
+        result = await flight.do("k", work)
+        return flight, work, result
+
+    flight, work, result = asyncio.run(run())
+    assert work.cancelled == 1
+    assert result == 2
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import re
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from services.supabase_service import SupabaseService
+
+START = datetime(2026, 1, 1)
+FILTER = re.compile(r'timestamp\.(gte|gt|lt)\."([^"]+)"')
+AFTER = re.compile(r'^\(timestamp\.(lt|gt)\."([^"]+)",and\(timestamp\.eq\."[^"]+",id\.(?:lt|gt)\.(\d+)\)\)$')
+
+
+class FakePostgREST:
+    """Just enough PostgREST to serve keyset pages, inserts and RPCs"""
+
+    def __init__(self, tables=None):
+        self.tables = tables or {}
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        table = request.url.path.rsplit("/", 1)[-1]
+        if request.method == "GET":
+            return httpx.Response(200, json=self.select(table, request.url.params))
+        if request.url.path.startswith("/rest/v1/rpc/"):
+            return httpx.Response(200, json=[{"avg_glucose": "104.5", "time_in_range": "0.9", "meal_logs": 3}])
+        rows = json.loads(request.content)
+        self.tables.setdefault(table, []).extend(rows if isinstance(rows, list) else [rows])
+        if "return=minimal" in request.headers.get("prefer", ""):
+            return httpx.Response(201)
+        return httpx.Response(201, json=rows if isinstance(rows, list) else [rows])
+
+    def select(self, table, params):
+        rows = [row for row in self.tables.get(table, []) if params["user_id"] == f"eq.{row['user_id']}"]
+        for op, value in FILTER.findall(params.get("and", "")):
+            keep = {"gte": str.__ge__, "gt": str.__gt__, "lt": str.__lt__}[op]
+            rows = [row for row in rows if keep(row["timestamp"], value)]
+        if "or" in params:
+            op, timestamp, row_id = AFTER.match(params["or"]).groups()
+            after = (timestamp, int(row_id))
+            rows = [row for row in rows if ((row["timestamp"], row["id"]) < after) == (op == "lt")
+                    and (row["timestamp"], row["id"]) != after]
+
+        descending = params.get("order", "").startswith("timestamp.desc")
+        rows.sort(key=lambda row: (row["timestamp"], row["id"]), reverse=descending)
+        return rows[:int(params.get("limit", len(rows)))]
+
+
+def readings(user_id, count, per_timestamp=1):
+    return [
+        {"id": i, "user_id": user_id, "timestamp": (START + timedelta(minutes=5 * (i // per_timestamp))).isoformat()}
+        for i in range(count)
+    ]
+
+
+def service(backend):
+    return SupabaseService(rest_url="http://postgrest.test/rest/v1", api_key="key",
+                           transport=httpx.MockTransport(backend))
+
+
+def test_requests_share_one_client_with_auth_headers():
+    backend = FakePostgREST({"user_profiles": [{"id": 1, "user_id": "u1", "timestamp": ""}]})
+    supabase = service(backend)
+
+    async def run():
+        await asyncio.gather(*[supabase._select("user_profiles", {"user_id": "eq.u1"}) for _ in range(5)])
+        await supabase.close()
+
+    asyncio.run(run())
+    assert len(backend.requests) == 5
+    assert all(request.headers["apikey"] == "key" for request in backend.requests)
+    assert all(request.headers["authorization"] == "Bearer key" for request in backend.requests)
+    assert supabase.client.is_closed
+
+
+def test_errors_are_raised():
+    supabase = service(lambda request: httpx.Response(401, json={"message": "JWT expired"}))
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(supabase.get_user_profile("u1"))
+
+
+@pytest.mark.parametrize("table, per_timestamp", [("glucose_readings", 1), ("meal_logs", 4)])
+def test_keyset_pages_cover_every_row_once(table, per_timestamp):
+    rows = readings("u1", 50, per_timestamp) + readings("u2", 10)
+    supabase = service(FakePostgREST({table: rows}))
+
+    async def run():
+        return [page async for page in supabase.iter_pages(table, "u1", "", descending=True, page_size=7)]
+
+    pages = asyncio.run(run())
+
+    assert [len(page) for page in pages] == [7] * 7 + [1]
+    ids = [row["id"] for page in pages for row in page]
+    assert sorted(ids) == list(range(50))
+    assert ids == sorted(ids, key=lambda i: (rows[i]["timestamp"], i), reverse=True)
+
+
+def test_rows_between_respects_the_window():
+    supabase = service(FakePostgREST({"glucose_readings": readings("u1", 100)}))
+
+    rows = asyncio.run(supabase.get_rows_between(
+        "glucose_readings", "u1", "", start=START + timedelta(minutes=50),
+        end=START + timedelta(minutes=100), page_size=3
+    ))
+
+    assert [row["id"] for row in rows] == list(range(10, 20))
+
+
+def test_glucose_bulk_insert_skips_duplicates_server_side():
+    backend = FakePostgREST()
+    supabase = service(backend)
+
+    asyncio.run(supabase.insert_glucose_readings(readings("u1", 3)))
+
+    request = backend.requests[0]
+    assert request.url.params["on_conflict"] == "user_id,timestamp"
+    assert "resolution=ignore-duplicates" in request.headers["prefer"]
+    assert len(json.loads(request.content)) == 3
+
+
+def test_predictions_are_inserted_in_one_request():
+    backend = FakePostgREST()
+    supabase = service(backend)
+
+    asyncio.run(supabase.insert_predictions([{"user_id": "u1", "explanation": str(i)} for i in range(25)]))
+
+    assert len(backend.requests) == 1
+    assert backend.requests[0].headers["prefer"] == "return=minimal"
+    assert len(backend.tables["predictions"]) == 25
+
+
+def test_concurrent_statistics_share_one_rpc():
+    backend = FakePostgREST()
+    supabase = service(backend)
+
+    async def run():
+        return await asyncio.gather(*[supabase.get_user_statistics("u1", 7) for _ in range(10)])
+
+    results = asyncio.run(run())
+
+    assert len(backend.requests) == 1
+    assert backend.requests[0].url.path == "/rest/v1/rpc/get_user_statistics"
+    assert results[0]["avg_glucose_7days"] == 104.5 and results[0]["meal_logs_7days"] == 3
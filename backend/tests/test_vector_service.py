@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from services.vector_service import VectorService, collection_name, embedding_engine
+
+DEFAULT = f"{VectorService.MODEL_NAME}:torch:"
+
+
+def test_default_engine_keeps_the_original_collection():
+    assert collection_name(DEFAULT, DEFAULT) == "ayurveda_knowledge"
+
+
+def test_each_engine_gets_its_own_collection():
+    onnx = collection_name(f"{VectorService.MODEL_NAME}:onnx:", DEFAULT)
+    int8 = collection_name(f"{VectorService.MODEL_NAME}:onnx:onnx/model_quint8_avx2.onnx", DEFAULT)
+
+    assert len({"ayurveda_knowledge", onnx, int8}) == 3
+    assert onnx == collection_name(f"{VectorService.MODEL_NAME}:onnx:", DEFAULT)
+    # Chroma collection names: 3-63 characters
+    assert len(int8) <= 63
+
+
+def test_unverified_engines_need_an_opt_in(monkeypatch):
+    monkeypatch.delenv("EMBEDDING_EXPERIMENTAL", raising=False)
+    monkeypatch.setenv("EMBEDDING_BACKEND", "onnx")
+    with pytest.raises(ValueError):
+        embedding_engine()
+
+    monkeypatch.setenv("EMBEDDING_EXPERIMENTAL", "true")
+    assert embedding_engine() == "onnx"
+
+    monkeypatch.setenv("EMBEDDING_BACKEND", "tensorrt")
+    with pytest.raises(ValueError):
+        embedding_engine()
+
+
+def test_corpus_version_depends_on_the_engine(monkeypatch):
+    monkeypatch.setenv("VECTOR_BACKEND", "numpy")
+    monkeypatch.setenv("EMBEDDING_EXPERIMENTAL", "true")
+    versions = []
+    for engine in ["torch", "onnx"]:
+        monkeypatch.setenv("EMBEDDING_BACKEND", engine)
+        vectors = VectorService()
+        vectors.backend.add(["doc_0"], ["Barley suits Kapha"], np.ones((1, 4)), [{"category": "diet"}])
+        versions.append(vectors.corpus_version)
+
+    assert versions[0] != versions[1]
+
+
+def test_embedding_cache_counters_are_reported(monkeypatch):
+    monkeypatch.setenv("VECTOR_BACKEND", "numpy")
+    monkeypatch.delenv("EMBEDDING_CACHE_PATH", raising=False)
+    vectors = VectorService()
+    vectors.embedding_cache._encode = lambda texts: np.ones((len(texts), 4))
+
+    vectors.embedding_cache.encode(["Kapha breakfast", "kapha  BREAKFAST", "Pitta lunch"])
+    vectors.embedding_cache.encode(["Pitta lunch"])
+
+    stats = vectors.stats()["embedding_cache"]
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    assert stats["persistent"] is False
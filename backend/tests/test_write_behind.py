@@ -0,0 +1,85 @@
+import asyncio
+
+import httpx
+
+from services.write_behind import WriteBehindQueue, is_retryable
+
+
+def status_error(status):
+    request = httpx.Request("POST", "http://postgrest.test/predictions")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(status, request=request))
+
+
+class FakeWriter:
+    """Records batches; fails the first `failures` calls, and any batch with a bad row"""
+
+    def __init__(self, failures=0, error=None):
+        self.batches = []
+        self.failures = failures
+        self.error = error or status_error(503)
+
+    async def __call__(self, rows):
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        if any(row.get("bad") for row in rows):
+            raise status_error(400)
+        self.batches.append(list(rows))
+
+
+def run(writer, rows, flush_interval=0.01, **kwargs):
+    async def main():
+        queue = WriteBehindQueue(writer, flush_interval=flush_interval, retry_backoff=0, **kwargs)
+        queue.start()
+        accepted = [queue.put(row) for row in rows]
+        await queue.stop()
+        return queue, accepted
+
+    return asyncio.run(main())
+
+
+def test_rows_are_written_in_batches():
+    writer = FakeWriter()
+    # Every row is queued before the first flush, so only the last batch waits out the interval
+    queue, _ = run(writer, [{"n": i} for i in range(250)], batch_size=100, flush_interval=0.5)
+
+    assert [len(batch) for batch in writer.batches] == [100, 100, 50]
+    assert queue.stats()["written"] == 250 and queue.stats()["queued"] == 0
+
+
+def test_put_does_not_wait_and_drops_when_full():
+    writer = FakeWriter()
+    queue, accepted = run(writer, [{"n": i} for i in range(5)], max_queue=3)
+
+    assert accepted == [True, True, True, False, False]
+    assert queue.dropped == 2 and queue.written == 3
+
+
+def test_transient_failures_are_retried():
+    writer = FakeWriter(failures=2)
+    queue, _ = run(writer, [{"n": 1}, {"n": 2}])
+
+    assert writer.batches == [[{"n": 1}, {"n": 2}]]
+    assert queue.retries == 2 and queue.dropped == 0
+
+
+def test_batches_are_dropped_after_max_retries():
+    writer = FakeWriter(failures=10, error=httpx.ConnectError("refused"))
+    queue, _ = run(writer, [{"n": 1}, {"n": 2}], max_retries=3)
+
+    assert writer.batches == []
+    assert queue.retries == 3 and queue.dropped == 2
+
+
+def test_a_rejected_row_does_not_take_the_batch_with_it():
+    writer = FakeWriter()
+    queue, _ = run(writer, [{"n": 1}, {"n": 2, "bad": True}, {"n": 3}])
+
+    assert writer.batches == [[{"n": 1}], [{"n": 3}]]
+    assert queue.written == 2 and queue.dropped == 1 and queue.retries == 0
+
+
+def test_is_retryable():
+    assert is_retryable(status_error(503)) and is_retryable(status_error(429))
+    assert is_retryable(httpx.ReadTimeout("slow")) and is_retryable(asyncio.TimeoutError())
+    assert not is_retryable(status_error(400)) and not is_retryable(ValueError("bad row"))
@@ -0,0 +1,142 @@
+"""
+Train per-user glucose response models
+Joins each logged meal with the user's glucose readings in the post-meal
+window and updates the ridge regressions that personalise predictedGlucose.
+Each run only adds meals logged since the previous one, so it can run
+nightly (e.g. from cron). Needs a service-role SUPABASE_KEY to read every
+user's rows.
+
+Usage (from backend/):
+  python train_response_models.py
+  python train_response_models.py --full --ridge 5
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from dotenv import load_dotenv
+
+from models.schemas import Exercise
+from services.glucose_estimator import GlucoseEstimator, response_features
+from services.response_model import ResponseModelStore, post_meal_responses
+from services.supabase_service import SupabaseService
+
+# Load environment variables
+load_dotenv()
+
+
+def parse_timestamp(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def parse_exercise(value):
+    try:
+        return Exercise(**value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+async def user_samples(supabase, estimator, user_id, since, until, args):
+    """Design matrix and observed rises for one user's meals in [since, until)"""
+    meals = await supabase.get_rows_between("meal_logs", user_id, "meal_items,exercise", since, until)
+    if not meals:
+        return None
+
+    meal_times = np.array([parse_timestamp(meal["timestamp"]) for meal in meals])
+    readings = await supabase.get_rows_between(
+        "glucose_readings", user_id, "glucose_value",
+        datetime.fromtimestamp(meal_times[0] - args.baseline_minutes * 60, timezone.utc),
+        until + timedelta(minutes=args.window_minutes)
+    )
+    reading_times = np.array([parse_timestamp(reading["timestamp"]) for reading in readings])
+    reading_values = np.array([float(reading["glucose_value"]) for reading in readings])
+
+    valid, rises = post_meal_responses(
+        meal_times, reading_times, reading_values,
+        baseline_window=args.baseline_minutes * 60,
+        response_window=args.window_minutes * 60
+    )
+    if not valid.any():
+        return None
+
+    profiles = [
+        estimator.meal_profile(meal["meal_items"] or [], parse_exercise(meal.get("exercise")))
+        for meal, keep in zip(meals, valid) if keep
+    ]
+    return response_features(profiles), rises
+
+
+async def train(args):
+    if args.full:
+        store = ResponseModelStore(ridge=args.ridge)
+    else:
+        store = ResponseModelStore.load(args.output)
+        store.ridge = args.ridge
+
+    since = None
+    if store.trained_until is not None:
+        since = datetime.fromtimestamp(store.trained_until, timezone.utc)
+    # Only meals whose whole response window has passed
+    until = datetime.now(timezone.utc) - timedelta(minutes=args.window_minutes)
+
+    print(f"Training on meals from {since.isoformat() if since else 'the beginning'} to {until.isoformat()}")
+
+    estimator = GlucoseEstimator()
+    supabase = SupabaseService()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    users = samples = 0
+    start = time.perf_counter()
+
+    async def fetch(user_id):
+        async with semaphore:
+            return user_id, await user_samples(supabase, estimator, user_id, since, until, args)
+
+    try:
+        async for page in supabase.iter_user_ids():
+            results = await asyncio.gather(*(fetch(user_id) for user_id in page))
+
+            batch_users, batch_X, batch_y = [], [], []
+            for user_id, result in results:
+                if result is None:
+                    continue
+                X, y = result
+                batch_users.extend([user_id] * len(y))
+                batch_X.append(X)
+                batch_y.append(y)
+            if batch_y:
+                store.update(batch_users, np.vstack(batch_X), np.concatenate(batch_y))
+
+            users += len(page)
+            samples += len(batch_users)
+            print(f"  {users} users scanned, {samples} new meal responses")
+    finally:
+        await supabase.close()
+
+    store.fit()
+    store.trained_until = until.timestamp()
+    store.save(args.output)
+
+    trained = int((store.counts > 0).sum())
+    print(f"\n✅ Saved {trained} user models ({int(store.counts.sum())} meals) to {args.output} "
+          f"in {time.perf_counter() - start:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=os.getenv("RESPONSE_MODEL_PATH", "./response_models.npz"))
+    parser.add_argument("--full", action="store_true", help="retrain from scratch instead of adding new meals")
+    parser.add_argument("--ridge", type=float, default=5.0, help="shrinkage towards the population model")
+    parser.add_argument("--baseline-minutes", type=float, default=60)
+    parser.add_argument("--window-minutes", type=float, default=180)
+    parser.add_argument("--concurrency", type=int, default=8, help="users fetched in parallel")
+    args = parser.parse_args()
+
+    asyncio.run(train(args))
+
+
+if __name__ == "__main__":
+    main()
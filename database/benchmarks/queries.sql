@@ -0,0 +1,76 @@
+-- Hot queries of the API (as SupabaseService sends them through PostgREST),
+-- timed and explained by benchmark_time_series.sh against whichever schema
+-- is loaded; :label names the run.
+
+\set ON_ERROR_STOP on
+\pset pager off
+\pset footer off
+
+SELECT user_id AS bench_user FROM user_profiles ORDER BY user_id LIMIT 1 \gset
+
+-- Median of `runs` executions of a statement, in milliseconds
+CREATE OR REPLACE FUNCTION pg_temp.bench(statement TEXT, runs INTEGER DEFAULT 25)
+RETURNS NUMERIC AS $$
+DECLARE
+    timings DOUBLE PRECISION[] := '{}';
+    started TIMESTAMP WITH TIME ZONE;
+BEGIN
+    FOR i IN 1..runs LOOP
+        started := clock_timestamp();
+        EXECUTE statement;
+        timings := timings || EXTRACT(EPOCH FROM clock_timestamp() - started) * 1000;
+    END LOOP;
+    RETURN ROUND((SELECT percentile_cont(0.5) WITHIN GROUP (ORDER BY t) FROM unnest(timings) t)::NUMERIC, 2);
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TEMP TABLE bench_queries (name TEXT, statement TEXT);
+INSERT INTO bench_queries VALUES
+    ('history page (30 days, newest 1000)', format($q$
+        SELECT id, timestamp, glucose_value, notes, created_at FROM glucose_readings
+        WHERE user_id = %L AND timestamp >= NOW() - INTERVAL '30 days'
+        ORDER BY timestamp DESC LIMIT 1000$q$, :'bench_user')),
+    ('deep keyset page (cursor 170 days back)', format($q$
+        SELECT id, timestamp, glucose_value FROM glucose_readings
+        WHERE user_id = %L AND timestamp >= NOW() - INTERVAL '365 days'
+          AND timestamp < NOW() - INTERVAL '170 days'
+        ORDER BY timestamp DESC LIMIT 1000$q$, :'bench_user')),
+    ('training window (7 days, oldest first)', format($q$
+        SELECT id, timestamp, glucose_value FROM glucose_readings
+        WHERE user_id = %L AND timestamp >= NOW() - INTERVAL '60 days' AND timestamp < NOW() - INTERVAL '53 days'
+        ORDER BY timestamp$q$, :'bench_user')),
+    ('chart buckets (90 days, 1 hour)', format($q$
+        SELECT * FROM get_glucose_buckets(%L, NOW() - INTERVAL '90 days', NOW(), INTERVAL '1 hour')$q$, :'bench_user')),
+    ('meal history page (30 days)', format($q$
+        SELECT id, timestamp, meal_items FROM meal_logs
+        WHERE user_id = %L AND timestamp >= NOW() - INTERVAL '30 days'
+        ORDER BY timestamp DESC, id DESC LIMIT 1000$q$, :'bench_user'));
+
+\echo
+\echo ==== :label ====
+SELECT name AS query, pg_temp.bench(statement) AS median_ms FROM bench_queries;
+
+-- The same page through RLS, as the signed-in user
+SET request.jwt.claim.sub = :'bench_user';
+SET ROLE authenticated;
+SELECT 'history page via RLS (no user filter)' AS query, pg_temp.bench($q$
+    SELECT id, timestamp, glucose_value FROM glucose_readings
+    WHERE timestamp >= NOW() - INTERVAL '30 days'
+    ORDER BY timestamp DESC LIMIT 1000$q$) AS median_ms;
+\echo
+\echo -- plan: history page via RLS
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF, SUMMARY OFF)
+    SELECT id, timestamp, glucose_value FROM glucose_readings
+    WHERE timestamp >= NOW() - INTERVAL '30 days'
+    ORDER BY timestamp DESC LIMIT 1000;
+RESET ROLE;
+
+\echo
+\echo -- plan: history page (30 days, newest 1000)
+SELECT statement AS q FROM bench_queries WHERE name LIKE 'history page (30%' \gset
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF, SUMMARY OFF) :q;
+
+\echo
+\echo -- plan: training window
+SELECT statement AS q FROM bench_queries WHERE name LIKE 'training%' \gset
+EXPLAIN (ANALYZE, BUFFERS, COSTS OFF, SUMMARY OFF) :q;
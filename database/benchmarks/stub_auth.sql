@@ -0,0 +1,32 @@
+-- Minimal stand-in for the parts of Supabase the schema relies on, so it can
+-- be loaded into a plain local Postgres. auth.uid() reads the JWT subject the
+-- same way Supabase does, from the request.jwt.claim(s) settings.
+CREATE SCHEMA IF NOT EXISTS auth;
+
+CREATE OR REPLACE FUNCTION auth.uid() RETURNS UUID AS $$
+    SELECT COALESCE(
+        NULLIF(current_setting('request.jwt.claim.sub', true), ''),
+        NULLIF(current_setting('request.jwt.claims', true), '')::jsonb ->> 'sub'
+    )::UUID;
+$$ LANGUAGE sql STABLE;
+
+DO $$
+BEGIN
+    CREATE ROLE anon NOLOGIN;
+EXCEPTION WHEN duplicate_object THEN NULL;
+END
+$$;
+
+DO $$
+BEGIN
+    CREATE ROLE authenticated NOLOGIN;
+EXCEPTION WHEN duplicate_object THEN NULL;
+END
+$$;
+
+GRANT USAGE ON SCHEMA auth, public TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION auth.uid() TO anon, authenticated;
+
+-- Supabase grants API roles access to new tables; RLS policies then apply
+ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT ALL ON TABLES TO anon, authenticated;
+ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT ALL ON FUNCTIONS TO anon, authenticated;
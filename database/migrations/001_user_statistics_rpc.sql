@@ -0,0 +1,59 @@
+-- Migration 001: user statistics aggregated in the database
+--
+-- Run once, in the Supabase SQL Editor or with psql, on a database set up
+-- with the original schema.sql. Fresh installs get all of this from
+-- schema.sql.
+--
+-- get_user_statistics returns one row for a bounded window, so the API no
+-- longer downloads every reading and meal log to compute it. The
+-- user_statistics view is rebuilt on top of it: bounded to 7 days, with no
+-- cross join between meal logs and glucose readings. Migration 002 moves the
+-- function onto hourly summaries.
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION get_user_statistics(p_user_id TEXT, p_days INTEGER DEFAULT 7)
+RETURNS TABLE (
+    avg_glucose NUMERIC,
+    min_glucose NUMERIC,
+    max_glucose NUMERIC,
+    glucose_readings BIGINT,
+    meal_logs BIGINT
+) AS $$
+    SELECT g.avg_glucose, g.min_glucose, g.max_glucose, g.glucose_readings, m.meal_logs
+    FROM (
+        SELECT
+            AVG(glucose_value) AS avg_glucose,
+            MIN(glucose_value) AS min_glucose,
+            MAX(glucose_value) AS max_glucose,
+            COUNT(*) AS glucose_readings
+        FROM glucose_readings
+        WHERE user_id = p_user_id
+          AND timestamp >= NOW() - make_interval(days => p_days)
+    ) g
+    CROSS JOIN (
+        SELECT COUNT(*) AS meal_logs
+        FROM meal_logs
+        WHERE user_id = p_user_id
+          AND timestamp >= NOW() - make_interval(days => p_days)
+    ) m;
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION get_user_statistics(TEXT, INTEGER) TO authenticated;
+
+DROP VIEW IF EXISTS user_statistics;
+CREATE VIEW user_statistics AS
+SELECT
+    up.user_id,
+    up.dosha,
+    s.meal_logs as total_meal_logs,
+    s.glucose_readings as total_glucose_readings,
+    s.avg_glucose,
+    s.min_glucose,
+    s.max_glucose
+FROM user_profiles up
+CROSS JOIN LATERAL get_user_statistics(up.user_id, 7) s;
+
+GRANT SELECT ON user_statistics TO authenticated;
+
+COMMIT;
@@ -0,0 +1,221 @@
+-- Migration 002: hourly glucose summaries maintained by trigger
+--
+-- Run once, after 001. Fresh installs get all of this from schema.sql.
+--
+-- Every reading is folded into a per-user hourly bucket, so rolling-window
+-- statistics read at most 24 * days + 1 small rows instead of rescanning raw
+-- CGM data. Inserts are folded in once per statement; updates and deletes
+-- rebuild the hours they touch. Existing readings are backfilled, and
+-- get_user_statistics and the user_statistics view are rebuilt on top of the
+-- summaries (adding time in range and the latest reading).
+--
+-- Creating the triggers blocks writes to glucose_readings until the
+-- migration commits, so no reading is missed or counted twice by the
+-- backfill. The backfill reads all of glucose_readings once.
+
+BEGIN;
+
+-- Hourly glucose summaries, maintained by trigger on every reading so that
+-- rolling-window statistics never have to rescan raw CGM data
+CREATE TABLE IF NOT EXISTS glucose_hourly_summaries (
+    user_id TEXT NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    reading_count INTEGER NOT NULL,
+    glucose_sum NUMERIC NOT NULL,
+    min_glucose NUMERIC NOT NULL,
+    max_glucose NUMERIC NOT NULL,
+    in_range_count INTEGER NOT NULL,  -- readings within 70-180 mg/dL
+    last_glucose NUMERIC NOT NULL,
+    last_timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (user_id, bucket),
+    FOREIGN KEY (user_id) REFERENCES user_profiles(user_id) ON DELETE CASCADE
+);
+
+ALTER TABLE glucose_hourly_summaries ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own glucose summaries" ON glucose_hourly_summaries;
+CREATE POLICY "Users can view own glucose summaries"
+    ON glucose_hourly_summaries FOR SELECT TO authenticated
+    USING ((SELECT auth.uid())::text = user_id);
+
+-- Rebuild one hourly bucket from the raw readings (used when readings are
+-- updated or deleted, since min/max cannot be maintained by subtraction)
+CREATE OR REPLACE FUNCTION rebuild_glucose_summary(p_user_id TEXT, p_bucket TIMESTAMP WITH TIME ZONE)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM glucose_hourly_summaries WHERE user_id = p_user_id AND bucket = p_bucket;
+
+    INSERT INTO glucose_hourly_summaries
+    SELECT
+        user_id,
+        p_bucket,
+        COUNT(*),
+        SUM(glucose_value),
+        MIN(glucose_value),
+        MAX(glucose_value),
+        COUNT(*) FILTER (WHERE glucose_value BETWEEN 70 AND 180),
+        (ARRAY_AGG(glucose_value ORDER BY timestamp DESC))[1],
+        MAX(timestamp)
+    FROM glucose_readings
+    WHERE user_id = p_user_id
+      AND timestamp >= p_bucket
+      AND timestamp < p_bucket + INTERVAL '1 hour'
+    GROUP BY user_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Inserts are folded in once per statement: a bulk upload of thousands of
+-- readings becomes one upsert per touched hour instead of one per reading.
+-- The transition table only holds rows actually inserted, so readings
+-- skipped by ON CONFLICT DO NOTHING are not counted.
+CREATE OR REPLACE FUNCTION add_inserted_glucose_to_summary()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO glucose_hourly_summaries AS s
+    SELECT
+        user_id,
+        date_trunc('hour', timestamp),
+        COUNT(*),
+        SUM(glucose_value),
+        MIN(glucose_value),
+        MAX(glucose_value),
+        COUNT(*) FILTER (WHERE glucose_value BETWEEN 70 AND 180),
+        (ARRAY_AGG(glucose_value ORDER BY timestamp DESC))[1],
+        MAX(timestamp)
+    FROM inserted_readings
+    GROUP BY user_id, date_trunc('hour', timestamp)
+    ON CONFLICT (user_id, bucket) DO UPDATE SET
+        reading_count = s.reading_count + EXCLUDED.reading_count,
+        glucose_sum = s.glucose_sum + EXCLUDED.glucose_sum,
+        min_glucose = LEAST(s.min_glucose, EXCLUDED.min_glucose),
+        max_glucose = GREATEST(s.max_glucose, EXCLUDED.max_glucose),
+        in_range_count = s.in_range_count + EXCLUDED.in_range_count,
+        last_glucose = CASE WHEN EXCLUDED.last_timestamp >= s.last_timestamp
+                            THEN EXCLUDED.last_glucose ELSE s.last_glucose END,
+        last_timestamp = GREATEST(s.last_timestamp, EXCLUDED.last_timestamp);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+CREATE OR REPLACE FUNCTION maintain_glucose_summary()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM rebuild_glucose_summary(OLD.user_id, date_trunc('hour', OLD.timestamp));
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM rebuild_glucose_summary(NEW.user_id, date_trunc('hour', NEW.timestamp));
+        RETURN NEW;
+    END IF;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- These run with the owner's rights (past RLS) and are only for the triggers
+-- below; otherwise anyone could call them through /rpc and rewrite other
+-- users' summaries. The search_path is pinned so that a caller cannot
+-- substitute its own tables for the ones they write.
+REVOKE EXECUTE ON FUNCTION rebuild_glucose_summary(TEXT, TIMESTAMP WITH TIME ZONE) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION add_inserted_glucose_to_summary() FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION maintain_glucose_summary() FROM PUBLIC, anon, authenticated;
+
+DROP TRIGGER IF EXISTS maintain_glucose_summary ON glucose_readings;
+CREATE TRIGGER maintain_glucose_summary
+    AFTER UPDATE OR DELETE ON glucose_readings
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_glucose_summary();
+
+DROP TRIGGER IF EXISTS add_inserted_glucose_to_summary ON glucose_readings;
+CREATE TRIGGER add_inserted_glucose_to_summary
+    AFTER INSERT ON glucose_readings
+    REFERENCING NEW TABLE AS inserted_readings
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION add_inserted_glucose_to_summary();
+
+-- Backfill summaries for readings logged before the trigger existed
+INSERT INTO glucose_hourly_summaries
+SELECT
+    user_id,
+    date_trunc('hour', timestamp) AS bucket,
+    COUNT(*),
+    SUM(glucose_value),
+    MIN(glucose_value),
+    MAX(glucose_value),
+    COUNT(*) FILTER (WHERE glucose_value BETWEEN 70 AND 180),
+    (ARRAY_AGG(glucose_value ORDER BY timestamp DESC))[1],
+    MAX(timestamp)
+FROM glucose_readings
+GROUP BY user_id, date_trunc('hour', timestamp)
+ON CONFLICT (user_id, bucket) DO NOTHING;
+
+-- User statistics over a rolling window, read from the hourly summaries so
+-- each call touches at most 24 * p_days + 1 small rows per user. Buckets
+-- older than the window simply fall out of the sum; the window edge is
+-- accurate to the hour.
+DROP VIEW IF EXISTS user_statistics;
+DROP FUNCTION IF EXISTS get_user_statistics(TEXT, INTEGER);
+
+CREATE FUNCTION get_user_statistics(p_user_id TEXT, p_days INTEGER DEFAULT 7)
+RETURNS TABLE (
+    avg_glucose NUMERIC,
+    min_glucose NUMERIC,
+    max_glucose NUMERIC,
+    glucose_readings BIGINT,
+    time_in_range NUMERIC,
+    last_glucose NUMERIC,
+    last_glucose_at TIMESTAMP WITH TIME ZONE,
+    meal_logs BIGINT
+) AS $$
+    SELECT
+        g.glucose_sum / NULLIF(g.glucose_readings, 0),
+        g.min_glucose,
+        g.max_glucose,
+        COALESCE(g.glucose_readings, 0),
+        g.in_range_count::NUMERIC / NULLIF(g.glucose_readings, 0),
+        l.last_glucose,
+        l.last_timestamp,
+        m.meal_logs
+    FROM (
+        SELECT
+            SUM(glucose_sum) AS glucose_sum,
+            MIN(min_glucose) AS min_glucose,
+            MAX(max_glucose) AS max_glucose,
+            SUM(reading_count) AS glucose_readings,
+            SUM(in_range_count) AS in_range_count
+        FROM glucose_hourly_summaries
+        WHERE user_id = p_user_id
+          AND bucket >= date_trunc('hour', NOW() - make_interval(days => p_days))
+    ) g
+    CROSS JOIN (
+        SELECT COUNT(*) AS meal_logs
+        FROM meal_logs
+        WHERE user_id = p_user_id
+          AND timestamp >= NOW() - make_interval(days => p_days)
+    ) m
+    LEFT JOIN LATERAL (
+        SELECT last_glucose, last_timestamp
+        FROM glucose_hourly_summaries
+        WHERE user_id = p_user_id
+          AND bucket >= date_trunc('hour', NOW() - make_interval(days => p_days))
+        ORDER BY bucket DESC
+        LIMIT 1
+    ) l ON TRUE;
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION get_user_statistics(TEXT, INTEGER) TO authenticated;
+
+CREATE VIEW user_statistics AS
+SELECT
+    up.user_id,
+    up.dosha,
+    s.meal_logs as total_meal_logs,
+    s.glucose_readings as total_glucose_readings,
+    s.avg_glucose,
+    s.min_glucose,
+    s.max_glucose,
+    s.time_in_range,
+    s.last_glucose
+FROM user_profiles up
+CROSS JOIN LATERAL get_user_statistics(up.user_id, 7) s;
+
+GRANT SELECT ON user_statistics TO authenticated;
+
+COMMIT;
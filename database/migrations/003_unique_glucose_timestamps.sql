@@ -0,0 +1,22 @@
+-- Migration 003: one glucose reading per user and timestamp
+--
+-- Run once, after 002. Fresh installs get all of this from schema.sql.
+--
+-- POST /api/glucose-readings/bulk inserts with ON CONFLICT (user_id,
+-- timestamp) DO NOTHING, so a CGM re-uploading after an offline sync does
+-- not duplicate readings. That needs a unique index on (user_id, timestamp), and existing
+-- duplicates must go first: the oldest-id copy of each is kept. Deleting
+-- them fires the summary trigger from 002, which rebuilds the affected hours.
+
+BEGIN;
+
+DELETE FROM glucose_readings a
+USING glucose_readings b
+WHERE a.user_id = b.user_id
+  AND a.timestamp = b.timestamp
+  AND a.id > b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_glucose_readings_user_timestamp
+    ON glucose_readings (user_id, timestamp);
+
+COMMIT;
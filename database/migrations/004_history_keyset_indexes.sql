@@ -0,0 +1,24 @@
+-- Migration 004: indexes for keyset-paged history and prediction lookups
+--
+-- Run once, after 003. Fresh installs get all of this from schema.sql.
+--
+-- History endpoints page by (timestamp, id) cursors newest first, so each
+-- page is an index range scan rather than an OFFSET over everything before
+-- it. The write-behind prediction queue links predictions to meal logs by
+-- meal_log_id, which had no index.
+--
+-- On a large, busy table, run each CREATE INDEX on its own with
+-- CONCURRENTLY (outside a transaction) instead.
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS idx_meal_logs_user_timestamp_id
+    ON meal_logs (user_id, timestamp, id);
+
+CREATE INDEX IF NOT EXISTS idx_glucose_readings_user_timestamp_id
+    ON glucose_readings (user_id, timestamp, id);
+
+CREATE INDEX IF NOT EXISTS idx_predictions_meal_log_id
+    ON predictions (meal_log_id);
+
+COMMIT;
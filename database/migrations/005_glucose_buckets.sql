@@ -0,0 +1,51 @@
+-- Migration 005: glucose chart buckets
+--
+-- Run once, after 004. Fresh installs get all of this from schema.sql.
+--
+-- Long chart windows are aggregated in the database instead of shipping
+-- every raw reading to the API.
+
+BEGIN;
+
+-- Glucose aggregated into fixed buckets for charts (date_bin needs Postgres 14+).
+-- Percentiles are the ambulatory glucose profile bands; buckets are aligned
+-- to the epoch so the same bucket always covers the same time.
+CREATE OR REPLACE FUNCTION get_glucose_buckets(
+    p_user_id TEXT,
+    p_start TIMESTAMP WITH TIME ZONE,
+    p_end TIMESTAMP WITH TIME ZONE,
+    p_bucket INTERVAL
+)
+RETURNS TABLE (
+    bucket TIMESTAMP WITH TIME ZONE,
+    readings BIGINT,
+    min_glucose NUMERIC,
+    mean_glucose NUMERIC,
+    max_glucose NUMERIC,
+    p5 DOUBLE PRECISION,
+    p25 DOUBLE PRECISION,
+    median DOUBLE PRECISION,
+    p75 DOUBLE PRECISION,
+    p95 DOUBLE PRECISION
+) AS $$
+    SELECT bucket, readings, min_glucose, mean_glucose, max_glucose, p[1], p[2], p[3], p[4], p[5]
+    FROM (
+        SELECT
+            date_bin(p_bucket, timestamp, TIMESTAMP WITH TIME ZONE 'epoch') AS bucket,
+            COUNT(*) AS readings,
+            MIN(glucose_value) AS min_glucose,
+            ROUND(AVG(glucose_value), 1) AS mean_glucose,
+            MAX(glucose_value) AS max_glucose,
+            percentile_cont(ARRAY[0.05, 0.25, 0.5, 0.75, 0.95]) WITHIN GROUP (ORDER BY glucose_value) AS p
+        FROM glucose_readings
+        WHERE user_id = p_user_id
+          AND timestamp >= p_start
+          AND timestamp < p_end
+        GROUP BY 1
+    ) b
+    ORDER BY bucket;
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION get_glucose_buckets(TEXT, TIMESTAMP WITH TIME ZONE, TIMESTAMP WITH TIME ZONE, INTERVAL) TO authenticated;
+
+COMMIT;
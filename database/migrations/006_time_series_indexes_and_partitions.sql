@@ -0,0 +1,178 @@
+-- Migration 006: composite indexes, monthly partitions for glucose_readings
+-- and RLS policies the planner can index
+--
+-- Run once, after 005. Fresh installs get all of this from schema.sql.
+--
+-- Every hot query is "WHERE user_id = ? AND timestamp in a range ORDER BY
+-- timestamp DESC" (history pages, statistics, charts, model training).
+-- Single-column indexes on user_id and timestamp make Postgres pick one and
+-- filter or sort the rest; one (user_id, timestamp DESC) index answers the
+-- whole query in order.
+--
+-- glucose_readings (a CGM writes ~288 rows per user per day) is range
+-- partitioned by month, so time-bounded queries skip old months and old data
+-- can be detached or dropped a month at a time. meal_logs stays unpartitioned:
+-- predictions.meal_log_id references meal_logs(id), and a partitioned table's
+-- unique keys must include the partition column, so partitioning it would
+-- mean reworking that foreign key for a table that grows a few rows per user
+-- per day. Its composite index covers its queries.
+--
+-- The copy takes an exclusive lock on glucose_readings for its duration;
+-- run it in a quiet period. The summaries in glucose_hourly_summaries are
+-- already up to date and are not recomputed.
+
+BEGIN;
+
+-- Meal logs and predictions: composite indexes replace the single-column ones
+CREATE INDEX IF NOT EXISTS idx_meal_logs_user_timestamp
+    ON meal_logs (user_id, timestamp DESC, id DESC);
+DROP INDEX IF EXISTS idx_meal_logs_user_id;
+DROP INDEX IF EXISTS idx_meal_logs_timestamp;
+DROP INDEX IF EXISTS idx_meal_logs_user_timestamp_id;
+
+CREATE INDEX IF NOT EXISTS idx_predictions_user_created
+    ON predictions (user_id, created_at DESC);
+DROP INDEX IF EXISTS idx_predictions_user_id;
+
+-- Only linked predictions are ever looked up by meal log
+DROP INDEX IF EXISTS idx_predictions_meal_log_id;
+CREATE INDEX idx_predictions_meal_log_id
+    ON predictions (meal_log_id) WHERE meal_log_id IS NOT NULL;
+
+-- Glucose readings: rebuild as a partitioned table
+LOCK TABLE glucose_readings IN ACCESS EXCLUSIVE MODE;
+ALTER TABLE glucose_readings RENAME TO glucose_readings_unpartitioned;
+
+CREATE TABLE glucose_readings (
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    user_id TEXT NOT NULL,
+    glucose_value NUMERIC NOT NULL,
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    notes TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+) PARTITION BY RANGE (timestamp);
+
+-- Readings outside every monthly partition land here
+CREATE TABLE glucose_readings_default PARTITION OF glucose_readings DEFAULT;
+
+-- Create the monthly partitions (UTC months) covering [p_from, p_to); safe to re-run
+CREATE OR REPLACE FUNCTION create_glucose_partitions(p_from DATE, p_to DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    month DATE := date_trunc('month', p_from)::DATE;
+    partition TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE month < p_to LOOP
+        partition := format('glucose_readings_%s', to_char(month, 'YYYY_MM'));
+        IF to_regclass(partition) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF glucose_readings FOR VALUES FROM (%L) TO (%L)',
+                partition,
+                month::TIMESTAMP AT TIME ZONE 'UTC',
+                (month + INTERVAL '1 month')::TIMESTAMP AT TIME ZONE 'UTC'
+            );
+            created := created + 1;
+        END IF;
+        month := (month + INTERVAL '1 month')::DATE;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_glucose_partitions(
+    COALESCE((SELECT MIN(timestamp) FROM glucose_readings_unpartitioned)::DATE, CURRENT_DATE),
+    (CURRENT_DATE + INTERVAL '3 months')::DATE
+);
+
+-- One row per user and timestamp (the bulk upload relies on this)
+INSERT INTO glucose_readings (id, user_id, glucose_value, timestamp, notes, created_at)
+SELECT DISTINCT ON (user_id, timestamp) id, user_id, glucose_value, timestamp, notes, created_at
+FROM glucose_readings_unpartitioned
+ORDER BY user_id, timestamp, id;
+
+DROP TABLE glucose_readings_unpartitioned;
+
+-- Keys and indexes are built after the copy. A partitioned table's primary
+-- key must include the partition column. The unique index serves
+-- ON CONFLICT (user_id, timestamp) and, with glucose_value included,
+-- index-only scans for statistics and charts.
+ALTER TABLE glucose_readings
+    ADD PRIMARY KEY (id, timestamp),
+    ADD FOREIGN KEY (user_id) REFERENCES user_profiles(user_id) ON DELETE CASCADE;
+
+CREATE UNIQUE INDEX idx_glucose_readings_user_timestamp
+    ON glucose_readings (user_id, timestamp DESC) INCLUDE (glucose_value);
+
+CREATE TRIGGER maintain_glucose_summary
+    AFTER UPDATE OR DELETE ON glucose_readings
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_glucose_summary();
+
+CREATE TRIGGER add_inserted_glucose_to_summary
+    AFTER INSERT ON glucose_readings
+    REFERENCING NEW TABLE AS inserted_readings
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION add_inserted_glucose_to_summary();
+
+ALTER TABLE glucose_readings ENABLE ROW LEVEL SECURITY;
+GRANT SELECT, INSERT ON glucose_readings TO authenticated;
+
+-- RLS: auth.uid() wrapped in a sub-select is evaluated once per query (an
+-- InitPlan) instead of once per row, and compares as a constant the planner
+-- can push into the (user_id, ...) indexes
+DROP POLICY IF EXISTS "Users can view own profile" ON user_profiles;
+CREATE POLICY "Users can view own profile"
+    ON user_profiles FOR SELECT TO authenticated
+    USING ((SELECT auth.uid())::text = user_id);
+
+DROP POLICY IF EXISTS "Users can update own profile" ON user_profiles;
+CREATE POLICY "Users can update own profile"
+    ON user_profiles FOR UPDATE TO authenticated
+    USING ((SELECT auth.uid())::text = user_id);
+
+DROP POLICY IF EXISTS "Users can insert own profile" ON user_profiles;
+CREATE POLICY "Users can insert own profile"
+    ON user_profiles FOR INSERT TO authenticated
+    WITH CHECK ((SELECT auth.uid())::text = user_id);
+
+DROP POLICY IF EXISTS "Users can view own meal logs" ON meal_logs;
+CREATE POLICY "Users can view own meal logs"
+    ON meal_logs FOR SELECT TO authenticated
+    USING ((SELECT auth.uid())::text = user_id);
+
+DROP POLICY IF EXISTS "Users can insert own meal logs" ON meal_logs;
+CREATE POLICY "Users can insert own meal logs"
+    ON meal_logs FOR INSERT TO authenticated
+    WITH CHECK ((SELECT auth.uid())::text = user_id);
+
+CREATE POLICY "Users can view own glucose readings"
+    ON glucose_readings FOR SELECT TO authenticated
+    USING ((SELECT auth.uid())::text = user_id);
+
+CREATE POLICY "Users can insert own glucose readings"
+    ON glucose_readings FOR INSERT TO authenticated
+    WITH CHECK ((SELECT auth.uid())::text = user_id);
+
+DROP POLICY IF EXISTS "Users can view own predictions" ON predictions;
+CREATE POLICY "Users can view own predictions"
+    ON predictions FOR SELECT TO authenticated
+    USING ((SELECT auth.uid())::text = user_id);
+
+DROP POLICY IF EXISTS "Users can insert own predictions" ON predictions;
+CREATE POLICY "Users can insert own predictions"
+    ON predictions FOR INSERT TO authenticated
+    WITH CHECK ((SELECT auth.uid())::text = user_id);
+
+DROP POLICY IF EXISTS "Users can view own glucose summaries" ON glucose_hourly_summaries;
+CREATE POLICY "Users can view own glucose summaries"
+    ON glucose_hourly_summaries FOR SELECT TO authenticated
+    USING ((SELECT auth.uid())::text = user_id);
+
+COMMIT;
+
+-- Keep partitions ahead of incoming data, e.g. monthly with pg_cron:
+--   SELECT cron.schedule('glucose-partitions', '0 0 1 * *',
+--       $$SELECT create_glucose_partitions(CURRENT_DATE, (CURRENT_DATE + INTERVAL '3 months')::DATE)$$);
+-- A month added after readings for it reached the default partition fails
+-- until those rows are moved out of glucose_readings_default.
@@ -1,5 +1,6 @@
 -- Ayurvedic Health Predictor Database Schema
 -- Run this in your Supabase SQL Editor
+-- (for a fresh install; upgrade an existing database with database/migrations)
 
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
@@ -33,16 +34,52 @@ CREATE TABLE IF NOT EXISTS meal_logs (
     FOREIGN KEY (user_id) REFERENCES user_profiles(user_id) ON DELETE CASCADE
 );
 
--- Glucose Readings Table
+-- Glucose Readings Table, partitioned by month (a CGM writes ~288 rows per
+-- user per day); the primary key must include the partition column
 CREATE TABLE IF NOT EXISTS glucose_readings (
-    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    id UUID NOT NULL DEFAULT uuid_generate_v4(),
     user_id TEXT NOT NULL,
     glucose_value NUMERIC NOT NULL,
     timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
     notes TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (id, timestamp),
     FOREIGN KEY (user_id) REFERENCES user_profiles(user_id) ON DELETE CASCADE
-);
+) PARTITION BY RANGE (timestamp);
+
+-- Readings outside every monthly partition land here
+CREATE TABLE IF NOT EXISTS glucose_readings_default PARTITION OF glucose_readings DEFAULT;
+
+-- Create the monthly partitions (UTC months) covering [p_from, p_to); safe to re-run.
+-- Schedule it to stay ahead of incoming data, e.g. monthly with pg_cron:
+--   SELECT cron.schedule('glucose-partitions', '0 0 1 * *',
+--       $$SELECT create_glucose_partitions(CURRENT_DATE, (CURRENT_DATE + INTERVAL '3 months')::DATE)$$);
+CREATE OR REPLACE FUNCTION create_glucose_partitions(p_from DATE, p_to DATE)
+RETURNS INTEGER AS $$
+DECLARE
+    month DATE := date_trunc('month', p_from)::DATE;
+    partition TEXT;
+    created INTEGER := 0;
+BEGIN
+    WHILE month < p_to LOOP
+        partition := format('glucose_readings_%s', to_char(month, 'YYYY_MM'));
+        IF to_regclass(partition) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF glucose_readings FOR VALUES FROM (%L) TO (%L)',
+                partition,
+                month::TIMESTAMP AT TIME ZONE 'UTC',
+                (month + INTERVAL '1 month')::TIMESTAMP AT TIME ZONE 'UTC'
+            );
+            created := created + 1;
+        END IF;
+        month := (month + INTERVAL '1 month')::DATE;
+    END LOOP;
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A year back for CGM history imported at sign-up, three months ahead
+SELECT create_glucose_partitions((CURRENT_DATE - INTERVAL '1 year')::DATE, (CURRENT_DATE + INTERVAL '3 months')::DATE);
 
 -- Predictions Table (to store AI-generated predictions for analysis)
 CREATE TABLE IF NOT EXISTS predictions (
@@ -59,13 +96,25 @@ CREATE TABLE IF NOT EXISTS predictions (
 );
 
 -- Create Indexes for better query performance
-CREATE INDEX IF NOT EXISTS idx_meal_logs_user_id ON meal_logs(user_id);
-CREATE INDEX IF NOT EXISTS idx_meal_logs_timestamp ON meal_logs(timestamp);
-CREATE INDEX IF NOT EXISTS idx_glucose_readings_user_id ON glucose_readings(user_id);
-CREATE INDEX IF NOT EXISTS idx_glucose_readings_timestamp ON glucose_readings(timestamp);
-CREATE INDEX IF NOT EXISTS idx_predictions_user_id ON predictions(user_id);
+-- Queries filter on user_id, range on timestamp and read newest first, so
+-- one composite index answers each of them in order.
+CREATE INDEX IF NOT EXISTS idx_meal_logs_user_timestamp
+    ON meal_logs(user_id, timestamp DESC, id DESC);
+-- One reading per user and timestamp, so a CGM re-uploading after an
+-- offline sync is ignored (bulk inserts use ON CONFLICT DO NOTHING);
+-- glucose_value is included for index-only statistics and chart scans
+CREATE UNIQUE INDEX IF NOT EXISTS idx_glucose_readings_user_timestamp
+    ON glucose_readings(user_id, timestamp DESC) INCLUDE (glucose_value);
+CREATE INDEX IF NOT EXISTS idx_predictions_user_created
+    ON predictions(user_id, created_at DESC);
+-- Only linked predictions are ever looked up by meal log
+CREATE INDEX IF NOT EXISTS idx_predictions_meal_log_id
+    ON predictions(meal_log_id) WHERE meal_log_id IS NOT NULL;
 
 -- Row Level Security (RLS) Policies
+-- auth.uid() is wrapped in a sub-select so it is evaluated once per query
+-- (an InitPlan) rather than per row, and compared as a constant the planner
+-- can push into the (user_id, ...) indexes
 -- Enable RLS on all tables
 ALTER TABLE user_profiles ENABLE ROW LEVEL SECURITY;
 ALTER TABLE meal_logs ENABLE ROW LEVEL SECURITY;
@@ -74,43 +123,43 @@ ALTER TABLE predictions ENABLE ROW LEVEL SECURITY;
 
 -- User Profiles Policies
 CREATE POLICY "Users can view own profile"
-    ON user_profiles FOR SELECT
-    USING (auth.uid()::text = user_id);
+    ON user_profiles FOR SELECT TO authenticated
+    USING ((SELECT auth.uid())::text = user_id);
 
 CREATE POLICY "Users can update own profile"
-    ON user_profiles FOR UPDATE
-    USING (auth.uid()::text = user_id);
+    ON user_profiles FOR UPDATE TO authenticated
+    USING ((SELECT auth.uid())::text = user_id);
 
 CREATE POLICY "Users can insert own profile"
-    ON user_profiles FOR INSERT
-    WITH CHECK (auth.uid()::text = user_id);
+    ON user_profiles FOR INSERT TO authenticated
+    WITH CHECK ((SELECT auth.uid())::text = user_id);
 
 -- Meal Logs Policies
 CREATE POLICY "Users can view own meal logs"
-    ON meal_logs FOR SELECT
-    USING (auth.uid()::text = user_id);
+    ON meal_logs FOR SELECT TO authenticated
+    USING ((SELECT auth.uid())::text = user_id);
 
 CREATE POLICY "Users can insert own meal logs"
-    ON meal_logs FOR INSERT
-    WITH CHECK (auth.uid()::text = user_id);
+    ON meal_logs FOR INSERT TO authenticated
+    WITH CHECK ((SELECT auth.uid())::text = user_id);
 
 -- Glucose Readings Policies
 CREATE POLICY "Users can view own glucose readings"
-    ON glucose_readings FOR SELECT
-    USING (auth.uid()::text = user_id);
+    ON glucose_readings FOR SELECT TO authenticated
+    USING ((SELECT auth.uid())::text = user_id);
 
 CREATE POLICY "Users can insert own glucose readings"
-    ON glucose_readings FOR INSERT
-    WITH CHECK (auth.uid()::text = user_id);
+    ON glucose_readings FOR INSERT TO authenticated
+    WITH CHECK ((SELECT auth.uid())::text = user_id);
 
 -- Predictions Policies
 CREATE POLICY "Users can view own predictions"
-    ON predictions FOR SELECT
-    USING (auth.uid()::text = user_id);
+    ON predictions FOR SELECT TO authenticated
+    USING ((SELECT auth.uid())::text = user_id);
 
 CREATE POLICY "Users can insert own predictions"
-    ON predictions FOR INSERT
-    WITH CHECK (auth.uid()::text = user_id);
+    ON predictions FOR INSERT TO authenticated
+    WITH CHECK ((SELECT auth.uid())::text = user_id);
 
 -- Function to automatically update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -127,20 +176,248 @@ CREATE TRIGGER update_user_profiles_updated_at
     FOR EACH ROW
     EXECUTE FUNCTION update_updated_at_column();
 
--- Create a view for user statistics
-CREATE OR REPLACE VIEW user_statistics AS
+-- Hourly glucose summaries, maintained by trigger on every reading so that
+-- rolling-window statistics never have to rescan raw CGM data
+CREATE TABLE IF NOT EXISTS glucose_hourly_summaries (
+    user_id TEXT NOT NULL,
+    bucket TIMESTAMP WITH TIME ZONE NOT NULL,
+    reading_count INTEGER NOT NULL,
+    glucose_sum NUMERIC NOT NULL,
+    min_glucose NUMERIC NOT NULL,
+    max_glucose NUMERIC NOT NULL,
+    in_range_count INTEGER NOT NULL,  -- readings within 70-180 mg/dL
+    last_glucose NUMERIC NOT NULL,
+    last_timestamp TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (user_id, bucket),
+    FOREIGN KEY (user_id) REFERENCES user_profiles(user_id) ON DELETE CASCADE
+);
+
+ALTER TABLE glucose_hourly_summaries ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view own glucose summaries"
+    ON glucose_hourly_summaries FOR SELECT TO authenticated
+    USING ((SELECT auth.uid())::text = user_id);
+
+-- Rebuild one hourly bucket from the raw readings (used when readings are
+-- updated or deleted, since min/max cannot be maintained by subtraction)
+CREATE OR REPLACE FUNCTION rebuild_glucose_summary(p_user_id TEXT, p_bucket TIMESTAMP WITH TIME ZONE)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM glucose_hourly_summaries WHERE user_id = p_user_id AND bucket = p_bucket;
+
+    INSERT INTO glucose_hourly_summaries
+    SELECT
+        user_id,
+        p_bucket,
+        COUNT(*),
+        SUM(glucose_value),
+        MIN(glucose_value),
+        MAX(glucose_value),
+        COUNT(*) FILTER (WHERE glucose_value BETWEEN 70 AND 180),
+        (ARRAY_AGG(glucose_value ORDER BY timestamp DESC))[1],
+        MAX(timestamp)
+    FROM glucose_readings
+    WHERE user_id = p_user_id
+      AND timestamp >= p_bucket
+      AND timestamp < p_bucket + INTERVAL '1 hour'
+    GROUP BY user_id;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Inserts are folded in once per statement: a bulk upload of thousands of
+-- readings becomes one upsert per touched hour instead of one per reading.
+-- The transition table only holds rows actually inserted, so readings
+-- skipped by ON CONFLICT DO NOTHING are not counted.
+CREATE OR REPLACE FUNCTION add_inserted_glucose_to_summary()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO glucose_hourly_summaries AS s
+    SELECT
+        user_id,
+        date_trunc('hour', timestamp),
+        COUNT(*),
+        SUM(glucose_value),
+        MIN(glucose_value),
+        MAX(glucose_value),
+        COUNT(*) FILTER (WHERE glucose_value BETWEEN 70 AND 180),
+        (ARRAY_AGG(glucose_value ORDER BY timestamp DESC))[1],
+        MAX(timestamp)
+    FROM inserted_readings
+    GROUP BY user_id, date_trunc('hour', timestamp)
+    ON CONFLICT (user_id, bucket) DO UPDATE SET
+        reading_count = s.reading_count + EXCLUDED.reading_count,
+        glucose_sum = s.glucose_sum + EXCLUDED.glucose_sum,
+        min_glucose = LEAST(s.min_glucose, EXCLUDED.min_glucose),
+        max_glucose = GREATEST(s.max_glucose, EXCLUDED.max_glucose),
+        in_range_count = s.in_range_count + EXCLUDED.in_range_count,
+        last_glucose = CASE WHEN EXCLUDED.last_timestamp >= s.last_timestamp
+                            THEN EXCLUDED.last_glucose ELSE s.last_glucose END,
+        last_timestamp = GREATEST(s.last_timestamp, EXCLUDED.last_timestamp);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+CREATE OR REPLACE FUNCTION maintain_glucose_summary()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM rebuild_glucose_summary(OLD.user_id, date_trunc('hour', OLD.timestamp));
+    IF TG_OP = 'UPDATE' THEN
+        PERFORM rebuild_glucose_summary(NEW.user_id, date_trunc('hour', NEW.timestamp));
+        RETURN NEW;
+    END IF;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- These run with the owner's rights (past RLS) and are only for the triggers
+-- below; otherwise anyone could call them through /rpc and rewrite other
+-- users' summaries. The search_path is pinned so that a caller cannot
+-- substitute its own tables for the ones they write.
+REVOKE EXECUTE ON FUNCTION rebuild_glucose_summary(TEXT, TIMESTAMP WITH TIME ZONE) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION add_inserted_glucose_to_summary() FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION maintain_glucose_summary() FROM PUBLIC, anon, authenticated;
+
+DROP TRIGGER IF EXISTS maintain_glucose_summary ON glucose_readings;
+CREATE TRIGGER maintain_glucose_summary
+    AFTER UPDATE OR DELETE ON glucose_readings
+    FOR EACH ROW
+    EXECUTE FUNCTION maintain_glucose_summary();
+
+DROP TRIGGER IF EXISTS add_inserted_glucose_to_summary ON glucose_readings;
+CREATE TRIGGER add_inserted_glucose_to_summary
+    AFTER INSERT ON glucose_readings
+    REFERENCING NEW TABLE AS inserted_readings
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION add_inserted_glucose_to_summary();
+
+-- Backfill summaries for readings logged before the trigger existed
+INSERT INTO glucose_hourly_summaries
+SELECT
+    user_id,
+    date_trunc('hour', timestamp) AS bucket,
+    COUNT(*),
+    SUM(glucose_value),
+    MIN(glucose_value),
+    MAX(glucose_value),
+    COUNT(*) FILTER (WHERE glucose_value BETWEEN 70 AND 180),
+    (ARRAY_AGG(glucose_value ORDER BY timestamp DESC))[1],
+    MAX(timestamp)
+FROM glucose_readings
+GROUP BY user_id, date_trunc('hour', timestamp)
+ON CONFLICT (user_id, bucket) DO NOTHING;
+
+-- User statistics over a rolling window, read from the hourly summaries so
+-- each call touches at most 24 * p_days + 1 small rows per user. Buckets
+-- older than the window simply fall out of the sum; the window edge is
+-- accurate to the hour.
+DROP VIEW IF EXISTS user_statistics;
+DROP FUNCTION IF EXISTS get_user_statistics(TEXT, INTEGER);
+
+CREATE FUNCTION get_user_statistics(p_user_id TEXT, p_days INTEGER DEFAULT 7)
+RETURNS TABLE (
+    avg_glucose NUMERIC,
+    min_glucose NUMERIC,
+    max_glucose NUMERIC,
+    glucose_readings BIGINT,
+    time_in_range NUMERIC,
+    last_glucose NUMERIC,
+    last_glucose_at TIMESTAMP WITH TIME ZONE,
+    meal_logs BIGINT
+) AS $$
+    SELECT
+        g.glucose_sum / NULLIF(g.glucose_readings, 0),
+        g.min_glucose,
+        g.max_glucose,
+        COALESCE(g.glucose_readings, 0),
+        g.in_range_count::NUMERIC / NULLIF(g.glucose_readings, 0),
+        l.last_glucose,
+        l.last_timestamp,
+        m.meal_logs
+    FROM (
+        SELECT
+            SUM(glucose_sum) AS glucose_sum,
+            MIN(min_glucose) AS min_glucose,
+            MAX(max_glucose) AS max_glucose,
+            SUM(reading_count) AS glucose_readings,
+            SUM(in_range_count) AS in_range_count
+        FROM glucose_hourly_summaries
+        WHERE user_id = p_user_id
+          AND bucket >= date_trunc('hour', NOW() - make_interval(days => p_days))
+    ) g
+    CROSS JOIN (
+        SELECT COUNT(*) AS meal_logs
+        FROM meal_logs
+        WHERE user_id = p_user_id
+          AND timestamp >= NOW() - make_interval(days => p_days)
+    ) m
+    LEFT JOIN LATERAL (
+        SELECT last_glucose, last_timestamp
+        FROM glucose_hourly_summaries
+        WHERE user_id = p_user_id
+          AND bucket >= date_trunc('hour', NOW() - make_interval(days => p_days))
+        ORDER BY bucket DESC
+        LIMIT 1
+    ) l ON TRUE;
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION get_user_statistics(TEXT, INTEGER) TO authenticated;
+
+-- Glucose aggregated into fixed buckets for charts (date_bin needs Postgres 14+).
+-- Percentiles are the ambulatory glucose profile bands; buckets are aligned
+-- to the epoch so the same bucket always covers the same time.
+CREATE OR REPLACE FUNCTION get_glucose_buckets(
+    p_user_id TEXT,
+    p_start TIMESTAMP WITH TIME ZONE,
+    p_end TIMESTAMP WITH TIME ZONE,
+    p_bucket INTERVAL
+)
+RETURNS TABLE (
+    bucket TIMESTAMP WITH TIME ZONE,
+    readings BIGINT,
+    min_glucose NUMERIC,
+    mean_glucose NUMERIC,
+    max_glucose NUMERIC,
+    p5 DOUBLE PRECISION,
+    p25 DOUBLE PRECISION,
+    median DOUBLE PRECISION,
+    p75 DOUBLE PRECISION,
+    p95 DOUBLE PRECISION
+) AS $$
+    SELECT bucket, readings, min_glucose, mean_glucose, max_glucose, p[1], p[2], p[3], p[4], p[5]
+    FROM (
+        SELECT
+            date_bin(p_bucket, timestamp, TIMESTAMP WITH TIME ZONE 'epoch') AS bucket,
+            COUNT(*) AS readings,
+            MIN(glucose_value) AS min_glucose,
+            ROUND(AVG(glucose_value), 1) AS mean_glucose,
+            MAX(glucose_value) AS max_glucose,
+            percentile_cont(ARRAY[0.05, 0.25, 0.5, 0.75, 0.95]) WITHIN GROUP (ORDER BY glucose_value) AS p
+        FROM glucose_readings
+        WHERE user_id = p_user_id
+          AND timestamp >= p_start
+          AND timestamp < p_end
+        GROUP BY 1
+    ) b
+    ORDER BY bucket;
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION get_glucose_buckets(TEXT, TIMESTAMP WITH TIME ZONE, TIMESTAMP WITH TIME ZONE, INTERVAL) TO authenticated;
+
+-- Create a view for user statistics (last 7 days, one aggregate per table,
+-- no cross join between meal logs and glucose readings)
+CREATE VIEW user_statistics AS
 SELECT
     up.user_id,
     up.dosha,
-    COUNT(DISTINCT ml.id) as total_meal_logs,
-    COUNT(DISTINCT gr.id) as total_glucose_readings,
-    AVG(gr.glucose_value) as avg_glucose,
-    MIN(gr.glucose_value) as min_glucose,
-    MAX(gr.glucose_value) as max_glucose
+    s.meal_logs as total_meal_logs,
+    s.glucose_readings as total_glucose_readings,
+    s.avg_glucose,
+    s.min_glucose,
+    s.max_glucose,
+    s.time_in_range,
+    s.last_glucose
 FROM user_profiles up
-LEFT JOIN meal_logs ml ON up.user_id = ml.user_id
-LEFT JOIN glucose_readings gr ON up.user_id = gr.user_id
-GROUP BY up.user_id, up.dosha;
+CROSS JOIN LATERAL get_user_statistics(up.user_id, 7) s;
 
 -- Grant permissions on the view
-GRANT SELECT ON user_statistics TO authenticated;
\ No newline at end of file
+GRANT SELECT ON user_statistics TO authenticated;
@@ -23,7 +23,7 @@ export const GlucoseMonitor: React.FC = () => {
   const loadHistory = async () => {
     try {
       const token = await getAccessTokenSilently();
-      const data = await apiClient.getGlucoseHistory(token, 7);
+      const data = await apiClient.getGlucoseHistory(token, 7, 5);
       setHistory(data.data || []);
     } catch (error) {
       console.error('Error loading glucose history:', error);
@@ -54,6 +54,62 @@ class APIClient {
     });
   }
 
+  async streamPrediction(
+    mealItems: MealItem[],
+    exercise: Exercise,
+    lifestyleFactors: string,
+    dosha: string,
+    token: string,
+    onEvent: (event: string, data: any) => void
+  ): Promise<PredictionData> {
+    this.setToken(token);
+
+    const response = await fetch(`${API_BASE_URL}/api/predict/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${this.token}`,
+      },
+      body: JSON.stringify({ mealItems, exercise, lifestyleFactors, dosha }),
+    });
+
+    if (!response.ok || !response.body) {
+      const errorData = await response.json().catch(() => null);
+      throw new Error(errorData?.detail || `Request failed with status ${response.status}`);
+    }
+
+    // Server-Sent Events: messages are separated by a blank line
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) >= 0) {
+        const message = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let event = 'message';
+        let data = '';
+        for (const line of message.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+
+        const parsed = data ? JSON.parse(data) : null;
+        if (event === 'error') throw new Error(parsed?.detail || 'Prediction failed');
+        if (event === 'result') return parsed;
+        onEvent(event, parsed);
+      }
+    }
+
+    throw new Error('Prediction stream ended unexpectedly');
+  }
+
   async addGlucoseReading(
     token: string,
     reading: { value: number; timestamp: string; notes?: string }
@@ -66,10 +122,25 @@ class APIClient {
     });
   }
 
-  async getGlucoseHistory(token: string, days: number = 30) {
+  async getGlucoseHistory(token: string, days: number = 30, limit?: number, cursor?: string) {
+    this.setToken(token);
+    
+    // Pages of readings, newest first; pass back `next_cursor` for the next page
+    const params = new URLSearchParams({ days: String(days) });
+    if (limit) params.set('limit', String(limit));
+    if (cursor) params.set('cursor', cursor);
+    return this.fetch(`/api/glucose-history?${params}`);
+  }
+
+  async getGlucoseChart(token: string, days: number, options: { points?: number; bucket?: string }) {
     this.setToken(token);
     
-    return this.fetch(`/api/glucose-history?days=${days}`);
+    // `points` (e.g. the chart width) gives a downsampled series, `bucket`
+    // (15m, 1h, 1d) per-bucket min/mean/max and percentiles
+    const params = new URLSearchParams({ days: String(days) });
+    if (options.points) params.set('points', String(options.points));
+    if (options.bucket) params.set('bucket', options.bucket);
+    return this.fetch(`/api/glucose-history?${params}`);
   }
 
   async getProfile(token: string) {